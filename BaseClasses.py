@@ -5,13 +5,14 @@ import functools
 import logging
 import random
 import secrets
+import threading
 import warnings
 from argparse import Namespace
 from collections import Counter, deque, defaultdict
 from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, MutableSequence, Set
 from enum import IntEnum, IntFlag
-from typing import (AbstractSet, Any, ClassVar, Dict, List, Literal, NamedTuple,
-                    Optional, Protocol, Tuple, Union, TYPE_CHECKING, overload)
+from typing import (AbstractSet, Any, ClassVar, Dict, FrozenSet, List, Literal, NamedTuple,
+                    Optional, Protocol, Tuple, TypeVar, Union, TYPE_CHECKING, overload)
 import dataclasses
 
 from typing_extensions import NotRequired, TypedDict
@@ -20,6 +21,12 @@ import NetUtils
 import Options
 import Utils
 
+try:
+    # importing NetUtils already tried to build _speedups, an outdated build may lack the sweep
+    from _speedups import sweep_for_advancements as compiled_sweep_for_advancements
+except ImportError:
+    compiled_sweep_for_advancements = None
+
 if TYPE_CHECKING:
     from entrance_rando import ERPlacementState
     from rule_builder.rules import Rule
@@ -103,6 +110,9 @@ class MultiWorld():
     per_slot_randoms: Utils.DeprecateDict[int, random.Random]
     """Deprecated. Please use `self.random` instead."""
 
+    _sphere_analysis: Optional[SphereAnalysis]
+    _sphere_analysis_lock: threading.Lock
+
     class AttributeProxy():
         def __init__(self, rule):
             self.rule = rule
@@ -180,6 +190,8 @@ class MultiWorld():
         self.per_slot_randoms = Utils.DeprecateDict("Using per_slot_randoms is now deprecated. Please use the "
                                                     "world's random object instead (usually self.random)", True)
         self.plando_options = PlandoOptions.none
+        self._sphere_analysis = None
+        self._sphere_analysis_lock = threading.Lock()
 
     def get_all_ids(self) -> Tuple[int, ...]:
         return self.player_ids + tuple(self.groups)
@@ -582,6 +594,21 @@ class MultiWorld():
 
         return False
 
+    def get_sphere_analysis(self) -> SphereAnalysis:
+        """
+        Returns the logical spheres of the current item placements, which are only computed again once an item was
+        placed, moved or precollected. Changing logic after placing items requires invalidate_sphere_analysis.
+        """
+        placements = SphereAnalysis.get_placements(self)
+        with self._sphere_analysis_lock:
+            if self._sphere_analysis is None or self._sphere_analysis.placements != placements:
+                self._sphere_analysis = SphereAnalysis(self, placements)
+            return self._sphere_analysis
+
+    def invalidate_sphere_analysis(self) -> None:
+        """Makes get_sphere_analysis compute the spheres again, for when logic changed after placing items."""
+        self._sphere_analysis = None
+
     def get_spheres(self) -> Iterator[Set[Location]]:
         """
         yields a set of locations for each logical sphere
@@ -590,24 +617,12 @@ class MultiWorld():
         locations is followed by an empty set, and then a set of all of the
         unreachable locations.
         """
-        state = CollectionState(self)
-        locations = set(self.get_filled_locations())
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        analysis = self.get_sphere_analysis()
+        for sphere in analysis.spheres:
+            yield set(sphere)
+        if analysis.unreachable:
+            yield set()
+            yield set(analysis.unreachable)
 
     def get_sendable_spheres(self) -> Iterator[Set[Location]]:
         """
@@ -616,46 +631,11 @@ class MultiWorld():
         If there are unreachable locations, the last sphere of reachable locations is followed by an empty set,
         and then a set of all of the unreachable locations.
         """
-        state = CollectionState(self)
-        locations: Set[Location] = set()
-        events: Set[Location] = set()
-        for location in self.get_filled_locations():
-            if type(location.item.code) is int and type(location.address) is int:
-                locations.add(location)
-            else:
-                events.add(location)
-
-        while locations:
-            sphere: Set[Location] = set()
-
-            # cull events out
-            done_events: Set[Union[Location, None]] = {None}
-            while done_events:
-                done_events = set()
-                for event in events:
-                    if event.can_reach(state):
-                        state.collect(event.item, True, event)
-                        done_events.add(event)
-                events -= done_events
-
-            for location in locations:
-                if location.can_reach(state):
-                    sphere.add(location)
-
-            yield sphere
-            if not sphere:
-                if locations:
-                    yield locations  # unreachable locations
-                break
-
-            for location in sphere:
-                state.collect(location.item, True, location)
-            locations -= sphere
+        for sphere in self.get_sphere_analysis().get_sendable_spheres():
+            yield set(sphere)
 
     def fulfills_accessibility(self, state: Optional[CollectionState] = None):
         """Check if accessibility rules are fulfilled with current or supplied state."""
-        if not state:
-            state = CollectionState(self)
         players: Dict[str, Set[int]] = {
             "minimal": set(),
             "items": set(),
@@ -685,6 +665,24 @@ class MultiWorld():
 
         locations = [location for location in self.get_locations() if location_relevant(location)]
 
+        if not state:
+            # starting from scratch, so the spheres of the placements already answer everything
+            analysis = self.get_sphere_analysis()
+            final_state = analysis.get_state(-1)
+            missing = [location for location in locations
+                       if location not in analysis.reachable and location_condition(location)
+                       and not (location.item is None and location.can_reach(final_state))]
+            if self.has_beaten_game(final_state) and not missing:
+                return True
+            if __debug__:
+                from Fill import FillError
+                raise FillError(
+                    f"Could not access required locations for accessibility check. Missing: {missing}",
+                    multiworld=self,
+                )
+            logging.warning(f"Could not access required locations for accessibility check. Missing: {missing}")
+            return False
+
         while locations:
             sphere: List[Location] = []
             for n in range(len(locations) - 1, -1, -1):
@@ -716,7 +714,258 @@ class MultiWorld():
         return False
 
 
+class SphereAnalysis:
+    """
+    The logical spheres of the item placements of a multiworld, computed once by sweeping from a fresh CollectionState
+    and shared by everything analyzing the placements after fill, see MultiWorld.get_sphere_analysis.
+    """
+    placements: Tuple[int, ...]
+    """Identifies the item placements and precollected items the spheres were computed for."""
+    spheres: List[FrozenSet[Location]]
+    """The filled locations reachable in each sphere, collecting all items of the previous spheres."""
+    unreachable: FrozenSet[Location]
+    """The filled locations that can't be reached."""
+    reachable: FrozenSet[Location]
+    """All filled locations in spheres."""
+    states: List[CollectionState]
+    """The state before each sphere, followed by the state after collecting every reachable item.
+    Only to be used through get_state, so they stay unchanged."""
+
+    _sendable_spheres: Optional[List[FrozenSet[Location]]]
+    _sendable_lock: threading.Lock
+
+    def __init__(self, multiworld: MultiWorld, placements: Tuple[int, ...]) -> None:
+        self.multiworld = multiworld
+        self.placements = placements
+        self.spheres = []
+        self.states = []
+        self._sendable_spheres = None
+        self._sendable_lock = threading.Lock()
+
+        state = CollectionState(multiworld)
+        locations = set(multiworld.get_filled_locations())
+        while locations:
+            self.states.append(state.copy())
+            sphere = frozenset(location for location in locations if location.can_reach(state))
+            if not sphere:
+                break
+            self.spheres.append(sphere)
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+        else:
+            self.states.append(state)
+        self.unreachable = frozenset(locations)
+        self.reachable = frozenset().union(*self.spheres)
+
+    def get_state(self, index: int) -> CollectionState:
+        """Returns a copy of states[index], which can be changed while other threads get copies of the same state."""
+        return self.states[index].copy()
+
+    @staticmethod
+    def get_placements(multiworld: MultiWorld) -> Tuple[int, ...]:
+        # identities are compared instead of items, as only the same item objects are guaranteed to collect the same
+        return (*(id(item) for items in multiworld.precollected_items.values() for item in items),
+                *(id(location.item) for location in multiworld.get_locations()))
+
+    def get_sendable_spheres(self) -> List[FrozenSet[Location]]:
+        """
+        Returns the spheres of multiserver sendable locations (location.item.code: int), collecting all events that
+        can be reached before each sphere. If there are unreachable locations, the last sphere of reachable locations
+        is followed by an empty set, and then a set of all of the unreachable locations.
+        """
+        with self._sendable_lock:
+            if self._sendable_spheres is None:
+                self._sendable_spheres = self._create_sendable_spheres()
+            return self._sendable_spheres
+
+    def _create_sendable_spheres(self) -> List[FrozenSet[Location]]:
+        state = CollectionState(self.multiworld)
+        locations: Set[Location] = set()
+        events: Set[Location] = set()
+        for location in self.multiworld.get_filled_locations():
+            if type(location.item.code) is int and type(location.address) is int:
+                locations.add(location)
+            else:
+                events.add(location)
+
+        spheres: List[FrozenSet[Location]] = []
+        while locations:
+            # cull events out
+            done_events: Set[Union[Location, None]] = {None}
+            while done_events:
+                done_events = set()
+                for event in events:
+                    if event.can_reach(state):
+                        state.collect(event.item, True, event)
+                        done_events.add(event)
+                events -= done_events
+
+            sphere = frozenset(location for location in locations if location.can_reach(state))
+            spheres.append(sphere)
+            if not sphere:
+                spheres.append(frozenset(locations))  # unreachable locations
+                break
+
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+        return spheres
+
+
 PathValue = Tuple[str, Optional["PathValue"]]
+PlayerValue = TypeVar("PlayerValue", bound=Union[Counter[str], set[Any]])
+
+
+_copy_on_write_lock = threading.Lock()
+"""Guards cloning the shared containers of PlayerCopyOnWriteDicts, as several threads may copy and read the same one."""
+
+
+class PlayerCopyOnWriteDict(Dict[int, PlayerValue]):
+    """
+    A dict of per-player containers for CollectionState, whose copies share the containers of the original until they
+    are accessed. As the containers are mutable, any access through either dict clones the container of that player,
+    so copying a CollectionState only costs the players that are used afterwards.
+
+    Copying never changes the containers of the original, it only freezes them, so the same state can be copied and read
+    by several threads at once. Shared containers are never changed, they are cloned by whoever accesses them first.
+    """
+    __slots__ = ("shared", "frozen")
+
+    shared: Optional[Dict[int, PlayerValue]]
+    """The containers of the dict this was copied from, for the players this dict didn't access yet."""
+    frozen: Set[int]
+    """The players whose containers in this dict were shared with a copy of it, while it is a _FrozenPlayerDict."""
+
+    def __init__(self, shared: Optional[Dict[int, PlayerValue]] = None) -> None:
+        super().__init__()
+        self.shared = shared
+        self.frozen = set()
+
+    @classmethod
+    def share(cls, per_player: Dict[int, PlayerValue]) -> Tuple[Dict[int, PlayerValue], Dict[int, PlayerValue]]:
+        """Returns the original and a copy of a per-player dict, both sharing the current containers."""
+        if not isinstance(per_player, PlayerCopyOnWriteDict):
+            # a plain dict can't be frozen, so it is replaced
+            shared = dict(per_player)
+            return cls(shared), cls(shared)
+        with _copy_on_write_lock:
+            # not dict.copy, which would iterate it through its overridden methods
+            own = dict(dict.items(per_player))
+            shared = {**per_player.shared, **own} if per_player.shared else own
+            if own:
+                per_player.frozen = set(own)
+                # frozen dicts check every access, so only they are slower than a dict
+                per_player.__class__ = _FrozenPlayerDict
+        return per_player, cls(shared)
+
+    def materialize(self) -> None:
+        """Clones the containers of all players that are still shared."""
+        if self.shared is None and not self.frozen:
+            return
+        with _copy_on_write_lock:
+            shared = self.shared
+            if shared is not None:
+                for player, value in shared.items():
+                    if not dict.__contains__(self, player):
+                        dict.__setitem__(self, player, value.copy())
+                self.shared = None
+            for player in self.frozen:
+                dict.__setitem__(self, player, dict.__getitem__(self, player).copy())
+            self.frozen = set()
+            self.__class__ = PlayerCopyOnWriteDict
+
+    def __missing__(self, player: int) -> PlayerValue:
+        shared = self.shared
+        if shared is None or player not in shared:
+            raise KeyError(player)
+        with _copy_on_write_lock:
+            # another thread may have cloned it in the meantime
+            if dict.__contains__(self, player):
+                return dict.__getitem__(self, player)
+            value = shared[player].copy()
+            dict.__setitem__(self, player, value)
+        return value
+
+    # anything other than item access needs all players
+    def __contains__(self, player: object) -> bool:
+        self.materialize()
+        return dict.__contains__(self, player)
+
+    def __iter__(self) -> Iterator[int]:
+        self.materialize()
+        return dict.__iter__(self)
+
+    def __len__(self) -> int:
+        self.materialize()
+        return dict.__len__(self)
+
+    def __eq__(self, other: object) -> bool:
+        self.materialize()
+        if isinstance(other, PlayerCopyOnWriteDict):
+            other.materialize()
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other: object) -> bool:
+        return not self.__eq__(other)
+
+    def __repr__(self) -> str:
+        self.materialize()
+        return dict.__repr__(self)
+
+    def get(self, player: int, default: Any = None) -> Any:
+        try:
+            return self[player]
+        except KeyError:
+            return default
+
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+
+    def setdefault(self, player: int, default: PlayerValue) -> PlayerValue:
+        self.materialize()
+        return dict.setdefault(self, player, default)
+
+    def pop(self, player: int, *default: Any) -> Any:
+        self.materialize()
+        return dict.pop(self, player, *default)
+
+    def copy(self) -> Dict[int, PlayerValue]:
+        self.materialize()
+        return dict(self)
+
+
+class _FrozenPlayerDict(PlayerCopyOnWriteDict[PlayerValue]):
+    """A PlayerCopyOnWriteDict whose containers are shared with a copy of it, until it cloned all of them."""
+    __slots__ = ()
+
+    def __getitem__(self, player: int) -> PlayerValue:
+        if player not in self.frozen:
+            return dict.__getitem__(self, player)
+        with _copy_on_write_lock:
+            # another thread may have cloned it in the meantime
+            if player in self.frozen:
+                dict.__setitem__(self, player, dict.__getitem__(self, player).copy())
+                self.frozen.discard(player)
+                if not self.frozen:
+                    self.__class__ = PlayerCopyOnWriteDict
+            return dict.__getitem__(self, player)
+
+    def __setitem__(self, player: int, value: PlayerValue) -> None:
+        with _copy_on_write_lock:
+            dict.__setitem__(self, player, value)
+            self.frozen.discard(player)
+            if not self.frozen:
+                self.__class__ = PlayerCopyOnWriteDict
 
 
 class CollectionState():
@@ -729,6 +978,9 @@ class CollectionState():
     locations_checked: Set[Location]
     """Internal cache for Advancement Locations already checked by this CollectionState. Not for use in logic."""
     stale: Dict[int, bool]
+    collected_since_update: Dict[int, Set[str]]
+    """Internal cache of item names collected since each player's reachable regions were last updated.
+    Not for use in logic."""
     allow_partial_entrances: bool
     additional_init_functions: List[Callable[[CollectionState, MultiWorld], None]] = []
     additional_copy_functions: List[Callable[[CollectionState, CollectionState], CollectionState]] = []
@@ -743,6 +995,7 @@ class CollectionState():
         self.path = {}
         self.locations_checked = set()
         self.stale = {player: True for player in parent.get_all_ids()}
+        self.collected_since_update = {player: set() for player in parent.get_all_ids()}
         self.allow_partial_entrances = allow_partial_entrances
         for function in self.additional_init_functions:
             function(self, parent)
@@ -754,7 +1007,17 @@ class CollectionState():
         self.stale[player] = False
         world: AutoWorld.World = self.multiworld.worlds[player]
         reachable_regions = self.reachable_regions[player]
-        queue = deque(self.blocked_connections[player])
+        # Entrances with opaque rules can change at any time, but the rules of the others can only change when an item
+        # they depend on is collected, so the BFS only has to start from those.
+        incremental = world.incremental_reachability and not self.allow_partial_entrances
+        collected = self.collected_since_update[player]
+        if incremental and collected:
+            queue = deque(connection for connection in self.blocked_connections[player]
+                          if connection.may_depend_on(collected))
+        else:
+            # nothing collected means the state was made stale by something else, so everything is rechecked
+            queue = deque(self.blocked_connections[player])
+        collected.clear()
         start: Region = world.get_region(world.origin_region_name)
 
         # init on first call - this can't be done on construction since the regions don't exist yet
@@ -766,7 +1029,7 @@ class CollectionState():
         if world.explicit_indirect_conditions:
             self._update_reachable_regions_explicit_indirect_conditions(player, queue)
         else:
-            self._update_reachable_regions_auto_indirect_conditions(player, queue)
+            self._update_reachable_regions_auto_indirect_conditions(player, queue, incremental)
 
     def _update_reachable_regions_explicit_indirect_conditions(self, player: int, queue: deque[Entrance]):
         reachable_regions = self.reachable_regions[player]
@@ -795,7 +1058,8 @@ class CollectionState():
                     relevant_entrances.difference_update(queue)
                     queue.extend(relevant_entrances)
 
-    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance]):
+    def _update_reachable_regions_auto_indirect_conditions(self, player: int, queue: deque[Entrance],
+                                                           incremental: bool = False):
         reachable_regions = self.reachable_regions[player]
         blocked_connections = self.blocked_connections[player]
         new_connection: bool = True
@@ -819,19 +1083,30 @@ class CollectionState():
                     new_connection = True
                     self.multiworld.worlds[player].reached_region(self, new_region)
             # sweep for indirect connections, mostly Entrance.can_reach(unrelated_Region)
-            queue.extend(blocked_connections)
+            if incremental:
+                # no items are collected during the BFS, so only opaque rules can have changed since they were checked
+                queue.extend(connection for connection in blocked_connections
+                             if connection.get_item_dependencies() is None)
+            else:
+                queue.extend(blocked_connections)
 
     def copy(self) -> CollectionState:
-        ret = CollectionState(self.multiworld)
-        ret.prog_items = {player: counter.copy() for player, counter in self.prog_items.items()}
-        ret.reachable_regions = {player: region_set.copy() for player, region_set in
-                                 self.reachable_regions.items()}
-        ret.blocked_connections = {player: entrance_set.copy() for player, entrance_set in
-                                   self.blocked_connections.items()}
+        # The constructor is skipped, as it would create and collect into containers that get replaced right away.
+        ret = CollectionState.__new__(CollectionState)
+        ret.multiworld = self.multiworld
+        # per-player containers are shared until either state uses a player, see PlayerCopyOnWriteDict
+        self.prog_items, ret.prog_items = PlayerCopyOnWriteDict.share(self.prog_items)
+        self.reachable_regions, ret.reachable_regions = PlayerCopyOnWriteDict.share(self.reachable_regions)
+        self.blocked_connections, ret.blocked_connections = PlayerCopyOnWriteDict.share(self.blocked_connections)
+        self.collected_since_update, ret.collected_since_update = \
+            PlayerCopyOnWriteDict.share(self.collected_since_update)
         ret.advancements = self.advancements.copy()
         ret.path = self.path.copy()
         ret.locations_checked = self.locations_checked.copy()
+        ret.stale = dict.fromkeys(self.stale, True)
         ret.allow_partial_entrances = self.allow_partial_entrances
+        for function in self.additional_init_functions:
+            function(ret, self.multiworld)
         for function in self.additional_copy_functions:
             ret = function(self, ret)
         return ret
@@ -871,6 +1146,8 @@ class CollectionState():
         """
         The implementation for sweep_for_advancements is separated here because it returns a generator due to the use
         of a yield statement.
+
+        _speedups.sweep_for_advancements is a compiled version of this, any change here has to be mirrored there.
         """
         all_players = {player for player, _ in advancements_per_player}
         players_to_check = all_players
@@ -984,13 +1261,18 @@ class CollectionState():
             advancements_per_player = list(advancements_per_player_dict.items())
             del advancements_per_player_dict
 
+        if compiled_sweep_for_advancements is None:
+            sweep = self._sweep_for_advancements_impl(advancements_per_player, yield_each_sweep)
+        else:
+            sweep = compiled_sweep_for_advancements(self, advancements_per_player, yield_each_sweep)
+
         if yield_each_sweep:
             # Return a generator that will yield at the end of each sweep iteration.
-            return self._sweep_for_advancements_impl(advancements_per_player, True)
+            return sweep
         else:
-            # Create the generator, but tell it not to yield anything, so it will run to completion in zero iterations
-            # once started, then start and exhaust the generator by attempting to iterate it.
-            for _ in self._sweep_for_advancements_impl(advancements_per_player, False):
+            # The generator was told not to yield anything, so it will run to completion in zero iterations once
+            # started, so start and exhaust the generator by attempting to iterate it.
+            for _ in sweep:
                 assert False, "Generator yielded when it should have run to completion without yielding"
             return None
 
@@ -1122,6 +1404,8 @@ class CollectionState():
         changed = self.multiworld.worlds[item.player].collect(self, item)
 
         self.stale[item.player] = True
+        if changed:
+            self.collected_since_update[item.player].add(item.name)
 
         if changed and not prevent_sweep:
             self.sweep_for_advancements()
@@ -1145,6 +1429,7 @@ class CollectionState():
             # invalidate caches, nothing can be trusted anymore now
             self.reachable_regions[item.player] = set()
             self.blocked_connections[item.player] = set()
+            self.collected_since_update[item.player].clear()
             self.stale[item.player] = True
 
     def remove_item(self, item: str, player: int, count: int = 1) -> None:
@@ -1193,6 +1478,8 @@ class Entrance:
     connected_region: Optional[Region] = None
     randomization_group: int
     randomization_type: EntranceType
+    _item_dependencies_rule: Optional[CollectionRule] = None
+    _item_dependencies: Optional[FrozenSet[str]] = None
 
     def __init__(self, player: int, name: str = "", parent: Optional[Region] = None,
                  randomization_group: int = 0, randomization_type: EntranceType = EntranceType.ONE_WAY) -> None:
@@ -1211,6 +1498,25 @@ class Entrance:
 
         return False
 
+    def get_item_dependencies(self) -> Optional[FrozenSet[str]]:
+        """
+        Returns the names of the items whose collection can change the result of access_rule, as reported by
+        World.get_rule_item_dependencies, or None if the rule has to be rechecked whenever the state changes.
+        """
+        rule = self.access_rule
+        if rule is not self._item_dependencies_rule:
+            assert self.parent_region and self.parent_region.multiworld, \
+                f"called get_item_dependencies on an Entrance \"{self}\" with no parent_region"
+            world = self.parent_region.multiworld.worlds[self.player]
+            self._item_dependencies = world.get_rule_item_dependencies(rule)
+            self._item_dependencies_rule = rule
+        return self._item_dependencies
+
+    def may_depend_on(self, item_names: AbstractSet[str]) -> bool:
+        """Returns whether collecting any of the given item names may have changed the result of access_rule."""
+        item_dependencies = self.get_item_dependencies()
+        return item_dependencies is None or not item_dependencies.isdisjoint(item_names)
+
     def connect(self, region: Region) -> None:
         self.connected_region = region
         region.entrances.append(self)
@@ -1707,22 +2013,21 @@ class Spoiler:
         prog_locations = {location for location in multiworld.get_filled_locations() if location.item.advancement}
         state_cache: List[Optional[CollectionState]] = [None]
         collection_spheres: List[Set[Location]] = []
-        state = CollectionState(multiworld)
         sphere_candidates = set(prog_locations)
         logging.debug('Building up collection spheres.')
+        # build up spheres of collection radius.
+        # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
+        # The spheres of all placements are shared with other post-fill steps. Items that aren't progression don't
+        # change the state, so the progression locations in them make up the spheres of progression.
+        analysis = multiworld.get_sphere_analysis()
+        analysis_spheres = iter(analysis.spheres)
         while sphere_candidates:
-
-            # build up spheres of collection radius.
-            # Everything in each sphere is independent from each other in dependencies and only depends on lower spheres
-
-            sphere = {location for location in sphere_candidates if state.can_reach(location)}
-
-            for location in sphere:
-                state.collect(location.item, True, location)
+            sphere = set(next(analysis_spheres, frozenset()) & sphere_candidates)
+            state = analysis.get_state(len(collection_spheres) + 1 if sphere else len(collection_spheres))
 
             sphere_candidates -= sphere
             collection_spheres.append(sphere)
-            state_cache.append(state.copy())
+            state_cache.append(state)
 
             logging.debug('Calculated sphere %i, containing %i of %i progress items.', len(collection_spheres),
                           len(sphere),
@@ -51,6 +51,9 @@ def mystery_argparse(argv: list[str] | None = None) -> argparse.Namespace:
                         help="Output rolled player options to csv (made for async multiworld).")
     parser.add_argument("--plando", default=defaults.plando_options,
                         help="List of options that can be set manually. Can be combined, for example \"bosses, items\"")
+    parser.add_argument("--parallel_world_stages", default=defaults.parallel_world_stages, type=int,
+                        help="Amount of worker processes to run the steps of worlds that support it in. "
+                             "0 runs every world in the main process.")
     parser.add_argument("--skip_prog_balancing", action="store_true",
                         help="Skip progression balancing step during generation.")
     parser.add_argument("--skip_output", action="store_true",
@@ -7,7 +7,6 @@ import tempfile
 import time
 from typing import Any
 import zipfile
-import zlib
 
 import worlds
 from BaseClasses import CollectionState, Item, Location, LocationProgressType, MultiWorld
@@ -15,7 +14,7 @@ from Fill import FillError, balance_multiworld_progression, distribute_items_res
     parse_planned_blocks, distribute_planned_blocks, resolve_early_locations_for_planned
 from NetUtils import convert_to_base_types
 from Options import StartInventoryPool
-from Utils import __version__, output_path, restricted_dumps, version_tuple
+from Utils import __version__, compression_available, output_path, version_tuple
 from settings import get_settings
 from worlds import AutoWorld
 from worlds.generic.Rules import exclusion_rules, locality_rules
@@ -73,7 +72,9 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
     if not args.skip_output and not args.spoiler_only:
         AutoWorld.call_stage(multiworld, "assert_generate")
 
-    AutoWorld.call_all(multiworld, "generate_early")
+    # worlds with isolated_generation can run their steps up to set_rules in worker processes
+    processes: int = getattr(args, "parallel_world_stages", 0)
+    AutoWorld.call_all_isolated(multiworld, "generate_early", processes)
 
     logger.info('')
 
@@ -109,13 +110,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
         multiworld.worlds[1].options.local_items.value = set()
 
     logger.info('Creating MultiWorld.')
-    AutoWorld.call_all(multiworld, "create_regions")
+    AutoWorld.call_all_isolated(multiworld, "create_regions", processes)
 
     logger.info('Creating Items.')
-    AutoWorld.call_all(multiworld, "create_items")
+    AutoWorld.call_all_isolated(multiworld, "create_items", processes)
 
     logger.info('Calculating Access Rules.')
-    AutoWorld.call_all(multiworld, "set_rules")
+    AutoWorld.call_all_isolated(multiworld, "set_rules", processes)
 
     for player in multiworld.player_ids:
         exclusion_rules(multiworld, player, multiworld.worlds[player].options.exclude_locations.value)
@@ -353,11 +354,13 @@ def main(args, seed=None, baked_server_options: dict[str, object] | None = None)
                 for key in ("slot_data", "er_hint_data"):
                     multidata[key] = convert_to_base_types(multidata[key])
 
-                serialized_multidata = zlib.compress(restricted_dumps(multidata), 9)
-
+                compression = get_settings().generator.multidata_compression
+                if not compression_available(compression):
+                    logger.warning(f"Multidata compression {compression} is not available, using zlib instead.")
+                    compression = "zlib"
+                indexed = bool(get_settings().generator.indexed_multidata)
                 with open(os.path.join(temp_dir, f'{outfilebase}.archipelago'), 'wb') as f:
-                    f.write(bytes([3]))  # version of format
-                    f.write(serialized_multidata)
+                    NetUtils.dump_multidata(multidata, f, compression, indexed)
 
             output_file_futures.append(pool.submit(write_multidata))
             if not check_accessibility_task.result():
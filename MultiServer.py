@@ -9,6 +9,7 @@ import datetime
 import functools
 import hashlib
 import inspect
+import io
 import itertools
 import logging
 import math
@@ -16,6 +17,7 @@ import operator
 import pickle
 import random
 import shlex
+import struct
 import threading
 import time
 import typing
@@ -28,6 +30,7 @@ import ModuleUpdate
 ModuleUpdate.update()
 
 if typing.TYPE_CHECKING:
+    import mmap
     import ssl
     from NetUtils import ServerConnection
 
@@ -140,6 +143,66 @@ def get_saving_second(seed_name: str, interval: int = 60) -> int:
     return int(hashlib.sha256(seed_name.encode()).hexdigest(), 16) % interval
 
 
+def write_save_journal_record(file: typing.BinaryIO, record: typing.Any) -> int:
+    """Appends a length prefixed, compressed record to a save journal and returns its size."""
+    # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+    data = zlib.compress(pickle.dumps(record))
+    file.write(struct.pack("<I", len(data)) + data)
+    return 4 + len(data)
+
+
+def read_save_journal_records(file: typing.BinaryIO) -> typing.Iterator[typing.Tuple[int, typing.Any]]:
+    """Yields the records of a save journal with the offset they end at, up to a record that was cut off."""
+    offset = 0
+    while len(header := file.read(4)) == 4:
+        size, = struct.unpack("<I", header)
+        data = file.read(size)
+        if len(data) != size:
+            return
+        try:
+            record = restricted_loads(zlib.decompress(data))
+        except Exception:
+            return
+        offset += 4 + size
+        yield offset, record
+
+
+network_message = typing.Dict[str, typing.Any]
+
+
+class OutgoingMsgs:
+    """Messages to send to one or more clients, encoded once for all of them.
+
+    RoomUpdates are encoded when they are written, so ones queued right after them can be merged into them."""
+    __slots__ = ("msgs", "_encoded")
+
+    msgs: typing.List[network_message]
+    _encoded: str | None
+
+    def __init__(self, msgs: typing.Iterable[network_message]) -> None:
+        # copied, as callers may reuse their list once it is sent
+        self.msgs = list(msgs)
+        self._encoded = None
+
+    @property
+    def is_room_update(self) -> bool:
+        return len(self.msgs) == 1 and self.msgs[0]["cmd"] == "RoomUpdate"
+
+    def encode(self, dumper: typing.Callable[[typing.Any], str]) -> str:
+        if self._encoded is None:
+            self._encoded = dumper(self.msgs)
+        return self._encoded
+
+    def merge(self, other: OutgoingMsgs) -> OutgoingMsgs:
+        """Combines two RoomUpdates into one, with the fields of the other one taking precedence."""
+        old, new = self.msgs[0], other.msgs[0]
+        msg = {**old, **new}
+        if "checked_locations" in old and "checked_locations" in new:
+            msg["checked_locations"] = list(dict.fromkeys(
+                itertools.chain(old["checked_locations"], new["checked_locations"])))
+        return OutgoingMsgs([msg])
+
+
 class Client(Endpoint):
     __slots__ = (
         "__weakref__",
@@ -156,6 +219,8 @@ class Client(Endpoint):
         "no_items",
         "no_locations",
         "no_text",
+        "outgoing",
+        "outgoing_writer",
     )
 
     version: Version
@@ -171,6 +236,9 @@ class Client(Endpoint):
     no_items: bool
     no_locations: bool
     no_text: bool
+    outgoing: typing.Deque[typing.Union[str, OutgoingMsgs]]
+    """encoded messages waiting to be sent by outgoing_writer"""
+    outgoing_writer: asyncio.Task[None] | None
 
     def __init__(self, socket: "ServerConnection", ctx: Context) -> None:
         super().__init__(socket)
@@ -187,6 +255,8 @@ class Client(Endpoint):
         self.no_items = False
         self.no_locations = False
         self.no_text = False
+        self.outgoing = collections.deque()
+        self.outgoing_writer = None
 
     @property
     def items_handling(self):
@@ -213,6 +283,85 @@ class Client(Endpoint):
 team_slot = typing.Tuple[int, int]
 
 
+class DataStorage:
+    """Keys and values clients write with Set, read with Get and follow with SetNotify.
+
+    Each key counts the Sets on it since the server started as its version. With a quota, the size of a key's value,
+    approximated with pickle, is accounted to the slot that created it, or the first one to set it after loading.
+    SetNotify keys ending in "*" follow every key starting with the text before the "*"."""
+
+    data: typing.Dict[str, typing.Any]
+    versions: typing.Dict[str, int]
+    quota: int
+    """maximum total size in bytes of the keys accounted to one slot, 0 for no limit"""
+    owners: typing.Dict[str, team_slot]
+    sizes: typing.Dict[str, int]
+    slot_sizes: typing.Counter[team_slot]
+    subscribers: typing.Dict[str, weakref.WeakSet[Client]]
+    prefix_subscribers: typing.Dict[str, weakref.WeakSet[Client]]
+    prefix_lengths: typing.Set[int]
+
+    def __init__(self, quota: int = 0) -> None:
+        self.data = {}
+        self.versions = {}
+        self.quota = quota
+        self.owners = {}
+        self.sizes = {}
+        self.slot_sizes = collections.Counter()
+        self.subscribers = {}
+        self.prefix_subscribers = {}
+        self.prefix_lengths = set()
+
+    def load(self, data: typing.Dict[str, typing.Any]) -> None:
+        self.data = data
+        self.owners.clear()
+        self.sizes.clear()
+        self.slot_sizes.clear()
+
+    def apply(self, slot: team_slot, key: str, default: typing.Any,
+              operations: typing.List[network_message]) -> typing.Optional[typing.Tuple[typing.Any, typing.Any]]:
+        """Applies the operations of a Set to a key, returning its original and new value,
+        or None if that would exceed the quota of the key's slot, in which case the key is left unchanged."""
+        value = self.data.get(key, default)
+        original_value = copy.copy(value)
+        for operation in operations:
+            func = modify_functions[operation["operation"]]
+            value = func(value, operation["value"])
+        if self.quota:
+            owner = self.owners.get(key, slot)
+            size = len(pickle.dumps(value))
+            old_size = self.sizes.get(key, 0)
+            if size > old_size and self.slot_sizes[owner] + size - old_size > self.quota:
+                if key in self.data:
+                    # operations like update change the value in place
+                    self.data[key] = original_value
+                return None
+            self.owners[key] = owner
+            self.sizes[key] = size
+            self.slot_sizes[owner] += size - old_size
+        self.data[key] = value
+        self.versions[key] = self.versions.get(key, 0) + 1
+        return original_value, value
+
+    def subscribe(self, client: Client, key: str) -> None:
+        if key.endswith("*"):
+            key = key[:-1]
+            self.prefix_lengths.add(len(key))
+            subscribers = self.prefix_subscribers
+        else:
+            subscribers = self.subscribers
+        if key not in subscribers:
+            subscribers[key] = weakref.WeakSet()
+        subscribers[key].add(client)
+
+    def get_subscribers(self, key: str) -> typing.Set[Client]:
+        targets = set(self.subscribers.get(key, ()))
+        for length in self.prefix_lengths:
+            if length <= len(key) and key[:length] in self.prefix_subscribers:
+                targets.update(self.prefix_subscribers[key[:length]])
+        return targets
+
+
 class Context:
     dumper = staticmethod(encode)
     loader = staticmethod(decode)
@@ -235,9 +384,10 @@ class Context:
     hints_used: typing.Dict[typing.Tuple[int, int], int]
     groups: typing.Dict[int, typing.Set[int]]
     save_version = 2
-    stored_data: typing.Dict[str, object]
+    data_storage: DataStorage
     read_data: typing.Dict[str, object]
-    stored_data_notification_clients: typing.Dict[str, typing.Set[Client]]
+    changed_read_data: typing.Dict[str, typing.Callable[[], object]]
+    """_read_ keys to notify of their value at the end of this event loop tick"""
     slot_info: typing.Dict[int, NetworkSlot]
     generator_version = Version(0, 0, 0)
     checksums: typing.Dict[str, str]
@@ -248,24 +398,39 @@ class Context:
     all_item_and_group_names: typing.Dict[str, typing.Set[str]]
     all_location_and_group_names: typing.Dict[str, typing.Set[str]]
     non_hintable_names: typing.Dict[str, typing.AbstractSet[str]]
-    spheres: typing.List[typing.Dict[int, typing.Set[int]]]
+    spheres: typing.Sequence[typing.Mapping[int, typing.Set[int]]]
     """ each sphere is { player: { location_id, ... } } """
+    max_frame_size: typing.ClassVar[int] = 64 * 1024
+    """size up to which queued messages are joined into one websocket message, larger ones are sent on their own"""
+    sphere_index: NetUtils.SphereIndex
+    save_journal_categories: typing.ClassVar[typing.Tuple[str, ...]] = (
+        "location_checks", "hints", "hints_used", "stored_data", "name_aliases", "client_game_state",
+        "client_activity_timers", "client_connection_timers", "group_collected")
+    """save data that is written to the save journal by the keys passed to mark_unsaved"""
+    min_save_journal_compaction_size = 1024 * 1024
+    """size in bytes the save journal has to exceed, along with the size of the full save, to be compacted"""
     logger: logging.Logger
 
     def __init__(self, host: str, port: int, server_password: str, password: str, location_check_points: int,
                  hint_cost: int, item_cheat: bool, release_mode: str = "disabled", collect_mode="disabled",
                  countdown_mode: str = "auto", remaining_mode: str = "disabled", auto_shutdown: typing.SupportsFloat = 0, 
-                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger()):
+                 compatibility: int = 2, log_network: bool = False, logger: logging.Logger = logging.getLogger(),
+                 max_backlog: int = 10000, datastorage_quota: int = 0):
         self.logger = logger
         super(Context, self).__init__()
         self.slot_info = {}
         self.log_network = log_network
+        self.max_backlog = max_backlog
+        self.outgoing_backlog_peak = 0
         self.endpoints = []
         self.clients = {}
         self.compatibility: int = compatibility
         self.shutdown_task = None
         self.data_filename = None
-        self.save_filename = None
+        self.indexed_multidata: typing.Optional[NetUtils.IndexedMultiData] = None
+        self.multidata_mapping: typing.Optional[mmap.mmap] = None
+        """file the indexed multidata is loaded from, until the server shuts down"""
+        self.save_filename: typing.Optional[str] = None
         self.saving = False
         self.player_names: typing.Dict[team_slot, str] = {}
         self.player_name_lookup: typing.Dict[str, team_slot] = {}
@@ -277,7 +442,10 @@ class Context:
         self.password = password
         self.server = None
         self.countdown_timer = 0
-        self.received_items = {}
+        self.received_items: typing.Dict[typing.Tuple[int, int, bool], typing.List[NetworkItem]] = {}
+        self.new_items_slots: typing.Set[team_slot] = set()
+        """slots that received items which were not sent to their clients yet"""
+        self.new_items_handle: typing.Optional[asyncio.Handle] = None
         self.start_inventory = {}
         self.name_aliases: typing.Dict[team_slot, str] = {}
         self.location_checks = collections.defaultdict(set)
@@ -285,6 +453,8 @@ class Context:
         self.location_check_points = location_check_points
         self.hints_used = collections.defaultdict(int)
         self.hints: typing.Dict[team_slot, typing.Set[Hint]] = collections.defaultdict(set)
+        self.location_hints: typing.Dict[typing.Tuple[int, int, int], typing.Set[Hint]] = collections.defaultdict(set)
+        """(team, finding player, location) -> hints of that location, so checking it only updates those hints"""
         self.release_mode: str = release_mode
         self.remaining_mode: str = remaining_mode
         self.collect_mode: str = collect_mode
@@ -304,6 +474,16 @@ class Context:
         self.auto_save_interval = 60  # in seconds
         self.auto_saver_thread: typing.Optional[threading.Thread] = None
         self.save_dirty = False
+        self.save_generation = 0
+        """counts full saves, each of which starts a new save journal"""
+        self.save_journal_size: typing.Optional[int] = None
+        """size of the save journal in bytes, None if the next save has to be a full save"""
+        self.full_save_size = 0
+        self.unsaved: typing.Dict[str, typing.Set[typing.Any]] = collections.defaultdict(set)
+        """keys of save_journal_categories that changed since the last save"""
+        self.unsaved_lock = threading.Lock()
+        self.saved_received_items: typing.Dict[typing.Tuple[int, int, bool], int] = {}
+        """length of each received items list as of the last save"""
         self.tags = ['AP']
         self.games: typing.Dict[int, str] = {}
         self.minimum_client_versions: typing.Dict[int, Version] = {}
@@ -311,10 +491,12 @@ class Context:
         self.groups = {}
         self.group_collected: typing.Dict[int, typing.Set[int]] = {}
         self.random = random.Random()
-        self.stored_data = {}
-        self.stored_data_notification_clients = collections.defaultdict(weakref.WeakSet)
+        self.data_storage = DataStorage(datastorage_quota)
         self.read_data = {}
+        self.changed_read_data = {}
+        self.read_data_handle: typing.Optional[asyncio.Handle] = None
         self.spheres = []
+        self.sphere_index = NetUtils.SphereIndex(self.spheres)
 
         # init empty to satisfy linter, I suppose
         self.gamespackage = {}
@@ -344,9 +526,9 @@ class Context:
             self.non_hintable_names[world_name] = world.hint_blacklist
 
         for game_package in self.gamespackage.values():
-            # remove groups from data sent to clients
-            del game_package["item_name_groups"]
-            del game_package["location_name_groups"]
+            # remove groups from data sent to clients, which a previous Context may have done already
+            game_package.pop("item_name_groups", None)
+            game_package.pop("location_name_groups", None)
 
     def _init_game_data(self):
         for game_name, game_package in self.gamespackage.items():
@@ -375,77 +557,116 @@ class Context:
         return self.gamespackage[game]["location_name_to_id"] if game in self.gamespackage else None
 
     # General networking
-    async def send_msgs(self, endpoint: Endpoint, msgs: typing.Iterable[dict]) -> bool:
+    async def send_msgs(self, endpoint: Endpoint,
+                        msgs: typing.Union[typing.Iterable[network_message], OutgoingMsgs]) -> bool:
+        return self.queue_msgs(endpoint, self.to_outgoing(msgs))
+
+    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
+        return self.queue_msgs(endpoint, msg)
+
+    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
+        self.broadcast_queue_msgs(endpoints, msg)
+        return True
+
+    @staticmethod
+    def to_outgoing(msgs: typing.Union[typing.Iterable[network_message], OutgoingMsgs]) -> OutgoingMsgs:
+        return msgs if isinstance(msgs, OutgoingMsgs) else OutgoingMsgs(msgs)
+
+    def broadcast_queue_msgs(self, endpoints: typing.Iterable[Endpoint],
+                             msg: typing.Union[str, OutgoingMsgs]) -> None:
+        for endpoint in endpoints:
+            self.queue_msgs(endpoint, msg)
+
+    def queue_msgs(self, endpoint: Client, msg: typing.Union[str, OutgoingMsgs]) -> bool:
+        """Queues encoded messages to be sent to the endpoint after the ones queued before them, returning False
+        if the endpoint is not connected or is disconnected for having more than max_backlog messages queued."""
         if not endpoint.socket or not endpoint.socket.open:
             return False
-        msg = self.dumper(msgs)
-        try:
-            await endpoint.socket.send(msg)
-        except websockets.ConnectionClosed:
-            self.logger.exception(f"Exception during send_msgs, could not send {msg}")
-            await self.disconnect(endpoint)
+        outgoing = endpoint.outgoing
+        if isinstance(msg, OutgoingMsgs) and not msg.is_room_update:
+            # encoded right away, as the messages may refer to data that changes before they are sent
+            msg = msg.encode(self.dumper)
+        if isinstance(msg, OutgoingMsgs) and outgoing and isinstance(outgoing[-1], OutgoingMsgs):
+            # RoomUpdates are only queued as OutgoingMsgs and the writer only takes messages out of the queue
+            # to send them, so both are unsent RoomUpdates
+            outgoing[-1] = outgoing[-1].merge(msg)
+        elif len(outgoing) >= self.max_backlog:
+            self.logger.warning(f"Disconnecting {endpoint.name if endpoint.auth else 'client'} "
+                                f"for having more than {self.max_backlog} messages queued.")
+            outgoing.clear()
+            async_start(endpoint.socket.close(1008, "Too many messages queued"))
             return False
         else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+            outgoing.append(msg)
+            self.outgoing_backlog_peak = max(self.outgoing_backlog_peak, len(outgoing))
+        if not endpoint.outgoing_writer:
+            endpoint.outgoing_writer = asyncio.create_task(self.write_outgoing(endpoint))
+        return True
 
-    async def send_encoded_msgs(self, endpoint: Endpoint, msg: str) -> bool:
-        if not endpoint.socket or not endpoint.socket.open:
-            return False
+    def get_outgoing_frame(self, outgoing: typing.Deque[typing.Union[str, OutgoingMsgs]]) -> str:
+        """Takes consecutive queued messages up to max_frame_size and joins them into one message list."""
+        frames = []
+        size = 0
+        while outgoing:
+            frame = outgoing[0]
+            if isinstance(frame, OutgoingMsgs):
+                frame = frame.encode(self.dumper)
+            if frames and size + len(frame) > self.max_frame_size:
+                break
+            outgoing.popleft()
+            frames.append(frame)
+            size += len(frame)
+        if len(frames) == 1:
+            return frames[0]
+        return "[" + ",".join(frame[1:-1] for frame in frames if len(frame) > 2) + "]"
+
+    async def write_outgoing(self, endpoint: Client) -> None:
+        """Sends the endpoint's queued messages until there are none left, waiting for the socket to accept them."""
         try:
-            await endpoint.socket.send(msg)
+            while endpoint.outgoing and endpoint.socket.open:
+                msg = self.get_outgoing_frame(endpoint.outgoing)
+                await endpoint.socket.send(msg)
+                if self.log_network:
+                    self.logger.info(f"Outgoing message: {msg}")
         except websockets.ConnectionClosed:
-            self.logger.exception("Exception during send_encoded_msgs")
+            self.logger.exception("Exception during write_outgoing")
+            endpoint.outgoing.clear()
             await self.disconnect(endpoint)
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing message: {msg}")
-            return True
+        finally:
+            endpoint.outgoing_writer = None
 
-    async def broadcast_send_encoded_msgs(self, endpoints: typing.Iterable[Endpoint], msg: str) -> bool:
-        sockets = []
-        for endpoint in endpoints:
-            if endpoint.socket and endpoint.socket.open:
-                sockets.append(endpoint.socket)
-        try:
-            websockets.broadcast(sockets, msg)
-        except RuntimeError:
-            self.logger.exception("Exception during broadcast_send_encoded_msgs")
-            return False
-        else:
-            if self.log_network:
-                self.logger.info(f"Outgoing broadcast: {msg}")
-            return True
+    def get_outgoing_backlog(self) -> typing.Tuple[int, int]:
+        """Returns the amount of queued messages of all clients and of the client with the most."""
+        depths = [len(endpoint.outgoing) for endpoint in self.endpoints]
+        return sum(depths), max(depths, default=0)
 
-    def broadcast_all(self, msgs: typing.List[dict]):
-        msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
+    def broadcast_all(self, msgs: typing.Union[typing.List[network_message], OutgoingMsgs]):
+        data = self.to_outgoing(msgs)
+        msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in data.msgs)
         endpoints = (
             endpoint
             for endpoint in self.endpoints
             if endpoint.auth and not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast_queue_msgs(endpoints, data)
 
     def broadcast_text_all(self, text: str, additional_arguments: dict = {}):
         self.logger.info("Notice (all): %s" % text)
         self.broadcast_all([{**{"cmd": "PrintJSON", "data": [{ "text": text }]}, **additional_arguments}])
 
-    def broadcast_team(self, team: int, msgs: typing.List[dict]):
-        msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in msgs)
-        data = self.dumper(msgs)
+    def broadcast_team(self, team: int, msgs: typing.Union[typing.List[network_message], OutgoingMsgs]):
+        data = self.to_outgoing(msgs)
+        msg_is_text = all(msg["cmd"] == "PrintJSON" for msg in data.msgs)
         endpoints = (
             endpoint
             for endpoint in itertools.chain.from_iterable(self.clients[team].values())
             if not (msg_is_text and endpoint.no_text)
         )
-        async_start(self.broadcast_send_encoded_msgs(endpoints, data))
+        self.broadcast_queue_msgs(endpoints, data)
 
-    def broadcast(self, endpoints: typing.Iterable[Client], msgs: typing.List[dict]):
-        msgs = self.dumper(msgs)
-        async_start(self.broadcast_send_encoded_msgs(endpoints, msgs))
+    def broadcast(self, endpoints: typing.Iterable[Client],
+                  msgs: typing.Union[typing.List[network_message], OutgoingMsgs]):
+        self.broadcast_queue_msgs(endpoints, self.to_outgoing(msgs))
 
     async def disconnect(self, endpoint: Client):
         if endpoint in self.endpoints:
@@ -474,23 +695,35 @@ class Context:
             with zipfile.ZipFile(multidatapath) as zf:
                 for file in zf.namelist():
                     if file.endswith(".archipelago"):
-                        data = zf.read(file)
+                        decoded_obj = NetUtils.open_multidata(zf.read(file))
                         break
                 else:
                     raise Exception("No .archipelago found in archive.")
         else:
             with open(multidatapath, 'rb') as f:
-                data = f.read()
+                if f.read(1) == bytes([NetUtils.IndexedMultiData.format_version]):
+                    import mmap
+                    # indexed multidata keeps per-slot sections in the mapped file until they are used
+                    self.multidata_mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    self.indexed_multidata = NetUtils.IndexedMultiData(self.multidata_mapping)
+                    decoded_obj = self.indexed_multidata.load(lazy=True)
+                else:
+                    f.seek(0)
+                    decoded_obj = NetUtils.load_multidata(f)
 
-        self._load(self.decompress(data), {}, use_embedded_server_options)
+        self._load(decoded_obj, {}, use_embedded_server_options)
         self.data_filename = multidatapath
 
+    def close_multidata(self) -> None:
+        """Closes the memory-mapped multidata file, if any. Slot sections that weren't used yet can't be loaded then."""
+        if self.indexed_multidata is not None and self.multidata_mapping is not None:
+            self.indexed_multidata.release()
+            self.multidata_mapping.close()
+            self.indexed_multidata = self.multidata_mapping = None
+
     @staticmethod
     def decompress(data: bytes) -> dict:
-        format_version = data[0]
-        if format_version > 3:
-            raise Utils.VersionException("Incompatible multidata.")
-        return restricted_loads(zlib.decompress(data[1:]))
+        return NetUtils.load_multidata(io.BytesIO(data))
 
     def _load(self, decoded_obj: MultiData, game_data_packages: typing.Dict[str, typing.Any],
               use_embedded_server_options: bool):
@@ -528,7 +761,7 @@ class Context:
             self.player_names[0, slot_id] = slot_info.name
             self.player_name_lookup[slot_info.name] = 0, slot_id
             self.read_data[f"hints_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
-                list(self.get_rechecked_hints(local_team, local_player))
+                list(self.hints[local_team, local_player])
             self.read_data[f"client_status_{0}_{slot_id}"] = lambda local_team=0, local_player=slot_id: \
                 self.client_game_state[local_team, local_player]
 
@@ -537,8 +770,8 @@ class Context:
         self.connect_names = decoded_obj['connect_names']
         self.locations = LocationStore(decoded_obj.pop("locations"))  # pre-emptively free memory
         self.slot_data = decoded_obj['slot_data']
-        for slot, data in self.slot_data.items():
-            self.read_data[f"slot_data_{slot}"] = lambda data=data: data
+        for slot in self.slot_data:
+            self.read_data[f"slot_data_{slot}"] = lambda local_slot=slot: self.slot_data[local_slot]
         self.er_hint_data = {int(player): {int(address): name for address, name in loc_data.items()}
                              for player, loc_data in decoded_obj["er_hint_data"].items()}
 
@@ -548,6 +781,7 @@ class Context:
 
         for slot, hints in decoded_obj["precollected_hints"].items():
             self.hints[0, slot].update(hints)
+            self.index_hints(0, hints)
 
         # declare slots that aren't players as done
         for slot, slot_info in self.slot_info.items():
@@ -578,6 +812,7 @@ class Context:
 
         # sorted access spheres
         self.spheres = decoded_obj.get("spheres", [])
+        self.sphere_index = NetUtils.SphereIndex(self.spheres)
 
     # saving
 
@@ -592,18 +827,67 @@ class Context:
 
         return False
 
+    @property
+    def save_journal_filename(self) -> str:
+        return self.save_filename + ".journal"
+
     def _save(self, exit_save: bool = False) -> bool:
         try:
-            # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-            encoded_save = pickle.dumps(self.get_save())
-            with open(self.save_filename, "wb") as f:
-                f.write(zlib.compress(encoded_save))
+            if exit_save or self.save_journal_size is None or \
+                    self.save_journal_size > max(self.full_save_size, self.min_save_journal_compaction_size):
+                self._save_full()
+            else:
+                with open(self.save_journal_filename, "ab") as f:
+                    self.save_journal_size += write_save_journal_record(f, self.get_save_changes())
         except Exception as e:
+            self.save_journal_size = None  # changes may be missing from the journal, so make a full save next time
             self.logger.exception(e)
             return False
         else:
             return True
 
+    def _save_full(self) -> None:
+        """Writes all save data and starts a new save journal, compacting the previous one into the save."""
+        import os
+        with self.unsaved_lock:
+            self.unsaved = collections.defaultdict(set)
+        self.saved_received_items = {key: len(items) for key, items in self.received_items.items()}
+        self.save_generation += 1
+        save_data = self.get_save()
+        save_data["save_generation"] = self.save_generation
+        # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
+        encoded_save = zlib.compress(pickle.dumps(save_data))
+        with open(self.save_filename + ".tmp", "wb") as f:
+            f.write(encoded_save)
+        os.replace(self.save_filename + ".tmp", self.save_filename)
+        self.full_save_size = len(encoded_save)
+        # a journal of an older generation is ignored when loading, in case this does not complete
+        with open(self.save_journal_filename, "wb") as f:
+            self.save_journal_size = write_save_journal_record(f, self.save_generation)
+
+    def _load_save_journal(self) -> None:
+        """Applies the changes from the save journal belonging to the loaded save and drops any incomplete record."""
+        import os
+        size = 0
+        try:
+            with open(self.save_journal_filename, "rb") as f:
+                for offset, record in read_save_journal_records(f):
+                    if not size and record != self.save_generation:
+                        self.logger.warning("Ignoring save journal that does not belong to the save.")
+                        return
+                    if size:
+                        self.apply_save_changes(record)
+                    size = offset
+        except FileNotFoundError:
+            return
+        if size:
+            os.truncate(self.save_journal_filename, size)
+            self.save_journal_size = size
+            self.saved_received_items = {key: len(items) for key, items in self.received_items.items()}
+            self.location_hints.clear()
+            for (team, _), hints in self.hints.items():
+                self.index_hints(team, hints)
+
     def init_save(self, enabled: bool = True):
         self.saving = enabled
         if self.saving:
@@ -616,6 +900,8 @@ class Context:
                 with open(self.save_filename, 'rb') as f:
                     save_data = restricted_loads(zlib.decompress(f.read()))
                     self.set_save(save_data)
+                    self.full_save_size = f.tell()
+                self._load_save_journal()
             except FileNotFoundError:
                 self.logger.error('No save data found, starting a new game')
             except Exception as e:
@@ -653,8 +939,7 @@ class Context:
                 import atexit
                 atexit.register(self._save, True)  # make sure we save on exit too
 
-    def get_save(self) -> dict:
-        self.recheck_hints()
+    def get_save(self) -> typing.Dict[str, typing.Any]:
         d = {
             "version": self.save_version,
             "connect_names": self.connect_names,
@@ -671,18 +956,76 @@ class Context:
             "random_state": self.random.getstate(),
             "group_collected": dict(self.group_collected),
             "stored_data": self.stored_data,
-            "game_options": {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
-                             "server_password": self.server_password, "password": self.password,
-                             "release_mode": self.release_mode,
-                             "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
-                             "countdown_mode": self.countdown_mode,
-                             "item_cheat": self.item_cheat, "compatibility": self.compatibility}
+            "game_options": self.get_game_options()
 
         }
 
         return d
 
-    def set_save(self, savedata: dict):
+    def get_game_options(self) -> dict:
+        return {"hint_cost": self.hint_cost, "location_check_points": self.location_check_points,
+                "server_password": self.server_password, "password": self.password,
+                "release_mode": self.release_mode,
+                "remaining_mode": self.remaining_mode, "collect_mode": self.collect_mode,
+                "countdown_mode": self.countdown_mode,
+                "item_cheat": self.item_cheat, "compatibility": self.compatibility}
+
+    def set_game_options(self, game_options: dict) -> None:
+        self.hint_cost = game_options["hint_cost"]
+        self.location_check_points = game_options["location_check_points"]
+        self.server_password = game_options["server_password"]
+        self.password = game_options["password"]
+        self.release_mode = game_options["release_mode"]
+        self.remaining_mode = game_options["remaining_mode"]
+        self.collect_mode = game_options["collect_mode"]
+        self.countdown_mode = game_options.get("countdown_mode", self.countdown_mode)
+        self.item_cheat = game_options["item_cheat"]
+        self.compatibility = game_options["compatibility"]
+
+    def mark_unsaved(self, category: str, key: typing.Any) -> None:
+        """Remembers that an entry of one of the save_journal_categories changed, to write it to the save journal."""
+        with self.unsaved_lock:
+            self.unsaved[category].add(key)
+
+    def get_save_changes(self) -> dict:
+        """Returns the save data that changed since the last save, to be applied to it by apply_save_changes."""
+        with self.unsaved_lock:
+            unsaved, self.unsaved = self.unsaved, collections.defaultdict(set)
+        changes: typing.Dict[str, typing.Any] = {"deleted": {}}
+        for category, keys in unsaved.items():
+            data = getattr(self, category)
+            changes[category] = {key: data[key] for key in keys if key in data}
+            changes["deleted"][category] = [key for key in keys if key not in data]
+            if category.endswith("_timers"):
+                changes[category] = {key: value.timestamp() for key, value in changes[category].items()}
+        # received items are only ever appended, so only the new ones are written
+        received_items = {}
+        for key, items in tuple(self.received_items.items()):
+            saved = self.saved_received_items.get(key, 0)
+            if len(items) > saved:
+                new_items = items[saved:]
+                received_items[key] = saved, new_items
+                self.saved_received_items[key] = saved + len(new_items)
+        changes["received_items"] = received_items
+        changes["random_state"] = self.random.getstate()
+        changes["game_options"] = self.get_game_options()
+        return changes
+
+    def apply_save_changes(self, changes: dict) -> None:
+        for category in self.save_journal_categories:
+            data = getattr(self, category)
+            for key, value in changes.get(category, {}).items():
+                if category.endswith("_timers"):
+                    value = datetime.datetime.fromtimestamp(value, datetime.timezone.utc)
+                data[key] = value
+            for key in changes["deleted"].get(category, ()):
+                data.pop(key, None)
+        for key, (start, items) in changes["received_items"].items():
+            self.received_items.setdefault(key, [])[start:] = items
+        self.random.setstate(changes["random_state"])
+        self.set_game_options(changes["game_options"])
+
+    def set_save(self, savedata: typing.Dict[str, typing.Any]):
         if self.connect_names != savedata["connect_names"]:
             raise Exception("This savegame does not appear to match the loaded multiworld.")
         if savedata["version"] > self.save_version:
@@ -690,6 +1033,9 @@ class Context:
         self.received_items = savedata["received_items"]
         self.hints_used.update(savedata["hints_used"])
         self.hints.update(savedata["hints"])
+        self.location_hints.clear()
+        for (team, _), hints in self.hints.items():
+            self.index_hints(team, hints)
 
         self.name_aliases.update(savedata["name_aliases"])
         self.client_game_state.update(savedata["client_game_state"])
@@ -700,25 +1046,19 @@ class Context:
             {tuple(key): datetime.datetime.fromtimestamp(value, datetime.timezone.utc) for key, value
              in savedata["client_activity_timers"]})
         self.location_checks.update(savedata["location_checks"])
+        for (team, slot), checks in self.location_checks.items():
+            self.recheck_hints(team, slot, checks)
         self.random.setstate(savedata["random_state"])
 
         if "game_options" in savedata:
-            self.hint_cost = savedata["game_options"]["hint_cost"]
-            self.location_check_points = savedata["game_options"]["location_check_points"]
-            self.server_password = savedata["game_options"]["server_password"]
-            self.password = savedata["game_options"]["password"]
-            self.release_mode = savedata["game_options"]["release_mode"]
-            self.remaining_mode = savedata["game_options"]["remaining_mode"]
-            self.collect_mode = savedata["game_options"]["collect_mode"]
-            self.countdown_mode = savedata["game_options"].get("countdown_mode", self.countdown_mode)
-            self.item_cheat = savedata["game_options"]["item_cheat"]
-            self.compatibility = savedata["game_options"]["compatibility"]
+            self.set_game_options(savedata["game_options"])
 
         if "group_collected" in savedata:
             self.group_collected = savedata["group_collected"]
 
         if "stored_data" in savedata:
             self.stored_data = savedata["stored_data"]
+        self.save_generation = savedata.get("save_generation", 0)
         # count items and slots from lists for items_handling = remote
         self.logger.info(
             f'Loaded save file with {sum([len(v) for k, v in self.received_items.items() if k[2]])} received items '
@@ -731,42 +1071,29 @@ class Context:
             return max(1, int(self.hint_cost * 0.01 * len(self.locations[slot])))
         return 0
 
-    def recheck_hints(self, team: typing.Optional[int] = None, slot: typing.Optional[int] = None,
+    def index_hints(self, team: int, hints: typing.Iterable[Hint]) -> None:
+        for hint in hints:
+            self.location_hints[team, hint.finding_player, hint.location].add(hint)
+
+    def recheck_hints(self, team: int, slot: int, locations: typing.Iterable[int],
                       changed: typing.Optional[typing.Set[team_slot]] = None) -> None:
-        """Refreshes the hints for the specified team/slot. Providing 'None' for either team or slot
-        will refresh all teams or all slots respectively. If a set is passed for 'changed', each (team,slot)
-        pair that has at least one hint modified will be added to the set.
+        """Refreshes the hints of the specified team/slot's checked locations. If a set is passed for 'changed',
+        each (team,slot) pair that has at least one hint modified will be added to the set.
         """
-        for hint_team, hint_slot in self.hints:
-            if team != hint_team and team is not None:
-                continue  # Check specified team only, all if team is None
-            if slot != hint_slot and slot is not None:
-                continue  # Check specified slot only, all if slot is None
-            new_hints: typing.Set[Hint] = set()
-            for hint in self.hints[hint_team, hint_slot]:
-                new_hint = hint.re_check(self, hint_team)
-                new_hints.add(new_hint)
+        for location in locations:
+            for hint in tuple(self.location_hints.get((team, slot, location), ())):
+                new_hint = hint.re_check(self, team)
                 if hint == new_hint:
                     continue
                 for player in self.slot_set(hint.receiving_player) | {hint.finding_player}:
                     if changed is not None:
-                        changed.add((hint_team,player))
-                    if slot is not None and slot != player:
-                        self.replace_hint(hint_team, player, hint, new_hint)
-            self.hints[hint_team, hint_slot] = new_hints
-
-    def get_rechecked_hints(self, team: int, slot: int):
-        self.recheck_hints(team, slot)
-        return self.hints[team, slot]
+                        changed.add((team, player))
+                    self.replace_hint(team, player, hint, new_hint)
 
     def get_sphere(self, player: int, location_id: int) -> int:
         """Get sphere of a location, -1 if spheres are not available."""
         if self.spheres:
-            for i, sphere in enumerate(self.spheres):
-                if location_id in sphere.get(player, set()):
-                    return i
-            raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {player}. "
-                           f"Location or player may not exist.")
+            return self.sphere_index.get_sphere(player, location_id)
         return -1
 
     def get_players_package(self):
@@ -825,9 +1152,12 @@ class Context:
                 # we can check once if hint already exists
                 if hint not in self.hints[team, hint.finding_player]:
                     self.hints[team, hint.finding_player].add(hint)
+                    self.location_hints[team, hint.finding_player, hint.location].add(hint)
+                    self.mark_unsaved("hints", (team, hint.finding_player))
                     new_hint_events.add(hint.finding_player)
                     for player in self.slot_set(hint.receiving_player):
                         self.hints[team, player].add(hint)
+                        self.mark_unsaved("hints", (team, player))
                         new_hint_events.add(player)
 
             self.logger.info("Notice (Team #%d): %s" % (team + 1, format_hint(self, team, hint)))
@@ -835,23 +1165,25 @@ class Context:
             self.on_new_hint(team, slot)
         for slot, hint_data in concerns.items():
             if recipients is None or slot in recipients:
-                clients = filter(lambda c: not c.no_text, self.clients[team].get(slot, []))
+                clients = [client for client in self.clients[team].get(slot, []) if not client.no_text]
                 if not clients:
                     continue
                 client_hints = [datum[1] for datum in sorted(hint_data, key=lambda x: x[0].finding_player != slot)]
-                for client in clients:
-                    async_start(self.send_msgs(client, client_hints))
+                self.broadcast(clients, client_hints)
 
     def get_hint(self, team: int, finding_player: int, seeked_location: int) -> typing.Optional[Hint]:
-        for hint in self.hints[team, finding_player]:
-            if hint.location == seeked_location and hint.finding_player == finding_player:
-                return hint
+        for hint in self.location_hints.get((team, finding_player, seeked_location), ()):
+            return hint
         return None
     
     def replace_hint(self, team: int, slot: int, old_hint: Hint, new_hint: Hint) -> None:
         if old_hint in self.hints[team, slot]:
             self.hints[team, slot].remove(old_hint)
             self.hints[team, slot].add(new_hint)
+            location_hints = self.location_hints[team, old_hint.finding_player, old_hint.location]
+            location_hints.discard(old_hint)
+            location_hints.add(new_hint)
+            self.mark_unsaved("hints", (team, slot))
     
     # "events"
 
@@ -873,25 +1205,38 @@ class Context:
         }])
 
     def on_changed_hints(self, team: int, slot: int):
-        key: str = f"_read_hints_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
-        if targets:
-            self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.hints[team, slot]}])
+        self.on_read_data_changed(f"_read_hints_{team}_{slot}", lambda: self.hints[team, slot])
 
     def on_client_status_change(self, team: int, slot: int):
-        key: str = f"_read_client_status_{team}_{slot}"
-        targets: typing.Set[Client] = set(self.stored_data_notification_clients[key])
-        if targets:
-            self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": self.client_game_state[team, slot]}])
+        self.on_read_data_changed(f"_read_client_status_{team}_{slot}", lambda: self.client_game_state[team, slot])
+
+    def on_read_data_changed(self, key: str, get_value: typing.Callable[[], object]):
+        """Notifies the clients following a _read_ key of its value, once for all changes in this event loop tick."""
+        if self.data_storage.get_subscribers(key):
+            self.changed_read_data[key] = get_value
+            if not self.read_data_handle:
+                self.read_data_handle = asyncio.get_running_loop().call_soon(self._send_changed_read_data)
+
+    def _send_changed_read_data(self):
+        self.read_data_handle = None
+        changed, self.changed_read_data = self.changed_read_data, {}
+        for key, get_value in changed.items():
+            targets = self.data_storage.get_subscribers(key)
+            if targets:
+                self.broadcast(targets, [{"cmd": "SetReply", "key": key, "value": get_value()}])
 
+    @property
+    def stored_data(self) -> typing.Dict[str, typing.Any]:
+        return self.data_storage.data
 
-def update_aliases(ctx: Context, team: int):
-    cmd = ctx.dumper([{"cmd": "RoomUpdate",
-                       "players": ctx.get_players_package()}])
+    @stored_data.setter
+    def stored_data(self, data: typing.Dict[str, typing.Any]):
+        self.data_storage.load(data)
 
-    for clients in ctx.clients[team].values():
-        for client in clients:
-            async_start(ctx.send_encoded_msgs(client, cmd))
+
+def update_aliases(ctx: Context, team: int):
+    ctx.broadcast(itertools.chain.from_iterable(ctx.clients[team].values()),
+                  [{"cmd": "RoomUpdate", "players": ctx.get_players_package()}])
 
 
 async def server(websocket: "ServerConnection", path: str = "/", ctx: Context = None) -> None:
@@ -984,12 +1329,14 @@ async def on_client_joined(ctx: Context, client: Client):
                                   "It may stop working in the future. If you are a player, please report this to the "
                                   "client's developer.")
     ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+    ctx.mark_unsaved("client_connection_timers", (client.team, client.slot))
 
 
 async def on_client_left(ctx: Context, client: Client):
     if len(ctx.clients[client.team][client.slot]) < 1:
         update_client_status(ctx, client, ClientStatus.CLIENT_UNKNOWN)
         ctx.client_connection_timers[client.team, client.slot] = datetime.datetime.now(datetime.timezone.utc)
+        ctx.mark_unsaved("client_connection_timers", (client.team, client.slot))
 
     version_str = '.'.join(str(x) for x in client.version)
 
@@ -1068,19 +1415,31 @@ def get_start_inventory(ctx: Context, player: int, remote_start_inventory: bool)
 
 
 def send_new_items(ctx: Context):
-    for team, clients in ctx.clients.items():
-        for slot, clients in clients.items():
-            for client in clients:
-                if client.no_items:
-                    continue
-                start_inventory = get_start_inventory(ctx, slot, client.remote_start_inventory)
-                items = get_received_items(ctx, team, slot, client.remote_items)
-                if len(start_inventory) + len(items) > client.send_index:
-                    first_new_item = max(0, client.send_index - len(start_inventory))
-                    async_start(ctx.send_msgs(client, [{
-                        "cmd": "ReceivedItems",
-                        "index": client.send_index,
-                        "items": start_inventory[client.send_index:] + items[first_new_item:]}]))
+    """Sends new items to the clients of slots that received them, once for all calls within this event loop tick."""
+    if ctx.new_items_slots and not ctx.new_items_handle:
+        ctx.new_items_handle = asyncio.get_running_loop().call_soon(_send_new_items, ctx)
+
+
+def _send_new_items(ctx: Context):
+    ctx.new_items_handle = None
+    slots, ctx.new_items_slots = ctx.new_items_slots, set()
+    for team, slot in slots:
+        # clients of a slot at the same index and with the same items handling receive the same message
+        batches: typing.Dict[typing.Tuple[int, bool, bool], typing.List[Client]] = {}
+        for client in ctx.clients.get(team, {}).get(slot, ()):
+            if not client.no_items:
+                batch = (client.send_index, client.remote_items, client.remote_start_inventory)
+                batches.setdefault(batch, []).append(client)
+        for (send_index, remote_items, remote_start_inventory), clients in batches.items():
+            start_inventory = get_start_inventory(ctx, slot, remote_start_inventory)
+            items = get_received_items(ctx, team, slot, remote_items)
+            if len(start_inventory) + len(items) > send_index:
+                first_new_item = max(0, send_index - len(start_inventory))
+                ctx.broadcast(clients, [{
+                    "cmd": "ReceivedItems",
+                    "index": send_index,
+                    "items": start_inventory[send_index:] + items[first_new_item:]}])
+                for client in clients:
                     client.send_index = len(start_inventory) + len(items)
 
 
@@ -1115,6 +1474,7 @@ def collect_player(ctx: Context, team: int, slot: int, is_group: bool = False):
             if slot in group_players:
                 group_collected_players = ctx.group_collected.setdefault(group, set())
                 group_collected_players.add(slot)
+                ctx.mark_unsaved("group_collected", group)
                 if set(group_players) == group_collected_players:
                     collect_player(ctx, team, group, True)
 
@@ -1129,6 +1489,7 @@ def send_items_to(ctx: Context, team: int, target_slot: int, *items: NetworkItem
             if item.player != target_slot:
                 get_received_items(ctx, team, target, False).append(item)
             get_received_items(ctx, team, target, True).append(item)
+        ctx.new_items_slots.add((team, target))
 
 
 def register_location_checks(ctx: Context, team: int, slot: int, locations: typing.Iterable[int],
@@ -1139,6 +1500,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
     if new_locations:
         if count_activity:
             ctx.client_activity_timers[team, slot] = datetime.datetime.now(datetime.timezone.utc)
+            ctx.mark_unsaved("client_activity_timers", (team, slot))
 
         sortable: list[tuple[int, int, int, int]] = []
         for location in new_locations:
@@ -1166,6 +1528,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
         del sortable
 
         ctx.location_checks[team, slot] |= new_locations
+        ctx.mark_unsaved("location_checks", (team, slot))
         send_new_items(ctx)
         ctx.broadcast(ctx.clients[team][slot], [{
             "cmd": "RoomUpdate",
@@ -1173,7 +1536,7 @@ def register_location_checks(ctx: Context, team: int, slot: int, locations: typi
             "checked_locations": new_locations,  # send back new checks only
         }])
         updated_slots: typing.Set[tuple[int, int]] = set()
-        ctx.recheck_hints(team, slot, updated_slots)
+        ctx.recheck_hints(team, slot, new_locations, updated_slots)
         for hint_team, hint_slot in updated_slots:
             ctx.on_changed_hints(hint_team, hint_slot)
         ctx.save()
@@ -1650,12 +2013,14 @@ class ClientMessageProcessor(CommonCommandProcessor):
         if alias_name:
             alias_name = alias_name[:16].strip()
             self.ctx.name_aliases[self.client.team, self.client.slot] = alias_name
+            self.ctx.mark_unsaved("name_aliases", (self.client.team, self.client.slot))
             self.output(f"Hello, {alias_name}")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
             return True
         elif (self.client.team, self.client.slot) in self.ctx.name_aliases:
             del (self.ctx.name_aliases[self.client.team, self.client.slot])
+            self.ctx.mark_unsaved("name_aliases", (self.client.team, self.client.slot))
             self.output("Removed Alias")
             update_aliases(self.ctx, self.client.team)
             self.ctx.save()
@@ -1675,6 +2040,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                 new_item = NetworkItem(names[item_name], -1, self.client.slot)
                 get_received_items(self.ctx, self.client.team, self.client.slot, False).append(new_item)
                 get_received_items(self.ctx, self.client.team, self.client.slot, True).append(new_item)
+                self.ctx.new_items_slots.add((self.client.team, self.client.slot))
                 self.ctx.broadcast_text_all(
                     'Cheat console: sending "' + item_name + '" to ' + self.ctx.get_aliased_name(self.client.team,
                                                                                                  self.client.slot),
@@ -1692,9 +2058,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
         points_available = get_client_points(self.ctx, self.client)
         cost = self.ctx.get_hint_cost(self.client.slot)
         if not input_text:
-            hints = {hint.re_check(self.ctx, self.client.team) for hint in
-                     self.ctx.hints[self.client.team, self.client.slot]}
-            self.ctx.hints[self.client.team, self.client.slot] = hints
+            hints = self.ctx.hints[self.client.team, self.client.slot]
             self.ctx.notify_hints(self.client.team, list(hints), recipients=(self.client.slot,))
             self.output(f"A hint costs {self.ctx.get_hint_cost(self.client.slot)} points. "
                         f"You have {points_available} points.")
@@ -1786,6 +2150,7 @@ class ClientMessageProcessor(CommonCommandProcessor):
                     hints.append(hint)
                     can_pay -= 1
                     self.ctx.hints_used[self.client.team, self.client.slot] += 1
+                    self.ctx.mark_unsaved("hints_used", (self.client.team, self.client.slot))
 
                 self.ctx.notify_hints(self.client.team, hints)
                 if not_found_hints:
@@ -1852,7 +2217,7 @@ def get_slot_points(ctx: Context, team: int, slot: int) -> int:
             ctx.get_hint_cost(slot) * ctx.hints_used[team, slot])
 
 
-async def process_client_cmd(ctx: Context, client: Client, args: dict):
+async def process_client_cmd(ctx: Context, client: Client, args: typing.Dict[str, typing.Any]):
     try:
         cmd: str = args["cmd"]
     except:
@@ -2151,13 +2516,13 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
             tags = set(args.get("tags", []))
             slots = set(args.get("slots", []))
             args["cmd"] = "Bounced"
-            msg = ctx.dumper([args])
+            msg = OutgoingMsgs([args])
 
             for bounceclient in ctx.endpoints:
                 if client.team == bounceclient.team and (ctx.games[bounceclient.slot] in games or
                                                          set(bounceclient.tags) & tags or
                                                          bounceclient.slot in slots):
-                    await ctx.send_encoded_msgs(bounceclient, msg)
+                    await ctx.send_msgs(bounceclient, msg)
 
         elif cmd == "Get":
             if "keys" not in args or type(args["keys"]) != list:
@@ -2179,15 +2544,19 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                 await ctx.send_msgs(client, [{'cmd': 'InvalidPacket', "type": "arguments",
                                               "text": 'Set', "original_cmd": cmd}])
                 return
+            values = ctx.data_storage.apply((client.team, client.slot), args["key"], args.get("default", 0),
+                                            args["operations"])
+            if values is None:
+                ctx.logger.warning(f"Refused Set of {args['key']} by {client.name}, "
+                                   f"it would exceed the data storage quota of {ctx.data_storage.quota} bytes.")
+                await ctx.send_msgs(client, [{"cmd": "InvalidPacket", "type": "arguments",
+                                              "text": "Set", "original_cmd": cmd}])
+                return
             args["cmd"] = "SetReply"
-            value = ctx.stored_data.get(args["key"], args.get("default", 0))
-            args["original_value"] = copy.copy(value)
+            args["original_value"], args["value"] = values
             args["slot"] = client.slot
-            for operation in args["operations"]:
-                func = modify_functions[operation["operation"]]
-                value = func(value, operation["value"])
-            ctx.stored_data[args["key"]] = args["value"] = value
-            targets = set(ctx.stored_data_notification_clients[args["key"]])
+            ctx.mark_unsaved("stored_data", args["key"])
+            targets = ctx.data_storage.get_subscribers(args["key"])
             if args.get("want_reply", False):
                 targets.add(client)
             if targets:
@@ -2200,7 +2569,7 @@ async def process_client_cmd(ctx: Context, client: Client, args: dict):
                                               "text": 'SetNotify', "original_cmd": cmd}])
                 return
             for key in args["keys"]:
-                ctx.stored_data_notification_clients[key].add(client)
+                ctx.data_storage.subscribe(client, key)
 
 
 def update_client_status(ctx: Context, client: Client, new_status: ClientStatus):
@@ -2215,6 +2584,7 @@ def update_client_status(ctx: Context, client: Client, new_status: ClientStatus)
                 ctx.broadcast_text_all(f"Team #{client.team + 1} has completed all of their games! Congratulations!")
 
         ctx.client_game_state[client.team, client.slot] = new_status
+        ctx.mark_unsaved("client_game_state", (client.team, client.slot))
         ctx.on_client_status_change(client.team, client.slot)
         ctx.save()
 
@@ -2274,12 +2644,14 @@ class ServerCommandProcessor(CommonCommandProcessor):
                     if alias_name:
                         alias_name = alias_name.strip()[:15]
                         self.ctx.name_aliases[team, slot] = alias_name
+                        self.ctx.mark_unsaved("name_aliases", (team, slot))
                         self.output(f"Named {player_name} as {alias_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
                         return True
                     else:
                         del (self.ctx.name_aliases[team, slot])
+                        self.ctx.mark_unsaved("name_aliases", (team, slot))
                         self.output(f"Removed Alias for {player_name}")
                         update_aliases(self.ctx, team)
                         self.ctx.save()
@@ -2545,17 +2917,25 @@ class ServerCommandProcessor(CommonCommandProcessor):
         return True
 
     def _cmd_datastore(self):
-        """Debug Tool: list writable datastorage keys and approximate the size of their values with pickle."""
+        """Debug Tool: list writable datastorage keys, their version
+        and approximate the size of their values with pickle."""
         total: int = 0
         texts = []
         for key, value in self.ctx.stored_data.items():
             size = len(pickle.dumps(value))
             total += size
-            texts.append(f"Key: {key} | Size: {size}B")
+            texts.append(f"Key: {key} | Size: {size}B | Version: {self.ctx.data_storage.versions.get(key, 0)}")
         texts.insert(0, f"Found {len(self.ctx.stored_data)} keys, "
                         f"approximately totaling {Utils.format_SI_prefix(total, power=1024)}B")
         self.output("\n".join(texts))
 
+    def _cmd_backlog(self):
+        """Debug Tool: list the amount of messages queued to be sent to clients."""
+        total, deepest = self.ctx.get_outgoing_backlog()
+        self.output(f"{total} messages queued, at most {deepest} for one client, "
+                    f"at most {self.ctx.outgoing_backlog_peak} for one client since starting. "
+                    f"Clients are disconnected above {self.ctx.max_backlog}.")
+
 
 async def console(ctx: Context):
     import sys
@@ -2645,6 +3025,10 @@ def parse_args() -> argparse.Namespace:
     #0 -> recommended for tournaments to force a level playing field, only allow an exact version match
     """)
     parser.add_argument('--log_network', default=defaults["log_network"], action="store_true")
+    parser.add_argument('--max_backlog', default=defaults["max_backlog"], type=int,
+                        help="disconnect clients that have more than this many messages queued to be sent to them")
+    parser.add_argument('--datastorage_quota', default=defaults["datastorage_quota"], type=int,
+                        help="maximum size in bytes of the data storage keys created by one slot, 0 for no limit")
     args = parser.parse_args()
     return args
 
@@ -2691,7 +3075,8 @@ async def main(args: argparse.Namespace):
     ctx = Context(args.host, args.port, args.server_password, args.password, args.location_check_points,
                   args.hint_cost, not args.disable_item_cheat, args.release_mode, args.collect_mode,
                   args.countdown_mode, args.remaining_mode,
-                  args.auto_shutdown, args.compatibility, args.log_network)
+                  args.auto_shutdown, args.compatibility, args.log_network, max_backlog=args.max_backlog,
+                  datastorage_quota=args.datastorage_quota)
     data_filename = args.multidata
 
     if not data_filename:
@@ -2764,6 +3149,7 @@ async def main(args: argparse.Namespace):
     console_task.cancel()
     if ctx.shutdown_task:
         await ctx.shutdown_task
+    ctx.close_multidata()
 
 
 client_message_processor = ClientMessageProcessor
@@ -1,14 +1,28 @@
 from __future__ import annotations
 
+from array import array
 from collections.abc import Mapping, Sequence
+import bisect
+import io
+import math
+import struct
 import typing
 import enum
 import warnings
 from json import JSONEncoder, JSONDecoder
 
+try:
+    # optional, used to encode and decode faster if available
+    import orjson
+except ImportError:
+    orjson = None
+
 if typing.TYPE_CHECKING:
+    import mmap
+
     from websockets import WebSocketServerProtocol as ServerConnection
 
+import Utils
 from Utils import ByValue, Version
 
 
@@ -135,7 +149,41 @@ _encode = JSONEncoder(
 ).encode
 
 
+def _orjson_default(obj: typing.Any) -> typing.Any:
+    if isinstance(obj, tuple) and hasattr(obj, "_fields"):  # NamedTuple is not actually a parent class
+        data = obj._asdict()
+        data["class"] = obj.__class__.__name__
+        return data
+    if isinstance(obj, (set, frozenset)):
+        return tuple(obj)
+    raise TypeError
+
+
+# types json doesn't encode are passed to _orjson_default, so they raise the same TypeError
+_orjson_options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_PASSTHROUGH_DATETIME
+                   if orjson else 0)
+
+
+def _has_non_finite(obj: typing.Any) -> bool:
+    if isinstance(obj, float):
+        return not math.isfinite(obj)
+    if isinstance(obj, dict):
+        return any(_has_non_finite(key) or _has_non_finite(value) for key, value in obj.items())
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        return any(_has_non_finite(value) for value in obj)
+    return False
+
+
 def encode(obj: typing.Any) -> str:
+    if orjson:
+        try:
+            data = orjson.dumps(obj, default=_orjson_default, option=_orjson_options)
+        except orjson.JSONEncodeError:
+            pass  # such as integers beyond 64 bit or invalid unicode, which json handles
+        else:
+            # orjson encodes NaN and infinity as null, json as NaN and Infinity, so only those payloads need checking
+            if b"null" not in data or not _has_non_finite(obj):
+                return data.decode()
     return _encode(_scan_for_TypedTuples(obj))
 
 
@@ -170,7 +218,20 @@ def _object_hook(o: typing.Any) -> typing.Any:
     return o
 
 
-decode = JSONDecoder(object_hook=_object_hook).decode
+_decode = JSONDecoder(object_hook=_object_hook).decode
+_digits_to_zero = str.maketrans("123456789", "000000000")
+
+
+def decode(data: str) -> typing.Any:
+    # orjson can't call _object_hook and decodes integers beyond 64 bit as float, so data that may contain
+    # typed objects, including behind escaped keys, or long numbers is decoded by json
+    if orjson and '"class"' not in data and "\\u" not in data and \
+            "0000000000000000000" not in data.translate(_digits_to_zero):
+        try:
+            return orjson.loads(data)
+        except orjson.JSONDecodeError:
+            pass  # such as NaN, which json accepts
+    return _decode(data)
 
 
 class Endpoint:
@@ -415,6 +476,11 @@ class Hint(typing.NamedTuple):
 
 
 class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
+    _entries: typing.List[typing.Tuple[int, int, int, int, int]]
+    """(sender, location, item, receiver, flags) of every location"""
+    _receiver_index: typing.Dict[int, typing.Dict[int, typing.List[int]]]
+    """receiver -> item -> indices in _entries, to find items without going through every location"""
+
     def __init__(self, values: typing.MutableMapping[int, typing.Dict[int, typing.Tuple[int, int, int]]]):
         super().__init__(values)
 
@@ -427,20 +493,28 @@ class _LocationStore(dict, typing.MutableMapping[int, typing.Dict[int, typing.Tu
         if len(self.get(0, {})):
             raise ValueError("Invalid player id 0 for location")
 
+        self._entries = []
+        self._receiver_index = {}
+        for sender, locations in self.items():
+            for location_id, (item_id, receiver, item_flags) in locations.items():
+                self._receiver_index.setdefault(receiver, {}).setdefault(item_id, []).append(len(self._entries))
+                self._entries.append((sender, location_id, item_id, receiver, item_flags))
+
     def find_item(self, slots: typing.Set[int], seeked_item_id: int
                   ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
-        for finding_player, check_data in self.items():
-            for location_id, (item_id, receiving_player, item_flags) in check_data.items():
-                if receiving_player in slots and item_id == seeked_item_id:
-                    yield finding_player, location_id, item_id, receiving_player, item_flags
+        found = [index for slot in slots for index in self._receiver_index.get(slot, {}).get(seeked_item_id, ())]
+        if len(slots) > 1:
+            found.sort()  # yield in the order of locations, like a single slot
+        for index in found:
+            yield self._entries[index]
 
     def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
         import collections
         all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
-        for source_slot, location_data in self.items():
-            for location_id, values in location_data.items():
-                if values[1] == slot:
-                    all_locations[source_slot].add(location_id)
+        for indices in self._receiver_index.get(slot, {}).values():
+            for index in indices:
+                source_slot, location_id, _, _, _ = self._entries[index]
+                all_locations[source_slot].add(location_id)
         return all_locations
 
     def get_checked(self, state: typing.Dict[typing.Tuple[int, int], typing.Set[int]], team: int, slot: int
@@ -510,6 +584,261 @@ class MultiData(typing.TypedDict):
     race_mode: int
 
 
+multidata_format_version = 5
+"""
+Format 3 is a zlib compressed pickle. Format 4 adds a byte for the index of the compression in Utils.compressions.
+Format 5 is indexed, see IndexedMultiData.
+"""
+
+
+def _dump_section(obj: typing.Any, file: typing.BinaryIO, compression: str, start: int) -> typing.Tuple[int, int]:
+    offset = file.tell()
+    with Utils.CompressingWriter(file, compression) as writer:
+        Utils.restricted_dump(obj, writer)
+    return offset - start, file.tell() - offset
+
+
+def dump_multidata(multidata: MultiData, file: typing.BinaryIO, compression: str = "zlib",
+                   indexed: bool = False) -> None:
+    """
+    Writes multidata to a file, streaming the pickle through the compression instead of building it in memory.
+
+    :param indexed: Write the data of each slot into its own section, so servers can decode it when it's first needed.
+        Requires the file to be seekable, and a server supporting format 5 to load it.
+    """
+    if indexed:
+        IndexedMultiData.dump(multidata, file, compression)
+        return
+    if compression == "zlib":
+        file.write(bytes([3]))  # zlib is written as format 3, so older servers can load it as well
+    else:
+        file.write(bytes([4, list(Utils.compressions).index(compression)]))
+    with Utils.CompressingWriter(file, compression) as writer:
+        Utils.restricted_dump(multidata, writer)
+
+
+def _get_compression(compression_index: int) -> str:
+    if compression_index >= len(Utils.compressions):
+        raise Utils.VersionException("Incompatible multidata compression.")
+    return list(Utils.compressions)[compression_index]
+
+
+def load_multidata(file: typing.BinaryIO) -> MultiData:
+    """Loads multidata from a file, decompressing and unpickling it as it is read."""
+    format_version = file.read(1)[0]
+    if format_version > multidata_format_version:
+        raise Utils.VersionException("Incompatible multidata.")
+    if format_version == IndexedMultiData.format_version:
+        file.seek(-1, io.SEEK_CUR)
+        return IndexedMultiData(file.read()).load(lazy=False)
+    if format_version < 4:
+        compression = "zlib"
+    else:
+        compression = _get_compression(file.read(1)[0])
+    with Utils.DecompressingReader(file, compression) as raw_reader, io.BufferedReader(raw_reader) as reader:
+        return Utils.restricted_load(reader)
+
+
+def open_multidata(buffer: typing.Union[bytes, bytearray, memoryview, "mmap.mmap"]) -> MultiData:
+    """
+    Loads multidata from a buffer, such as the content of a memory-mapped file.
+    The per-slot sections of indexed multidata stay encoded in the buffer until they are used.
+    """
+    if buffer[0] == IndexedMultiData.format_version:
+        return IndexedMultiData(buffer).load(lazy=True)
+    return load_multidata(io.BytesIO(buffer))
+
+
+class IndexedMultiData:
+    """
+    Format 5 multidata. After the format and compression bytes, slot_data, locations and spheres of each slot are
+    compressed into their own section, followed by a section with the rest of the multidata, a section with the index
+    of all sections, and the offset of the index as 8 byte little endian integer.
+    In each slot's spheres section, the n-th set contains its locations of the n-th sphere.
+    """
+    format_version: typing.ClassVar[int] = 5
+    slot_sections: typing.ClassVar[typing.Tuple[str, ...]] = ("slot_data", "locations", "spheres")
+
+    buffer: memoryview
+    compression: str
+    index: typing.Dict[str, typing.Any]
+
+    def __init__(self, buffer: typing.Union[bytes, bytearray, memoryview, "mmap.mmap"]) -> None:
+        self.buffer = memoryview(buffer)
+        if self.buffer[0] != self.format_version:
+            raise ValueError("Multidata is not indexed.")
+        self.compression = _get_compression(self.buffer[1])
+        index_offset, = struct.unpack_from("<Q", self.buffer, len(self.buffer) - 8)
+        self.index = self.read_section((index_offset, len(self.buffer) - 8 - index_offset))
+
+    @classmethod
+    def dump(cls, multidata: MultiData, file: typing.BinaryIO, compression: str) -> None:
+        start = file.tell()
+        file.write(bytes([cls.format_version, list(Utils.compressions).index(compression)]))
+        index: typing.Dict[str, typing.Any] = {}
+        base = dict(multidata)
+        for key in cls.slot_sections:
+            index[key] = {}
+        for slot, data in base.pop("slot_data").items():
+            index["slot_data"][slot] = _dump_section(data, file, compression, start)
+        for slot, locations in base.pop("locations").items():
+            index["locations"][slot] = _dump_section(locations, file, compression, start)
+        spheres = base.pop("spheres", [])
+        index["sphere_count"] = len(spheres)
+        for slot in sorted({slot for sphere in spheres for slot in sphere}):
+            slot_spheres = [sphere.get(slot, set()) for sphere in spheres]
+            index["spheres"][slot] = _dump_section(slot_spheres, file, compression, start)
+        index["base"] = _dump_section(base, file, compression, start)
+        index_offset, _ = _dump_section(index, file, compression, start)
+        file.write(struct.pack("<Q", index_offset))
+
+    def read_section(self, section: typing.Tuple[int, int]) -> typing.Any:
+        offset, size = section
+        with Utils.DecompressingReader(io.BytesIO(self.buffer[offset:offset + size]), self.compression) as raw_reader, \
+                io.BufferedReader(raw_reader) as reader:
+            return Utils.restricted_load(reader)
+
+    def release(self) -> None:
+        """Releases the buffer, so it can be closed. Sections that weren't read yet can't be read afterwards."""
+        self.buffer.release()
+
+    def load(self, lazy: bool) -> MultiData:
+        """Returns the multidata. If lazy, slot_data and spheres of each slot are decoded on first access instead."""
+        multidata = self.read_section(self.index["base"])
+        # the server needs the locations of every slot to find items for hints, so they are always decoded
+        multidata["locations"] = dict(LazySlotSections(self, self.index["locations"]))
+        slot_data = LazySlotSections(self, self.index["slot_data"])
+        spheres = LazySpheres(LazySlotSections(self, self.index["spheres"]), self.index["sphere_count"])
+        if lazy:
+            multidata["slot_data"] = slot_data
+            multidata["spheres"] = spheres
+        else:
+            multidata["slot_data"] = dict(slot_data)
+            multidata["spheres"] = [dict(sphere) for sphere in spheres]
+        return multidata
+
+
+class LazySlotSections(Mapping[int, typing.Any]):
+    """Per-slot sections of an IndexedMultiData, each decoded on first access."""
+    def __init__(self, multidata: IndexedMultiData, sections: typing.Dict[int, typing.Tuple[int, int]]) -> None:
+        self._multidata = multidata
+        self._sections = sections
+        self._decoded: typing.Dict[int, typing.Any] = {}
+
+    def __getitem__(self, slot: int) -> typing.Any:
+        try:
+            return self._decoded[slot]
+        except KeyError:
+            value = self._decoded[slot] = self._multidata.read_section(self._sections[slot])
+            return value
+
+    def __contains__(self, slot: object) -> bool:
+        return slot in self._sections
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self._sections)
+
+    def __len__(self) -> int:
+        return len(self._sections)
+
+
+class LazySpheres(Sequence[Mapping[int, typing.Set[int]]]):
+    """Spheres of an IndexedMultiData, only decoding the spheres of slots that are looked up."""
+    def __init__(self, slot_spheres: LazySlotSections, sphere_count: int) -> None:
+        self._slot_spheres = slot_spheres
+        self._sphere_count = sphere_count
+
+    @typing.overload
+    def __getitem__(self, index: int) -> Mapping[int, typing.Set[int]]: ...
+
+    @typing.overload
+    def __getitem__(self, index: slice) -> Sequence[Mapping[int, typing.Set[int]]]: ...
+
+    def __getitem__(self, index: typing.Union[int, slice]) -> typing.Any:
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._sphere_count))]
+        if index < 0:
+            index += self._sphere_count
+        if not 0 <= index < self._sphere_count:
+            raise IndexError(index)
+        return _LazySphere(self._slot_spheres, index)
+
+    def __len__(self) -> int:
+        return self._sphere_count
+
+
+class _LazySphere(Mapping[int, typing.Set[int]]):
+    def __init__(self, slot_spheres: LazySlotSections, index: int) -> None:
+        self._slot_spheres = slot_spheres
+        self._index = index
+
+    def __getitem__(self, slot: int) -> typing.Set[int]:
+        locations = self._slot_spheres[slot][self._index]
+        if not locations:
+            raise KeyError(slot)
+        return locations
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return (slot for slot in self._slot_spheres if self._slot_spheres[slot][self._index])
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+
+class SphereIndex:
+    """Sphere of each location, built for a slot the first time one of its locations is looked up.
+
+    A slot's spheres are kept in an array indexed by location id relative to its lowest id when its location ids are
+    dense, otherwise in arrays of sorted location ids and their spheres that are binary searched."""
+    _slots: typing.Dict[int, typing.Tuple[int, array, typing.Optional[array]]]
+
+    def __init__(self, spheres: Sequence[Mapping[int, typing.Set[int]]]) -> None:
+        self.spheres = spheres
+        self._slots = {}
+
+    def __len__(self) -> int:
+        return len(self.spheres)
+
+    def _build(self, slot: int) -> typing.Tuple[int, array, typing.Optional[array]]:
+        location_spheres = sorted((location_id, sphere_index)
+                                  for sphere_index, sphere in enumerate(self.spheres)
+                                  for location_id in sphere.get(slot, ()))
+        if not location_spheres:
+            entry: typing.Tuple[int, array, typing.Optional[array]] = (0, array("i"), None)
+        elif location_spheres[-1][0] - location_spheres[0][0] < 2 * len(location_spheres):
+            start = location_spheres[0][0]
+            spheres = array("i", [-1]) * (location_spheres[-1][0] - start + 1)
+            for location_id, sphere_index in location_spheres:
+                spheres[location_id - start] = sphere_index
+            entry = (start, spheres, None)
+        else:
+            entry = (0, array("i", (sphere_index for _, sphere_index in location_spheres)),
+                     array("q", (location_id for location_id, _ in location_spheres)))
+        self._slots[slot] = entry
+        return entry
+
+    def get_sphere(self, slot: int, location_id: int) -> int:
+        """Get the sphere of a location, raising KeyError if it isn't in any sphere."""
+        start, spheres, location_ids = self._slots.get(slot) or self._build(slot)
+        if location_ids is None:
+            index = location_id - start
+            if 0 <= index < len(spheres) and spheres[index] != -1:
+                return spheres[index]
+        else:
+            index = bisect.bisect_left(location_ids, location_id)
+            if index < len(location_ids) and location_ids[index] == location_id:
+                return spheres[index]
+        raise KeyError(f"No Sphere found for location ID {location_id} belonging to player {slot}. "
+                       f"Location or player may not exist.")
+
+    def get_slot_spheres(self, slot: int) -> typing.Dict[int, int]:
+        """Get the sphere of each of a slot's locations that is in a sphere."""
+        start, spheres, location_ids = self._slots.get(slot) or self._build(slot)
+        if location_ids is None:
+            return {start + index: sphere for index, sphere in enumerate(spheres) if sphere != -1}
+        return dict(zip(location_ids, spheres))
+
+
 if typing.TYPE_CHECKING:  # type-check with pure python implementation until we have a typing stub
     LocationStore = _LocationStore
 else:
@@ -12,10 +12,13 @@ import sys
 import pickle
 import functools
 import io
+import lzma
 import collections
 import importlib
 import logging
+import types
 import warnings
+import zlib
 
 from argparse import Namespace
 from datetime import datetime, timezone
@@ -498,6 +501,106 @@ def restricted_dumps(obj: Any) -> bytes:
     return s
 
 
+class RestrictedPickler(pickle.Pickler):
+    """Pickler that refuses to write globals that RestrictedUnpickler would refuse to load."""
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.unpickler = RestrictedUnpickler(io.BytesIO())
+        self.allowed_globals: Set[typing.Tuple[str, str]] = set()
+
+    def reducer_override(self, obj: Any) -> Any:
+        if isinstance(obj, (type, types.FunctionType, types.BuiltinFunctionType)):
+            key = (getattr(obj, "__module__", None) or pickle.whichmodule(obj, obj.__qualname__), obj.__qualname__)
+            if key not in self.allowed_globals:
+                try:
+                    self.unpickler.find_class(*key)
+                except (pickle.UnpicklingError, AttributeError, ImportError) as e:
+                    raise pickle.PicklingError(e) from e
+                self.allowed_globals.add(key)
+        return NotImplemented
+
+
+def restricted_dump(obj: Any, file: typing.BinaryIO) -> None:
+    """Helper function analogous to pickle.dump(), but checking what is written instead of loading it again."""
+    RestrictedPickler(file).dump(obj)
+
+
+def restricted_load(file: typing.BinaryIO) -> Any:
+    """Helper function analogous to pickle.load()."""
+    return RestrictedUnpickler(file).load()
+
+
+def _get_zstd() -> Any:
+    try:
+        from compression import zstd  # Python 3.14+
+    except ImportError:
+        from backports import zstd
+    return zstd
+
+
+compressions: Dict[str, typing.Callable[[], typing.Tuple[Any, Any]]] = {
+    "zlib": lambda: (zlib.compressobj(9), zlib.decompressobj()),
+    "lzma": lambda: (lzma.LZMACompressor(), lzma.LZMADecompressor()),
+    "zstd": lambda: (_get_zstd().ZstdCompressor(level=10), _get_zstd().ZstdDecompressor()),
+}
+"""Streaming compressions by name, creating a compressor and a decompressor. Their order is used by file formats."""
+
+
+def compression_available(compression: str) -> bool:
+    try:
+        compressions[compression]()
+    except (KeyError, ImportError):
+        return False
+    return True
+
+
+class CompressingWriter(io.RawIOBase):
+    """Compresses everything written to it into another file, chunk by chunk. Closing it does not close the file."""
+    def __init__(self, file: typing.BinaryIO, compression: str) -> None:
+        super().__init__()
+        self.file = file
+        self.compressor = compressions[compression]()[0]
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data: Any) -> int:
+        self.file.write(self.compressor.compress(data))
+        return len(data)
+
+    def close(self) -> None:
+        if not self.closed:
+            self.file.write(self.compressor.flush())
+        super().close()
+
+
+class DecompressingReader(io.RawIOBase):
+    """Decompresses another file chunk by chunk while reading from it. Closing it does not close the file."""
+    chunk_size = 64 * 1024
+
+    def __init__(self, file: typing.BinaryIO, compression: str) -> None:
+        super().__init__()
+        self.file = file
+        self.decompressor = compressions[compression]()[1]
+        self.buffer = memoryview(b"")
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer: Any) -> int:
+        while not self.buffer:
+            if self.decompressor.eof:
+                return 0
+            chunk = self.file.read(self.chunk_size)
+            if not chunk:
+                raise EOFError("Compressed data ended before the end of the stream.")
+            self.buffer = memoryview(self.decompressor.decompress(chunk))
+        size = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
 class ByValue:
     """
     Mixin for enums to pickle value instead of name (restores pre-3.11 behavior). Use as left-most parent.
@@ -37,7 +37,16 @@ app.config["MAX_FORM_MEMORY_SIZE"] = 2 * 1024 * 1024  # 2 MB, needed for large o
 # custom config
 app.config["SELFHOST"] = True  # application process is in charge of running the websites
 app.config["GENERATORS"] = 8  # maximum concurrent world gens
+# how many of the generators are kept for small generations, so they don't have to wait for large ones
+app.config["SMALL_GENERATORS"] = 2
+# estimated cost up to which a generation is small, with every slot costing its GENERATION_GAME_COSTS entry or 1
+app.config["SMALL_GENERATION_COST"] = 10
+app.config["GENERATION_GAME_COSTS"] = {}
 app.config["HOSTERS"] = 8  # maximum concurrent room hosters
+# local UDP port of the first room hoster, which get notified of room commands on it and the following ports.
+# Hosters poll for commands every 5 seconds until they get notified, e.g. if rooms are hosted on another machine.
+# Can be set to None to only poll for commands.
+app.config["COMMAND_NOTIFY_PORT"] = 38290
 app.config["SELFLAUNCH"] = True  # application process is in charge of launching Rooms.
 app.config["SELFLAUNCHCERT"] = None  # can point to a SSL Certificate to encrypt Room websocket connections
 app.config["SELFLAUNCHKEY"] = None  # can point to a SSL Certificate Key to encrypt Room websocket connections
@@ -52,6 +61,9 @@ app.config["MAX_ROOM_TIMEOUT"] = 259200
 app.config["ROOM_AUTO_DELETE"] = 0
 # memory limit for generator processes in bytes
 app.config["GENERATOR_MEMORY_LIMIT"] = 4294967296
+# fork each generation from a process that imported all worlds once, where supported (not on Windows),
+# instead of importing them in every generator process and running several generations in one.
+app.config["GENERATOR_PRELOAD"] = True
 
 # waitress uses one thread for I/O, these are for processing of views that then get sent
 # archipelago.gg uses gunicorn + nginx; ignoring this option
@@ -63,6 +75,9 @@ app.config["PONY"] = {
     'create_db': True
 }
 app.config["MAX_ROLL"] = 20
+# approximate memory in bytes each web process may keep decoded multidata, data packages and saves in for trackers.
+# Measured in their stored, compressed size, so the actual memory used is several times higher.
+app.config["TRACKER_CACHE_SIZE"] = 64 * 1024 * 1024
 app.config["CACHE_TYPE"] = "SimpleCache"
 app.config["HOST_ADDRESS"] = ""
 app.config["ASSET_RIGHTS"] = False
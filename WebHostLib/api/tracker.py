@@ -2,7 +2,7 @@ from datetime import datetime, timezone
 from typing import Any, TypedDict
 from uuid import UUID
 
-from flask import abort
+from flask import Response, abort, jsonify, request
 
 from NetUtils import ClientStatus, Hint, NetworkItem, SlotType
 from WebHostLib import cache
@@ -20,12 +20,14 @@ class PlayerAlias(TypedDict):
 class PlayerItemsReceived(TypedDict):
     team: int
     player: int
+    start: int
     items: list[NetworkItem]
 
 
 class PlayerChecksDone(TypedDict):
     team: int
     player: int
+    start: int
     locations: list[int]
 
 
@@ -64,21 +66,55 @@ class PlayerGame(TypedDict):
     game: str
 
 
+class PlayerSpheres(TypedDict):
+    team: int
+    player: int
+    spheres: list[list[int]]
+
+
 @api_endpoints.route("/tracker/<suuid:tracker>")
-@cache.memoize(timeout=60)
-def tracker_data(tracker: UUID) -> dict[str, Any]:
+def tracker_data(tracker: UUID) -> Response:
     """
     Outputs json data to <root_path>/api/tracker/<id of current session tracker>.
+    Tagged with the version of the room's save, so unchanged data isn't sent again to clients that have it.
 
     :param tracker: UUID of current session tracker.
 
-    :return: Tracking data for all players in the room. Typing and docstrings describe the format of each value.
+    :return: Tracking data for all players in the room, or what changed since the save version passed as since.
+    """
+    since: int | None = request.args.get("since", None, int)
+    room: Room | None = Room.get(tracker=tracker)
+    if not room:
+        abort(404)
+
+    version = room.tracker_summary.generation if room.tracker_summary else 0
+    if not version:
+        # room didn't save since it started counting versions
+        return jsonify(_get_tracker_data(tracker, None, None))
+    etag = str(version) if since is None else f"{version}-{since}"
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = jsonify(_get_tracker_data(tracker, version, since))
+    response.set_etag(etag)
+    return response
+
+
+@cache.memoize(timeout=60)
+def _get_tracker_data(tracker: UUID, version: int | None, since: int | None) -> dict[str, Any]:
+    """
+    :param version: Version of the room's save, only used to not serve a cached result once it saved again.
+    :param since: Version of the room's save the client has data of, to only return what changed since then.
+
+    :return: Typing and docstrings describe the format of each value.
     """
     room: Room | None = Room.get(tracker=tracker)
     if not room:
         abort(404)
 
     tracker_data = TrackerData(room)
+    if tracker_data.get_version() is None:
+        since = None
 
     all_players: dict[int, list[int]] = tracker_data.get_all_players()
 
@@ -90,19 +126,27 @@ def tracker_data(tracker: UUID) -> dict[str, Any]:
                 {"team": team, "player": player, "alias": tracker_data.get_player_alias(team, player)})
 
     player_items_received: list[PlayerItemsReceived] = []
-    """Items received by each player."""
-    for team, players in all_players.items():
-        for player in players:
-            player_items_received.append(
-                {"team": team, "player": player, "items": tracker_data.get_player_received_items(team, player)})
-
+    """Items received by each player, after the first start items, which the client has of the version since."""
     player_checks_done: list[PlayerChecksDone] = []
-    """ID of all locations checked by each player."""
+    """ID of all locations checked by each player, after the first start checks, which the client has of the version
+    since. Checks are counted in the order the room first saved them in."""
     for team, players in all_players.items():
         for player in players:
-            player_checks_done.append(
-                {"team": team, "player": player,
-                 "locations": sorted(tracker_data.get_player_checked_locations(team, player))})
+            items = tracker_data.get_player_received_items(team, player)
+            amounts = tracker_data.get_player_amounts_since(team, player, since) if since is not None else None
+            if amounts is None:
+                player_items_received.append({"team": team, "player": player, "start": 0, "items": items})
+                player_checks_done.append(
+                    {"team": team, "player": player, "start": 0,
+                     "locations": sorted(tracker_data.get_player_checked_locations(team, player))})
+            else:
+                items_start, checks_start = amounts
+                player_items_received.append(
+                    {"team": team, "player": player, "start": items_start, "items": items[items_start:]})
+                player_checks_done.append(
+                    {"team": team, "player": player, "start": checks_start,
+                     "locations": sorted(
+                         tracker_data.get_player_checked_locations_in_order(team, player)[checks_start:])})
 
     total_checks_done: list[TeamTotalChecks] = [
         {"team": team, "checks_done": checks_done}
@@ -111,17 +155,24 @@ def tracker_data(tracker: UUID) -> dict[str, Any]:
     """Total number of locations checked for the entire multiworld per team."""
 
     hints: list[PlayerHints] = []
-    """Hints that all players have used or received."""
+    """Hints that all players have used or received, only of the players whose hints changed since that version."""
+    changed_hints: set[tuple[int, int]] = set()
     for team, players in tracker_data.get_all_slots().items():
         for player in players:
             player_hints = sorted(tracker_data.get_player_hints(team, player))
             hints.append({"team": team, "player": player, "hints": player_hints})
+            player_changed = since is None or tracker_data.get_player_hints_changed_since(team, player, since)
+            if player_changed:
+                changed_hints.add((team, player))
             slot_info = tracker_data.get_slot_info(player)
             # this assumes groups are always after players
             if slot_info.type != SlotType.group:
                 continue
             for member in slot_info.group_members:
                 hints[member - 1]["hints"] += player_hints
+                if player_changed:
+                    changed_hints.add((team, member))
+    hints = [entry for entry in hints if (entry["team"], entry["player"]) in changed_hints]
 
     activity_timers: list[PlayerTimer] = []
     """Time of last activity per player. Returned as RFC 1123 format and null if no connection has been made."""
@@ -156,6 +207,7 @@ def tracker_data(tracker: UUID) -> dict[str, Any]:
                 {"team": team, "player": player, "status": tracker_data.get_player_client_status(team, player)})
 
     return {
+        "version": tracker_data.get_version(),
         "aliases": player_aliases,
         "player_items_received": player_items_received,
         "player_checks_done": player_checks_done,
@@ -222,11 +274,22 @@ def static_tracker_data(tracker: UUID) -> dict[str, Any]:
         for player in players:
             player_game.append({"team": team, "player": player, "game": tracker_data.get_player_game(player)})
 
+    player_spheres: list[PlayerSpheres] = []
+    """ID of the locations of each player in each sphere of the playthrough. Empty if the room has no sphere data."""
+    sphere_count = len(tracker_data.get_spheres())
+    for team, players in all_players.items():
+        for player in players:
+            spheres: list[list[int]] = [[] for _ in range(sphere_count)]
+            for location_id, sphere in sorted(tracker_data.get_player_spheres(player).items()):
+                spheres[sphere].append(location_id)
+            player_spheres.append({"team": team, "player": player, "spheres": spheres})
+
     return {
         "groups": groups,
         "datapackage": tracker_data._multidata["datapackage"],
         "player_locations_total": player_locations_total,
         "player_game": player_game,
+        "player_spheres": player_spheres,
     }
 
 
@@ -1,15 +1,18 @@
 from __future__ import annotations
 
+import collections
 import json
 import logging
 import multiprocessing
+import threading
+import time
 import typing
 from datetime import timedelta
 from threading import Event, Thread
 from typing import Any
 from uuid import UUID
 
-from pony.orm import db_session, select, commit, PrimaryKey, desc
+from pony.orm import db_session, select, commit, desc
 
 from Utils import restricted_loads, utcnow
 from .locker import Locker, AlreadyRunningException
@@ -25,8 +28,9 @@ def stop() -> None:
     stop_event.set()
 
 
-def handle_generation_success(seed_id):
-    logging.info(f"Generation finished for seed {seed_id}")
+def handle_generation_success(result: GenerationResult):
+    logging.info(f"Generation finished for seed {result.seed_id} in {result.generation_time:.1f}s"
+                 + (f", after {result.import_time:.1f}s of importing worlds" if result.import_time >= 0.1 else ""))
 
 
 def handle_generation_failure(result: BaseException):
@@ -36,27 +40,23 @@ def handle_generation_failure(result: BaseException):
         logging.exception(e)
 
 
-def _mp_gen_game(
-    gen_options: dict,
-    meta: dict[str, Any] | None = None,
-    owner=None,
-    sid=None,
-    timeout: int|None = None,
-) -> PrimaryKey | None:
-    from setproctitle import setproctitle
+def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None,
+                     scheduler: GenerationScheduler) -> None:
+    generation_id = generation.id
 
-    setproctitle(f"Generator ({sid})")
-    try:
-        return gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
-    finally:
-        setproctitle(f"Generator (idle)")
+    def on_success(result: GenerationResult) -> None:
+        scheduler.finish(generation_id)
+        handle_generation_success(result)
 
+    def on_failure(result: BaseException) -> None:
+        scheduler.finish(generation_id)
+        handle_generation_failure(result)
 
-def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, timeout: int|None) -> None:
     try:
         meta = json.loads(generation.meta)
         options = restricted_loads(generation.options)
         logging.info(f"Generating {generation.id} for {len(options)} players")
+        scheduler.start(generation, options)
         pool.apply_async(
             _mp_gen_game,
             (options,),
@@ -66,10 +66,11 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
                 "owner": generation.owner,
                 "timeout": timeout,
             },
-            handle_generation_success,
-            handle_generation_failure,
+            on_success,
+            on_failure,
         )
     except Exception as e:
+        scheduler.finish(generation_id)
         generation.state = STATE_ERROR
         commit()
         logging.exception(e)
@@ -77,27 +78,145 @@ def launch_generator(pool: multiprocessing.pool.Pool, generation: Generation, ti
         generation.state = STATE_STARTED
 
 
-def init_generator(config: dict[str, Any]) -> None:
-    from setproctitle import setproctitle
-
-    setproctitle("Generator (idle)")
-
-    try:
-        import resource
-    except ModuleNotFoundError:
-        pass  # unix only module
-    else:
-        # set soft limit for memory to from config (default 4GiB)
-        soft_limit = config["GENERATOR_MEMORY_LIMIT"]
-        old_limit, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
-        if soft_limit != old_limit:
-            resource.setrlimit(resource.RLIMIT_AS, (soft_limit, hard_limit))
-            logging.debug(f"Changed AS mem limit {old_limit} -> {soft_limit}")
-        del resource, soft_limit, hard_limit
-
-    pony_config = config["PONY"]
-    db.bind(**pony_config)
-    db.generate_mapping()
+class QueuedGeneration(typing.NamedTuple):
+    owner: UUID
+    cost: float
+    queued_time: float
+    """time.monotonic() the scheduler first saw the generation queued at"""
+    started_time: float = 0
+    """time.monotonic() the generation was handed to the pool at, once it is running"""
+
+
+class GenerationQueueStats(typing.NamedTuple):
+    queued: int
+    queued_small: int
+    running: int
+    running_small: int
+    longest_wait: float
+    """seconds the generation queued the longest has waited so far"""
+    recent_wait: float
+    """average seconds the last started generations waited for"""
+
+
+class GenerationScheduler:
+    """Decides which queued generations to start, instead of handing all of them to the generator pool in order,
+    where a single huge generation could hold up all smaller ones queued after it.
+
+    The cost of a generation is estimated from its players' games, see GENERATION_GAME_COSTS. Generations of up to
+    SMALL_GENERATION_COST are small, others may only run on the generators not reserved for small ones by
+    SMALL_GENERATORS. So small generations get ahead of queued large ones, without stopping large ones once running.
+    Free generators go to the owner with the fewest generations running, then to the generation queued the longest."""
+    recent_waits: typing.ClassVar[int] = 20
+    job_time_margin: typing.ClassVar[float] = 60
+    """seconds past JOB_TIME after which a running generation is assumed to have lost its worker"""
+
+    generators: int
+    small_generators: int
+    small_cost: float
+    game_costs: dict[str, float]
+    job_time: float
+    queued: dict[UUID, QueuedGeneration]
+    running: dict[UUID, QueuedGeneration]
+    """generations handed to the pool that didn't finish yet, accessed from the pool's result thread as well"""
+    waits: typing.Deque[float]
+
+    def __init__(self, config: dict[str, Any]):
+        self.generators = config["GENERATORS"]
+        # always leave a generator to large generations
+        self.small_generators = max(0, min(config["SMALL_GENERATORS"], self.generators - 1))
+        self.small_cost = config["SMALL_GENERATION_COST"]
+        self.game_costs = config["GENERATION_GAME_COSTS"]
+        self.job_time = config["JOB_TIME"]
+        self.queued = {}
+        self.running = {}
+        self.lock = threading.Lock()
+        self.waits = collections.deque(maxlen=self.recent_waits)
+
+    def estimate_cost(self, options: dict[str, dict[str, Any]]) -> float:
+        return sum(self.game_costs.get(player_options.get("game"), 1) for player_options in options.values())
+
+    def is_small(self, generation: QueuedGeneration) -> bool:
+        return generation.cost <= self.small_cost
+
+    def schedule(self, generations: typing.Iterable[Generation]) -> list[Generation]:
+        """Returns which of the queued generations to start now, for all of them to be started with start."""
+        now = time.monotonic()
+        queued: dict[UUID, QueuedGeneration] = {}
+        candidates: dict[UUID, Generation] = {}
+        for generation in generations:
+            queued_generation = self.queued.get(generation.id)
+            if queued_generation is None:
+                try:
+                    cost = self.estimate_cost(restricted_loads(generation.options))
+                except Exception:
+                    cost = 0  # fails again and gets reported when it is started
+                queued_generation = QueuedGeneration(generation.owner, cost, now)
+            queued[generation.id] = queued_generation
+            candidates[generation.id] = generation
+        self.queued = queued  # also forgets generations deleted while they were queued
+
+        running = self.get_running()
+        owner_running = collections.Counter(running_generation.owner for running_generation in running)
+        large_running = sum(not self.is_small(running_generation) for running_generation in running)
+        free = self.generators - len(running)
+        to_start: list[Generation] = []
+
+        def priority(generation_id: UUID) -> tuple[int, float]:
+            return owner_running[queued[generation_id].owner], queued[generation_id].queued_time
+
+        while free > 0 and candidates:
+            allowed = [generation_id for generation_id in candidates
+                       if self.is_small(queued[generation_id]) or
+                       large_running < self.generators - self.small_generators]
+            if not allowed:
+                break
+            generation_id = min(allowed, key=priority)
+            queued_generation = queued[generation_id]
+            owner_running[queued_generation.owner] += 1
+            large_running += not self.is_small(queued_generation)
+            free -= 1
+            to_start.append(candidates.pop(generation_id))
+        return to_start
+
+    def start(self, generation: Generation, options: dict[str, dict[str, Any]]) -> None:
+        queued_generation = self.queued.pop(generation.id, None)
+        if queued_generation is None:
+            # resumed after a restart, or started without being scheduled
+            queued_generation = QueuedGeneration(generation.owner, self.estimate_cost(options), time.monotonic())
+        else:
+            self.waits.append(time.monotonic() - queued_generation.queued_time)
+        with self.lock:
+            self.running[generation.id] = queued_generation._replace(started_time=time.monotonic())
+
+    def finish(self, generation_id: UUID) -> None:
+        with self.lock:
+            self.running.pop(generation_id, None)
+
+    def get_running(self) -> list[QueuedGeneration]:
+        """Returns the running generations. Forgets those running for longer than JOB_TIME allows, as the pool never
+        reports the result of a generation whose worker died, which would otherwise keep its generator forever."""
+        expiry = time.monotonic() - self.job_time - self.job_time_margin
+        with self.lock:
+            expired = [generation_id for generation_id, running_generation in self.running.items()
+                       if running_generation.started_time < expiry]
+            for generation_id in expired:
+                del self.running[generation_id]
+            running = list(self.running.values())
+        for generation_id in expired:
+            logging.warning(f"Generation {generation_id} didn't finish in time, freeing its generator.")
+        return running
+
+    def get_stats(self) -> GenerationQueueStats:
+        now = time.monotonic()
+        running = self.get_running()
+        return GenerationQueueStats(
+            len(self.queued),
+            sum(self.is_small(queued_generation) for queued_generation in self.queued.values()),
+            len(running),
+            sum(self.is_small(running_generation) for running_generation in running),
+            max((now - queued_generation.queued_time for queued_generation in self.queued.values()), default=0),
+            sum(self.waits) / len(self.waits) if self.waits else 0,
+        )
 
 
 def cleanup(config: dict[str, Any]):
@@ -153,9 +272,9 @@ def autogen(config: dict):
         try:
             with Locker("autogen"):
 
-                with multiprocessing.Pool(config["GENERATORS"], initializer=init_generator,
-                                          initargs=(config,), maxtasksperchild=10) as generator_pool:
+                with get_generator_pool(config) as generator_pool:
                     job_time = config["JOB_TIME"]
+                    scheduler = GenerationScheduler(config)
                     with db_session:
                         to_start = select(generation for generation in Generation if generation.state == STATE_STARTED)
 
@@ -166,19 +285,28 @@ def autogen(config: dict):
                                 if sid:
                                     generation.delete()
                                 else:
-                                    launch_generator(generator_pool, generation, timeout=job_time)
+                                    launch_generator(generator_pool, generation, job_time, scheduler)
 
                             commit()
                         select(generation for generation in Generation if generation.state == STATE_ERROR).delete()
 
+                    next_stats = 0.0
                     while not stop_event.wait(0.1):
                         with db_session:
                             # for update locks the database row(s) during transaction, preventing writes from elsewhere
-                            to_start = select(
+                            queued = select(
                                 generation for generation in Generation
                                 if generation.state == STATE_QUEUED).for_update()
-                            for generation in to_start:
-                                launch_generator(generator_pool, generation, timeout=job_time)
+                            for generation in scheduler.schedule(queued):
+                                launch_generator(generator_pool, generation, job_time, scheduler)
+                        if time.monotonic() >= next_stats:
+                            next_stats = time.monotonic() + 60
+                            stats = scheduler.get_stats()
+                            if stats.queued or stats.running:
+                                logging.info(
+                                    f"Generation queue: {stats.queued} queued ({stats.queued_small} small), "
+                                    f"{stats.running} running ({stats.running_small} small), longest waiting "
+                                    f"{stats.longest_wait:.0f}s, recently started waited {stats.recent_wait:.0f}s")
         except AlreadyRunningException:
             logging.info("Autogen reports as already running, not starting another.")
 
@@ -196,6 +324,8 @@ class MultiworldInstance():
         self.rooms_to_start = multiprocessing.Queue()
         self.rooms_shutting_down = multiprocessing.Queue()
         self.name = f"MultiHoster{id}"
+        self.command_notify_port = None if config.get("COMMAND_NOTIFY_PORT") is None \
+            else config["COMMAND_NOTIFY_PORT"] + id
 
     def start(self):
         if self.process and self.process.is_alive():
@@ -204,7 +334,8 @@ class MultiworldInstance():
         process = multiprocessing.Process(group=None, target=run_server_process,
                                           args=(self.name, self.ponyconfig, get_static_server_data(),
                                                 self.cert, self.key, self.host,
-                                                self.rooms_to_start, self.rooms_shutting_down),
+                                                self.rooms_to_start, self.rooms_shutting_down,
+                                                self.command_notify_port),
                                           name=self.name)
         process.start()
         self.process = process
@@ -231,6 +362,6 @@ class MultiworldInstance():
         self.process = None
 
 
-from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, db, Seed, Slot
+from .models import Room, Generation, STATE_QUEUED, STATE_STARTED, STATE_ERROR, Seed, Slot
 from .customserver import run_server_process, get_static_server_data
-from .generate import gen_game
+from .generator import GenerationResult, _mp_gen_game, get_generator_pool
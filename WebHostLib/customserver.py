@@ -1,14 +1,20 @@
 from __future__ import annotations
 
+import array
 import asyncio
+import bisect
 import collections
 import datetime
 import functools
+import hashlib
 import logging
+import mmap
 import multiprocessing
+import os
 import pickle
 import random
 import socket
+import struct
 import threading
 import time
 import typing
@@ -17,6 +23,7 @@ import sys
 import websockets
 from pony.orm import commit, db_session, select
 
+import NetUtils
 import Utils
 
 from MultiServer import (
@@ -25,7 +32,7 @@ from MultiServer import (
 )
 from Utils import restricted_loads, cache_argsless
 from .locker import Locker
-from .models import Command, GameDataPackage, Room, db
+from .models import Command, GameDataPackage, Room, RoomTrackerSummary, db
 
 
 class CustomClientMessageProcessor(ClientMessageProcessor):
@@ -60,8 +67,217 @@ class DBCommandProcessor(ServerCommandProcessor):
         self.ctx.logger.info(text)
 
 
+class CommandNotifyProtocol(asyncio.DatagramProtocol):
+    """Wakes a DBCommandListener for any datagram, their content doesn't matter."""
+
+    def __init__(self, wakeup: asyncio.Event):
+        self.wakeup = wakeup
+
+    def datagram_received(self, data: bytes, addr: typing.Any):
+        self.wakeup.set()
+
+
+class DBCommandListener:
+    """Delivers the Commands of all rooms hosted by a process, querying the database for all of them at once.
+    Queries when notified of new Commands, or every interval in case notifications are disabled or got lost."""
+    interval: typing.ClassVar[float] = 5
+    notified_interval: typing.ClassVar[float] = 60
+    """interval once a notification arrived, as until then the web app may not be able to reach this process"""
+    max_rooms_per_query: typing.ClassVar[int] = 500
+    """keeps the query below the parameter limit of the database"""
+
+    processors: typing.Dict[typing.Any, DBCommandProcessor]
+    task: typing.Optional[asyncio.Task]
+    wakeup: asyncio.Event
+    transport: typing.Optional[asyncio.DatagramTransport]
+    notified: bool
+
+    def __init__(self):
+        self.processors = {}
+        self.task = None
+        self.wakeup = asyncio.Event()
+        self.transport = None
+        self.notified = False
+
+    async def listen_for_notifications(self, port: int):
+        try:
+            self.transport, _ = await asyncio.get_running_loop().create_datagram_endpoint(
+                lambda: CommandNotifyProtocol(self.wakeup), local_addr=("127.0.0.1", port))
+        except OSError as e:
+            logging.warning(f"Could not listen for Command notifications on port {port}, "
+                            f"polling every {self.interval} seconds instead: {e}")
+
+    def add(self, ctx: WebHostContext):
+        self.processors[ctx.room_id] = DBCommandProcessor(ctx)
+        if not self.task:
+            self.task = asyncio.create_task(self.listen())
+
+    def remove(self, ctx: WebHostContext):
+        self.processors.pop(ctx.room_id, None)
+
+    async def listen(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self.processors:
+                # notifications arriving while fetching are handled together by the next fetch
+                self.wakeup.clear()
+                for room_id, commandtext in await loop.run_in_executor(None, self._fetch_commands,
+                                                                       list(self.processors)):
+                    processor = self.processors.get(room_id)
+                    if processor:
+                        processor(commandtext)
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(),
+                                           self.notified_interval if self.notified else self.interval)
+                except asyncio.TimeoutError:
+                    pass
+                else:
+                    self.notified = True
+        finally:
+            self.task = None
+
+    def _fetch_commands(self, room_ids: typing.List[typing.Any]) -> typing.List[typing.Tuple[typing.Any, str]]:
+        fetched = []
+        with db_session:
+            for start in range(0, len(room_ids), self.max_rooms_per_query):
+                chunk = room_ids[start:start + self.max_rooms_per_query]
+                for command in select(command for command in Command if command.room.id in chunk):
+                    fetched.append((command.room.id, command.commandtext))
+                    command.delete()
+            if fetched:
+                commit()
+        return fetched
+
+
+class StaticNames(typing.Mapping[int, str]):
+    """Read-only id to name table in the layout written by pack_name_tables, shared by the rooms of all processes
+    through a memory mapped file. Unknown ids are named like in Context.item_names, without being stored."""
+    __slots__ = ("kind", "ids", "offsets", "names")
+
+    def __init__(self, kind: str, buffer: memoryview, offset: int):
+        self.kind = kind
+        count = buffer[offset:offset + 8].cast("q")[0]
+        offset += 8
+        self.ids = buffer[offset:offset + 8 * count].cast("q")
+        offset += 8 * count
+        self.offsets = buffer[offset:offset + 4 * (count + 1)].cast("I")
+        offset = _align(offset + 4 * (count + 1))
+        self.names = buffer[offset:offset + self.offsets[count]]
+
+    def _find(self, code: int) -> int:
+        index = bisect.bisect_left(self.ids, code)
+        if index < len(self.ids) and self.ids[index] == code:
+            return index
+        return -1
+
+    def __getitem__(self, code: int) -> str:
+        index = self._find(code)
+        if index < 0:
+            return f"Unknown {self.kind} (ID:{code})"
+        return str(self.names[self.offsets[index]:self.offsets[index + 1]], "utf-8")
+
+    def __contains__(self, code: object) -> bool:
+        return isinstance(code, int) and self._find(code) >= 0
+
+    def __iter__(self) -> typing.Iterator[int]:
+        return iter(self.ids)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+def _align(offset: int) -> int:
+    return offset + -offset % 8
+
+
+def _pack_names(names: typing.Dict[int, str], data: bytearray) -> int:
+    offset = len(data)
+    ids = sorted(names)
+    encoded = [names[code].encode("utf-8") for code in ids]
+    offsets = array.array("I", [0])
+    for name in encoded:
+        offsets.append(offsets[-1] + len(name))
+    data += struct.pack("<q", len(ids))
+    data += array.array("q", ids).tobytes()
+    data += offsets.tobytes()
+    data += bytes(_align(len(data)) - len(data))
+    for name in encoded:
+        data += name
+    data += bytes(_align(len(data)) - len(data))
+    return offset
+
+
+def pack_name_tables(gamespackage: typing.Dict[str, typing.Dict[str, typing.Any]]
+                     ) -> typing.Tuple[bytes, typing.Dict[str, typing.Tuple[int, int]]]:
+    """Packs the id to name tables of each game, with Archipelago's names added like Context._init_game_data does.
+    Each table is its size, its sorted ids, the offsets of their names and the utf-8 names.
+    Returns the packed tables and the offsets of each game's item and location table in them."""
+    data = bytearray()
+    index = {}
+    archipelago_package = gamespackage.get("Archipelago", {})
+    for game_name, game_package in gamespackage.items():
+        item_names = {item_id: item_name for item_name, item_id in game_package["item_name_to_id"].items()}
+        location_names = {location_id: location_name for location_name, location_id
+                          in game_package["location_name_to_id"].items()}
+        if game_name != "Archipelago":
+            for item_name, item_id in archipelago_package.get("item_name_to_id", {}).items():
+                item_names[item_id] = item_name
+            for location_name, location_id in archipelago_package.get("location_name_to_id", {}).items():
+                location_names[location_id] = location_name
+        index[game_name] = _pack_names(item_names, data), _pack_names(location_names, data)
+    return bytes(data), index
+
+
+def write_name_tables(gamespackage: typing.Dict[str, typing.Dict[str, typing.Any]], directory: str
+                      ) -> typing.Tuple[str, typing.Dict[str, typing.Tuple[int, int]]]:
+    """Writes the packed name tables to a file named after their content, so processes and restarts with the same worlds
+    share it. Returns its path and the offsets of each game's tables."""
+    data, index = pack_name_tables(gamespackage)
+    path = os.path.join(directory, f"name_tables_{hashlib.sha256(data).hexdigest()[:16]}.bin")
+    if not os.path.exists(path):
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    return path, index
+
+
+class StaticNameTables:
+    """The name tables Context._init_game_data builds for each game, for the games of the static server data.
+    The id to name tables are mapped from the file written by write_name_tables and shared with all room processes,
+    the name sets are built once per process. Every room that uses a static data package references them."""
+    gamespackage: typing.Dict[str, typing.Dict[str, typing.Any]]
+    item_names: typing.Dict[str, StaticNames]
+    location_names: typing.Dict[str, StaticNames]
+    all_item_and_group_names: typing.Dict[str, typing.FrozenSet[str]]
+    all_location_and_group_names: typing.Dict[str, typing.FrozenSet[str]]
+
+    def __init__(self, static_server_data: dict,
+                 name_tables: typing.Tuple[str, typing.Dict[str, typing.Tuple[int, int]]]):
+        self.gamespackage = static_server_data["gamespackage"]
+        item_name_groups = static_server_data["item_name_groups"]
+        location_name_groups = static_server_data["location_name_groups"]
+        path, index = name_tables
+        with open(path, "rb") as f:
+            buffer = memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        self.item_names = {}
+        self.location_names = {}
+        self.all_item_and_group_names = {}
+        self.all_location_and_group_names = {}
+        for game_name, game_package in self.gamespackage.items():
+            item_offset, location_offset = index[game_name]
+            self.item_names[game_name] = StaticNames("item", buffer, item_offset)
+            self.location_names[game_name] = StaticNames("location", buffer, location_offset)
+            self.all_item_and_group_names[game_name] = \
+                frozenset(game_package["item_name_to_id"]) | frozenset(item_name_groups.get(game_name, ()))
+            self.all_location_and_group_names[game_name] = \
+                frozenset(game_package["location_name_to_id"]) | frozenset(location_name_groups.get(game_name, ()))
+
+
 class WebHostContext(Context):
     room_id: int
+    static_name_tables: typing.Optional[StaticNameTables] = None
 
     def __init__(self, static_server_data: dict, logger: logging.Logger):
         # static server data is used during _load_game_data to load required data,
@@ -73,6 +289,7 @@ class WebHostContext(Context):
         del self.static_server_data
         self.main_loop = asyncio.get_running_loop()
         self.video = {}
+        self.tracker_history = TrackerHistory()
         self.tags = ["AP", "WebHost"]
 
     def __del__(self):
@@ -87,26 +304,31 @@ class WebHostContext(Context):
         for key, value in self.static_server_data.items():
             # NOTE: attributes are mutable and shared, so they will have to be copied before being modified
             setattr(self, key, value)
-        self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
-
-    async def listen_to_db_commands(self):
-        cmdprocessor = DBCommandProcessor(self)
-
-        while not self.exit_event.is_set():
-            await self.main_loop.run_in_executor(None, self._process_db_commands, cmdprocessor)
-            try:
-                await asyncio.wait_for(self.exit_event.wait(), 5)
-            except asyncio.TimeoutError:
-                pass
-
-    def _process_db_commands(self, cmdprocessor):
-        with db_session:
-            commands = select(command for command in Command if command.room.id == self.room_id)
-            if commands:
-                for command in commands:
-                    self.main_loop.call_soon_threadsafe(cmdprocessor, command.commandtext)
-                    command.delete()
-                commit()
+        if not isinstance(self.non_hintable_names, collections.defaultdict):
+            self.non_hintable_names = collections.defaultdict(frozenset, self.non_hintable_names)
+
+    def _init_game_data(self):
+        tables = self.static_name_tables
+        if not tables:
+            return super()._init_game_data()
+        gamespackage = self.gamespackage
+        custom_gamespackage = {}
+        for game_name, game_package in gamespackage.items():
+            if tables.gamespackage.get(game_name) is game_package:
+                if "checksum" in game_package:
+                    self.checksums[game_name] = game_package["checksum"]
+                self.item_names[game_name] = tables.item_names[game_name]
+                self.location_names[game_name] = tables.location_names[game_name]
+                self.all_item_and_group_names[game_name] = tables.all_item_and_group_names[game_name]
+                self.all_location_and_group_names[game_name] = tables.all_location_and_group_names[game_name]
+            else:
+                custom_gamespackage[game_name] = game_package
+        # only build tables for custom data packages, which still get Archipelago's names added from the shared table
+        self.gamespackage = custom_gamespackage
+        try:
+            super()._init_game_data()
+        finally:
+            self.gamespackage = gamespackage
 
     @db_session
     def load(self, room_id: int):
@@ -117,7 +339,7 @@ class WebHostContext(Context):
         else:
             self.port = get_random_port()
 
-        multidata = self.decompress(room.seed.multidata)
+        multidata = NetUtils.open_multidata(room.seed.multidata)
         game_data_packages = {}
 
         static_gamespackage = self.gamespackage  # this is shared across all rooms
@@ -159,17 +381,31 @@ class WebHostContext(Context):
         self.saving = enabled
         if self.saving:
             with db_session:
-                savegame_data = Room.get(id=self.room_id).multisave
+                room = Room.get(id=self.room_id)
+                savegame_data = room.multisave
                 if savegame_data:
                     self.set_save(restricted_loads(savegame_data))
+                if room.tracker_summary:
+                    self.tracker_history = TrackerHistory(restricted_loads(room.tracker_summary.data))
             self._start_async_saving(atexit_save=False)
-        asyncio.create_task(self.listen_to_db_commands())
 
     @db_session
     def _save(self, exit_save: bool = False) -> bool:
         room = Room.get(id=self.room_id)
+        with self.unsaved_lock:
+            # only used to tell which hints changed for the tracker history, as rooms don't write a save journal.
+            # Taken before the save, so hints changing in between are in this save and marked again for the next one.
+            changed_hints = self.unsaved.pop("hints", ())
+            self.unsaved.clear()
+        save = self.get_save()
         # Does not use Utils.restricted_dumps because we'd rather make a save than not make one
-        room.multisave = pickle.dumps(self.get_save())
+        room.multisave = pickle.dumps(save)
+        self.tracker_history.update(save, changed_hints)
+        summary = pickle.dumps(get_tracker_summary(save, self.tracker_history))
+        if room.tracker_summary:
+            room.tracker_summary.set(data=summary, generation=self.tracker_history.generation)
+        else:
+            RoomTrackerSummary(room=room, data=summary, generation=self.tracker_history.generation)
         # saving only occurs on activity, so we can "abuse" this information to mark this as last_activity
         if not exit_save:  # we don't want to count a shutdown as activity, which would restart the server again
             room.last_activity = Utils.utcnow()
@@ -181,6 +417,81 @@ class WebHostContext(Context):
         return d
 
 
+tracker_summary_keys = ("hints", "name_aliases", "client_game_state", "client_activity_timers",
+                        "client_connection_timers", "video")
+"""parts of the save trackers use as they are, the larger parts they use are aggregated in get_tracker_summary"""
+
+
+class TrackerHistory:
+    """Lets trackers tell which received items, checked locations and hints of a room are new since an earlier save.
+    Kept by the room, updated and written to its tracker summary with every save, which counts as a generation.
+
+    Received items are only ever appended and checks are kept in the order they were first saved in, so the amount of
+    each a player had as of a generation tells which are new. Those amounts are kept whenever they change,
+    for the last max_changes changes of each player."""
+    max_changes: typing.ClassVar[int] = 100
+
+    generation: int
+    first_generation: int
+    """generation the history started at, for rooms saved before it existed"""
+    check_order: typing.Dict[typing.Tuple[int, int], typing.List[int]]
+    changes: typing.Dict[typing.Tuple[int, int], typing.List[typing.Tuple[int, int, int]]]
+    """generation, amount of received items and amount of checks of each player, whenever those changed"""
+    hints_generation: typing.Dict[typing.Tuple[int, int], int]
+    """generation each player's hints last changed in"""
+
+    def __init__(self, summary: typing.Optional[dict] = None):
+        if summary and "generation" in summary:
+            self.generation = summary["generation"]
+            self.first_generation = summary["first_generation"]
+            self.check_order = summary["check_order"]
+            self.changes = summary["changes"]
+            self.hints_generation = summary["hints_generation"]
+        else:
+            self.generation = 0
+            self.first_generation = 1
+            self.check_order = {}
+            self.changes = {}
+            self.hints_generation = {}
+
+    def update(self, save: dict, changed_hints: typing.Iterable[typing.Tuple[int, int]]) -> None:
+        self.generation += 1
+        received_items = save["received_items"]
+        for team_slot, checks in save["location_checks"].items():
+            order = self.check_order.setdefault(team_slot, [])
+            if len(checks) > len(order):
+                order.extend(sorted(checks.difference(order)))
+        for team, slot in set(self.check_order) | {(team, slot) for team, slot, remote in received_items if remote}:
+            amounts = len(received_items.get((team, slot, True), ())), len(self.check_order.get((team, slot), ()))
+            changes = self.changes.get((team, slot))
+            if changes is None:
+                changes = self.changes[team, slot] = []
+                if self.generation > self.first_generation:
+                    # absent from every save of the history so far
+                    changes.append((self.first_generation, 0, 0))
+            elif changes[-1][1:] == amounts:
+                continue
+            changes.append((self.generation, *amounts))
+            del changes[:-self.max_changes]
+        for team_slot in changed_hints:
+            self.hints_generation[team_slot] = self.generation
+
+    def get_summary(self) -> dict:
+        return {"generation": self.generation, "first_generation": self.first_generation,
+                "check_order": self.check_order, "changes": self.changes, "hints_generation": self.hints_generation}
+
+
+def get_tracker_summary(save: dict, history: TrackerHistory) -> dict:
+    """Returns the parts of a save trackers show, with checked locations and received items reduced to their counts,
+    so they can be read without decoding the whole save."""
+    summary = {key: save[key] for key in tracker_summary_keys if key in save}
+    summary["location_check_counts"] = {team_slot: len(checks) for team_slot, checks in save["location_checks"].items()}
+    summary["received_item_counts"] = {(team, slot): collections.Counter(item.item for item in items)
+                                       for (team, slot, remote), items in save["received_items"].items() if remote}
+    summary.update(history.get_summary())
+    return summary
+
+
 def get_random_port():
     return random.randint(49152, 65535)
 
@@ -210,12 +521,21 @@ def get_static_server_data() -> dict:
             for world_name, world in worlds.AutoWorldRegister.world_types.items()
         },
     }
+    data["name_tables"] = write_name_tables(data["gamespackage"], Utils.cache_path("webhost"))
 
     return data
 
 
+def share_static_server_data(static_server_data: dict) -> None:
+    """Prepares static server data to be shared by all rooms of a process, instead of each room building its own copy of
+    the derived name tables."""
+    static_server_data["non_hintable_names"] = collections.defaultdict(frozenset,
+                                                                       static_server_data["non_hintable_names"])
+    static_server_data["static_name_tables"] = StaticNameTables(static_server_data,
+                                                                static_server_data.pop("name_tables"))
+
+
 def set_up_logging(room_id) -> logging.Logger:
-    import os
     # logger setup
     logger = logging.getLogger(f"RoomLogger {room_id}")
 
@@ -247,7 +567,8 @@ def tear_down_logging(room_id):
 
 def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                        cert_file: typing.Optional[str], cert_key_file: typing.Optional[str],
-                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue):
+                       host: str, rooms_to_run: multiprocessing.Queue, rooms_shutting_down: multiprocessing.Queue,
+                       command_notify_port: typing.Optional[int] = None):
     from setproctitle import setproctitle
 
     setproctitle(name)
@@ -287,10 +608,15 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 load_date = today
             return ssl_context
 
+    share_static_server_data(static_server_data)
+    db_command_listener = DBCommandListener()
+
     del ponyconfig
     gc.collect()  # free intermediate objects used during setup
 
     loop = asyncio.get_event_loop()
+    if command_notify_port is not None:
+        loop.run_until_complete(db_command_listener.listen_for_notifications(command_notify_port))
 
     async def start_room(room_id):
         with Locker(f"RoomLocker {room_id}"):
@@ -299,6 +625,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                 ctx = WebHostContext(static_server_data, logger)
                 ctx.load(room_id)
                 ctx.init_save()
+                db_command_listener.add(ctx)
                 assert ctx.server is None
                 try:
                     ctx.server = websockets.serve(
@@ -356,6 +683,7 @@ def run_server_process(name: str, ponyconfig: dict, static_server_data: dict,
                     setattr(asyncio.current_task(), "save", None)
             finally:
                 try:
+                    db_command_listener.remove(ctx)
                     ctx.save_dirty = False  # make sure the saving thread does not write to DB after final wakeup
                     ctx.exit_event.set()  # make sure the saving thread stops at some point
                     # NOTE: async saving should probably be an async task and could be merged with shutdown_task
@@ -0,0 +1,100 @@
+"""Worker processes generating the multiworlds queued in the database, see autolauncher.autogen.
+
+Kept apart from the autolauncher, so a worker only imports the worlds when it imports .generate,
+which warm workers have done before being forked, see get_generator_pool."""
+from __future__ import annotations
+
+import logging
+import multiprocessing
+import multiprocessing.pool
+import sys
+import time
+import typing
+from typing import Any
+from uuid import UUID
+
+import ModuleUpdate
+
+# the WebHost checked the requirements, which the forkserver of warm generators can't tell, as it isn't its child
+ModuleUpdate.update_ran = True
+
+preload_modules = ["WebHostLib.generator", "WebHostLib.generate"]
+"""modules the forkserver of warm generators imports once, before forking a worker off of it per job"""
+
+_import_time: float = 0
+"""seconds the worker spent importing .generate and with it all worlds, reported with its first job"""
+
+
+class GenerationResult(typing.NamedTuple):
+    seed_id: UUID | None
+    import_time: float
+    """seconds the worker took to import the worlds before this job, 0 if it or its forkserver imported them before"""
+    generation_time: float
+
+
+def get_generator_pool(config: dict[str, Any]) -> multiprocessing.pool.Pool:
+    """Returns a pool of GENERATORS workers to run _mp_gen_game in.
+    With GENERATOR_PRELOAD, on platforms that can fork, every job gets a fresh worker that is forked from a forkserver,
+    which imported all worlds once. So jobs don't wait for the imports, nor can state of a world leak between them,
+    and a job that ran out of time can't keep running next to the next one.
+    Otherwise, workers import the worlds themselves and run up to 10 jobs each."""
+    if config["GENERATOR_PRELOAD"] and "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(preload_modules)
+        maxtasksperchild = 1
+    else:
+        context = multiprocessing.get_context()
+        maxtasksperchild = 10
+    return context.Pool(config["GENERATORS"], initializer=init_generator, initargs=(config,),
+                        maxtasksperchild=maxtasksperchild)
+
+
+def init_generator(config: dict[str, Any]) -> None:
+    global _import_time
+    from setproctitle import setproctitle
+
+    setproctitle("Generator (idle)")
+
+    try:
+        import resource
+    except ModuleNotFoundError:
+        pass  # unix only module
+    else:
+        # set soft limit for memory to from config (default 4GiB)
+        soft_limit = config["GENERATOR_MEMORY_LIMIT"]
+        old_limit, hard_limit = resource.getrlimit(resource.RLIMIT_AS)
+        if soft_limit != old_limit:
+            resource.setrlimit(resource.RLIMIT_AS, (soft_limit, hard_limit))
+            logging.debug(f"Changed AS mem limit {old_limit} -> {soft_limit}")
+        del resource, soft_limit, hard_limit
+
+    if "WebHostLib.generate" not in sys.modules:  # already imported by a warm worker's forkserver
+        start = time.perf_counter()
+        from . import generate  # noqa: F401
+        _import_time = time.perf_counter() - start
+
+    from .models import db
+    pony_config = config["PONY"]
+    db.bind(**pony_config)
+    db.generate_mapping()
+
+
+def _mp_gen_game(
+    gen_options: dict,
+    meta: dict[str, Any] | None = None,
+    owner=None,
+    sid=None,
+    timeout: int|None = None,
+) -> GenerationResult:
+    global _import_time
+    from setproctitle import setproctitle
+    from .generate import gen_game
+
+    setproctitle(f"Generator ({sid})")
+    import_time, _import_time = _import_time, 0
+    start = time.perf_counter()
+    try:
+        seed_id = gen_game(gen_options, meta=meta, owner=owner, sid=sid, timeout=timeout)
+        return GenerationResult(seed_id, import_time, time.perf_counter() - start)
+    finally:
+        setproctitle(f"Generator (idle)")
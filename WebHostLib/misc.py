@@ -1,5 +1,6 @@
 import datetime
 import os
+import socket
 import warnings
 from enum import StrEnum
 from typing import Any, IO, Dict, Iterator, List, Tuple, Union
@@ -225,9 +226,23 @@ def host_room_command(room: UUID):
         if cmd:
             Command(room=room, commandtext=cmd)
             commit()
+            _notify_room_command(room.id)
     return redirect(url_for("host_room", room=room.id))
 
 
+def _notify_room_command(room_id: UUID) -> None:
+    """Wakes the local room hoster of a room to pick up its new Command, see autolauncher.autohost."""
+    port = app.config.get("COMMAND_NOTIFY_PORT")
+    if port is None:
+        return
+    port += room_id.int % app.config["HOSTERS"]
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as notify_socket:
+        try:
+            notify_socket.sendto(b"\0", ("127.0.0.1", port))
+        except OSError:
+            pass  # the hoster polls for commands as well
+
+
 @app.get("/room/<suuid:room>")
 def host_room(room: UUID):
     room: Room = Room.get(id=room)
@@ -33,6 +33,14 @@ class Room(db.Entity):
     tracker = Optional(UUID, index=True)
     # Port special value -1 means the server errored out. Another attempt can be made with a page refresh
     last_port = Optional(int, default=lambda: 0)
+    tracker_summary = Optional('RoomTrackerSummary', cascade_delete=True)
+
+
+class RoomTrackerSummary(db.Entity):
+    room = PrimaryKey(Room)
+    # written with every multisave, see customserver.get_tracker_summary
+    data = Required(bytes, lazy=True)  # lazy, so requests can compare the generation without loading it
+    generation = Required(int, default=0)  # counts saves, see customserver.TrackerHistory
 
 
 class Seed(db.Entity):
@@ -1,5 +1,7 @@
+import bisect
 import datetime
 import collections
+import threading
 from dataclasses import dataclass
 from typing import Any, Callable, Dict, List, Optional, Set, Tuple, NamedTuple, Counter
 from uuid import UUID
@@ -9,7 +11,7 @@ from flask import make_response, render_template, request, Request, Response
 from werkzeug.exceptions import abort
 
 from MultiServer import Context, get_saving_second
-from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType
+from NetUtils import ClientStatus, Hint, NetworkItem, NetworkSlot, SlotType, SphereIndex
 from Utils import restricted_loads, KeyedDefaultDict, utcnow
 from . import app, cache
 from .models import GameDataPackage, Room
@@ -26,7 +28,8 @@ ItemMetadata = Tuple[int, int, int]
 
 def _cache_results(func: Callable) -> Callable:
     """Stores the results of any computationally expensive methods after the initial call in TrackerData.
-    If called again, returns the cached result instead, as results will not change for the lifetime of TrackerData.
+    If called again, returns the cached result instead, as results will not change until the room's multisave does.
+    The results are shared with every TrackerData of the room until then, see _get_room_state.
     """
     def method_wrapper(self: "TrackerData", *args):
         cache_key = f"{func.__name__}{''.join(f'_[{arg.__repr__()}]' for arg in args)}"
@@ -40,24 +43,154 @@ def _cache_results(func: Callable) -> Callable:
     return method_wrapper
 
 
+def _cache_request_results(func: Callable) -> Callable:
+    """Like _cache_results, for methods whose results depend on the time of the request and are only kept for it."""
+    def method_wrapper(self: "TrackerData", *args):
+        cache_key = f"{func.__name__}{''.join(f'_[{arg.__repr__()}]' for arg in args)}"
+        if cache_key in self._request_cache:
+            return self._request_cache[cache_key]
+
+        result = func(self, *args)
+        self._request_cache[cache_key] = result
+        return result
+
+    return method_wrapper
+
+
+class _LRUCache:
+    """Thread-safe least recently used cache, which evicts entries once the total of their given sizes exceeds the
+    current max_size.
+    """
+    def __init__(self, max_size: Callable[[], int]):
+        self.max_size = max_size
+        self.size = 0
+        self._entries: collections.OrderedDict[Any, Tuple[Any, int]] = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any) -> Any:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key: Any, value: Any, size: int) -> None:
+        with self._lock:
+            old_entry = self._entries.pop(key, None)
+            if old_entry:
+                self.size -= old_entry[1]
+            self._entries[key] = value, size
+            self.size += size
+            max_size = self.max_size()
+            while self.size > max_size and len(self._entries) > 1:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+
+_decoded_cache = _LRUCache(lambda: app.config["TRACKER_CACHE_SIZE"])
+"""decoded multidata by seed, data package lookups by checksum and multisave and cached results by room"""
+
+
+class _GameTables(NamedTuple):
+    item_id_to_name: Dict[int, str]
+    location_id_to_name: Dict[int, str]
+    item_name_to_id: Dict[str, int]
+    location_name_to_id: Dict[str, int]
+
+
+def _get_multidata(room: Room) -> Dict[str, Any]:
+    key = "multidata", room.seed.id
+    multidata = _decoded_cache.get(key)
+    if multidata is None:
+        data = room.seed.multidata
+        multidata = Context.decompress(data)
+        _decoded_cache.set(key, multidata, len(data))
+    return multidata
+
+
+def _get_game_tables(checksum: str) -> _GameTables:
+    key = "datapackage", checksum
+    tables = _decoded_cache.get(key)
+    if tables is None:
+        data = GameDataPackage.get(checksum=checksum).data
+        game_package = restricted_loads(data)
+        tables = _GameTables(
+            KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
+                id: name for name, id in game_package["item_name_to_id"].items()}),
+            KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
+                id: name for name, id in game_package["location_name_to_id"].items()}),
+            game_package["item_name_to_id"],
+            game_package["location_name_to_id"],
+        )
+        _decoded_cache.set(key, tables, len(data))
+    return tables
+
+
+class _RoomState:
+    """The decoded save data of a room and the results TrackerData cached for it.
+    Rooms update last_activity whenever they save, except when shutting down, and the generation of their tracker
+    summary with every save, so it is kept until either changes.
+    The multisave is only decoded once a tracker needs more than its tracker summary."""
+    last_activity: datetime.datetime
+    generation: Optional[int]
+    summary: Optional[Dict[str, Any]]
+    multisave: Optional[Dict[str, Any]]
+    results: Dict[str, Any]
+
+    def __init__(self, room: Room):
+        self.last_activity = room.last_activity
+        self.generation = _get_room_generation(room)
+        self.summary = restricted_loads(room.tracker_summary.data) if room.tracker_summary else None
+        self.multisave = None
+        self.results = {}
+
+    def get_multisave(self, room: Room) -> Dict[str, Any]:
+        if self.multisave is None:
+            data = room.multisave
+            self.multisave = restricted_loads(data) if data else {}
+            _decoded_cache.set(("room", room.id), self, self.get_size(room) + (len(data) if data else 0))
+        return self.multisave
+
+    def get_size(self, room: Room) -> int:
+        return len(room.tracker_summary.data) if room.tracker_summary else 0
+
+
+def _get_room_generation(room: Room) -> Optional[int]:
+    return room.tracker_summary.generation if room.tracker_summary else None
+
+
+def _get_room_state(room: Room) -> _RoomState:
+    key = "room", room.id
+    state = _decoded_cache.get(key)
+    if state is None or state.last_activity != room.last_activity or \
+            state.generation != _get_room_generation(room):
+        state = _RoomState(room)
+        _decoded_cache.set(key, state, state.get_size(room))
+    return state
+
+
 @dataclass
 class TrackerData:
     """A helper dataclass that is instantiated each time an HTTP request comes in for tracker data.
 
     Provides helper methods to lazily load necessary data that each tracker require and caches any results so any
-    subsequent helper method calls do not need to recompute results during the lifetime of this instance.
+    subsequent helper method calls do not need to recompute results until the room's multisave changes.
+    The decoded multidata, data packages and multisave are kept across requests by the process as well.
     """
     room: Room
     _multidata: Dict[str, Any]
-    _multisave: Dict[str, Any]
+    _room_state: _RoomState
     _tracker_cache: Dict[str, Any]
+    _request_cache: Dict[str, Any]
 
     def __init__(self, room: Room):
         """Initialize a new RoomMultidata object for the current room."""
         self.room = room
-        self._multidata = Context.decompress(room.seed.multidata)
-        self._multisave = restricted_loads(room.multisave) if room.multisave else {}
-        self._tracker_cache = {}
+        self._multidata = _get_multidata(room)
+        self._room_state = _get_room_state(room)
+        self._tracker_cache = self._room_state.results
+        self._request_cache = {}
 
         self.item_name_to_id: Dict[str, Dict[str, int]] = {}
         self.location_name_to_id: Dict[str, Dict[str, int]] = {}
@@ -70,15 +203,24 @@ class TrackerData:
             game_name: KeyedDefaultDict(lambda code: f"Unknown Game {game_name} - Location (ID: {code})")
         })
         for game, game_package in self._multidata["datapackage"].items():
-            game_package = restricted_loads(GameDataPackage.get(checksum=game_package["checksum"]).data)
-            self.item_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Item (ID: {code})", {
-                id: name for name, id in game_package["item_name_to_id"].items()})
-            self.location_id_to_name[game] = KeyedDefaultDict(lambda code: f"Unknown Location (ID: {code})", {
-                id: name for name, id in game_package["location_name_to_id"].items()})
+            tables = _get_game_tables(game_package["checksum"])
+            self.item_id_to_name[game] = tables.item_id_to_name
+            self.location_id_to_name[game] = tables.location_id_to_name
 
             # Normal lookup tables as well.
-            self.item_name_to_id[game] = game_package["item_name_to_id"]
-            self.location_name_to_id[game] = game_package["location_name_to_id"]
+            self.item_name_to_id[game] = tables.item_name_to_id
+            self.location_name_to_id[game] = tables.location_name_to_id
+
+    @property
+    def _multisave(self) -> Dict[str, Any]:
+        return self._room_state.get_multisave(self.room)
+
+    def _get_summarized(self, key: str, default: Any) -> Any:
+        """Retrieves a part of the multisave that is in the room's tracker summary, if it has one."""
+        summary = self._room_state.summary
+        if summary is not None and key in summary:
+            return summary[key]
+        return self._multisave.get(key, default)
 
     def get_seed_name(self) -> str:
         """Retrieves the seed name."""
@@ -112,6 +254,43 @@ class TrackerData:
         """Retrieves the set of all locations marked complete by this player."""
         return self._multisave.get("location_checks", {}).get((team, player), set())
 
+    def get_player_checked_locations_count(self, team: int, player: int) -> int:
+        """Retrieves the number of locations marked complete by this player."""
+        summary = self._room_state.summary
+        if summary is not None:
+            return summary["location_check_counts"].get((team, player), 0)
+        return len(self.get_player_checked_locations(team, player))
+
+    def get_version(self) -> Optional[int]:
+        """Retrieves the generation of the room's save, which counts its saves.
+        None if the room has no tracker summary yet, which it writes from its next save on."""
+        summary = self._room_state.summary
+        return summary.get("generation") if summary is not None else None
+
+    def get_player_amounts_since(self, team: int, player: int, since: int) -> Optional[Tuple[int, int]]:
+        """Retrieves how many items this player had received and locations checked as of the given generation,
+        see get_player_checked_locations_in_order. None if that isn't known (anymore)."""
+        summary = self._room_state.summary
+        if summary is None or "generation" not in summary or since > summary["generation"]:
+            return None
+        changes = summary["changes"].get((team, player))
+        if changes is None:
+            return (0, 0) if since >= summary["first_generation"] else None
+        index = bisect.bisect_right(changes, since, key=lambda change: change[0]) - 1
+        return changes[index][1:] if index >= 0 else None
+
+    def get_player_checked_locations_in_order(self, team: int, player: int) -> List[int]:
+        """Retrieves the locations marked complete by this player, in the order the room first saved them in."""
+        return self._room_state.summary["check_order"].get((team, player), [])
+
+    def get_player_hints_changed_since(self, team: int, player: int, since: int) -> bool:
+        """Checks whether hints of this player changed after the given generation, True if that isn't known."""
+        summary = self._room_state.summary
+        if summary is None or "generation" not in summary or not \
+                summary["first_generation"] <= since <= summary["generation"]:
+            return True
+        return summary["hints_generation"].get((team, player), 0) > since
+
     @_cache_results
     def get_player_missing_locations(self, team: int, player: int) -> Set[int]:
         """Retrieves the set of all locations not marked complete by this player."""
@@ -124,11 +303,14 @@ class TrackerData:
     @_cache_results
     def get_player_inventory_counts(self, team: int, player: int) -> collections.Counter:
         """Retrieves a dictionary of all items received by their id and their received count."""
-        received_items = self.get_player_received_items(team, player)
         starting_items = self.get_player_starting_inventory(player)
-        inventory = collections.Counter()
-        for item in received_items:
-            inventory[item.item] += 1
+        summary = self._room_state.summary
+        if summary is not None:
+            inventory = collections.Counter(summary["received_item_counts"].get((team, player), ()))
+        else:
+            inventory = collections.Counter()
+            for item in self.get_player_received_items(team, player):
+                inventory[item.item] += 1
         for item in starting_items:
             inventory[item] += 1
 
@@ -137,9 +319,9 @@ class TrackerData:
     @_cache_results
     def get_player_hints(self, team: int, player: int) -> Set[Hint]:
         """Retrieves a set of all hints relevant for a particular player."""
-        return self._multisave.get("hints", {}).get((team, player), set())
+        return self._get_summarized("hints", {}).get((team, player), set())
 
-    @_cache_results
+    @_cache_request_results
     def get_player_last_activity(self, team: int, player: int) -> Optional[datetime.timedelta]:
         """Retrieves the relative timedelta for when a particular player was last active.
         Returns None if no activity was ever recorded.
@@ -148,11 +330,11 @@ class TrackerData:
 
     def get_player_client_status(self, team: int, player: int) -> ClientStatus:
         """Retrieves the ClientStatus of a particular player."""
-        return self._multisave.get("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
+        return self._get_summarized("client_game_state", {}).get((team, player), ClientStatus.CLIENT_UNKNOWN)
 
     def get_player_alias(self, team: int, player: int) -> Optional[str]:
         """Returns the alias of a particular player, if any."""
-        return self._multisave.get("name_aliases", {}).get((team, player), None)
+        return self._get_summarized("name_aliases", {}).get((team, player), None)
 
     @_cache_results
     def get_team_completed_worlds_count(self) -> Dict[int, int]:
@@ -186,7 +368,7 @@ class TrackerData:
     def get_team_locations_checked_count(self) -> Dict[int, int]:
         """Retrieves a dictionary of checked player locations each team has."""
         return {
-            team: sum(len(self.get_player_checked_locations(team, player)) for player in players)
+            team: sum(self.get_player_checked_locations_count(team, player) for player in players)
             for team, players in self.get_all_players().items()
         }
 
@@ -241,7 +423,7 @@ class TrackerData:
     def get_room_locations_complete(self) -> Dict[TeamPlayer, int]:
         """Retrieves a dictionary of all locations complete per player."""
         return {
-            (team, player): len(self.get_player_checked_locations(team, player))
+            (team, player): self.get_player_checked_locations_count(team, player)
             for team, players in self.get_all_players().items() for player in players
         }
 
@@ -267,14 +449,14 @@ class TrackerData:
 
         return long_player_names
 
-    @_cache_results
+    @_cache_request_results
     def get_room_last_activity(self) -> Dict[TeamPlayer, datetime.timedelta]:
         """Retrieves a dictionary of all players and the timedelta from now to their last activity.
         Does not include players who have no activity recorded.
         """
         last_activity: Dict[TeamPlayer, datetime.timedelta] = {}
         now = utcnow()
-        for (team, player), timestamp in self._multisave.get("client_activity_timers", []):
+        for (team, player), timestamp in self._get_summarized("client_activity_timers", []):
             from_timestamp = datetime.datetime.fromtimestamp(timestamp, datetime.timezone.utc).replace(tzinfo=None)
             last_activity[team, player] = now - from_timestamp
 
@@ -287,7 +469,7 @@ class TrackerData:
         Only supported platforms are Twitch and YouTube.
         """
         video_feeds = {}
-        for (team, player), video_data in self._multisave.get("video", []):
+        for (team, player), video_data in self._get_summarized("video", []):
             video_feeds[team, player] = video_data
 
         return video_feeds
@@ -297,6 +479,16 @@ class TrackerData:
         """ each sphere is { player: { location_id, ... } } """
         return self._multidata.get("spheres", [])
 
+    @_cache_results
+    def get_sphere_index(self) -> SphereIndex:
+        """Retrieves the index of the sphere each location is in, the same one the server looks spheres up in."""
+        return SphereIndex(self.get_spheres())
+
+    @_cache_results
+    def get_player_spheres(self, player: int) -> Dict[int, int]:
+        """Retrieves the sphere of each location of a player that is in a sphere."""
+        return self.get_sphere_index().get_slot_spheres(player)
+
 
 def _process_if_request_valid(incoming_request: Request, room: Optional[Room]) -> Optional[Response]:
     if not room:
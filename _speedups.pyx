@@ -1,6 +1,5 @@
 #cython: language_level=3
 #distutils: language = c
-#distutils: depends = intset.h
 
 """
 Provides faster implementation of some core parts.
@@ -14,6 +13,7 @@ from cpython cimport PyObject
 from typing import Any, Dict, Iterable, Iterator, Generator, Sequence, Tuple, TypeVar, Union, Set, List, TYPE_CHECKING
 from cymem.cymem cimport Pool
 from libc.stdint cimport int64_t, uint32_t
+from libc.stdlib cimport qsort
 from collections import defaultdict
 
 cdef extern from *:
@@ -31,28 +31,6 @@ ctypedef int64_t ap_id_t
 cdef ap_player_t MAX_PLAYER_ID = 1000000  # limit the size of indexing array
 cdef size_t INVALID_SIZE = <size_t>(-1)  # this is all 0xff... adding 1 results in 0, but it's not negative
 
-# configure INTSET for player
-cdef extern from *:
-    """
-    #define INTSET_NAME ap_player_set
-    #define INTSET_TYPE uint32_t  // has to match ap_player_t
-    """
-
-# create INTSET for player
-cdef extern from "intset.h":
-    """
-    #undef INTSET_NAME
-    #undef INTSET_TYPE
-    """
-    ctypedef struct ap_player_set:
-        pass
-
-    ap_player_set* ap_player_set_new(size_t bucket_count) nogil
-    void ap_player_set_free(ap_player_set* set) nogil
-    bint ap_player_set_add(ap_player_set* set, ap_player_t val) nogil
-    bint ap_player_set_contains(ap_player_set* set, ap_player_t val) nogil
-
-
 cdef struct LocationEntry:
     # layout is so that
     # 64bit player: location+sender and item+receiver 128bit comparisons, if supported
@@ -69,6 +47,25 @@ cdef struct IndexEntry:
     size_t count
 
 
+cdef struct ReceiverEntry:
+    # sorted by receiver, item, then entry, so lookups by receiver and item find a range in the order of entries
+    ap_id_t item
+    ap_player_t receiver
+    size_t entry
+
+
+cdef int compare_receiver_entries(const void* a, const void* b) noexcept nogil:
+    cdef const ReceiverEntry* x = <const ReceiverEntry*>a
+    cdef const ReceiverEntry* y = <const ReceiverEntry*>b
+    if x.receiver != y.receiver:
+        return -1 if x.receiver < y.receiver else 1
+    if x.item != y.item:
+        return -1 if x.item < y.item else 1
+    if x.entry != y.entry:
+        return -1 if x.entry < y.entry else 1
+    return 0
+
+
 if TYPE_CHECKING:
     State = Dict[Tuple[int, int], Set[int]]
 else:
@@ -92,6 +89,9 @@ cdef class LocationStore:
     cdef size_t entry_count
     cdef IndexEntry* sender_index  # 16KB/1000 players
     cdef size_t sender_index_size
+    cdef ReceiverEntry* receiver_entries  # 2.4MB/100k items, speed up find_item and get_for_player
+    cdef IndexEntry* receiver_index  # 16KB/1000 players
+    cdef size_t receiver_index_size
     cdef list _keys  # ~36KB/1000 players, speed up iter (28 per int + 8 per list entry)
     cdef list _items  # ~64KB/1000 players, speed up items (56 per tuple + 8 per list entry)
     cdef list _proxies  # ~92KB/1000 players, speed up self[player] (56 per struct + 28 per len + 8 per list entry)
@@ -100,7 +100,8 @@ cdef class LocationStore:
     def get_size(self):
         from sys import getsizeof
         size = getsizeof(self) + getsizeof(self._mem) + getsizeof(self._len) \
-                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size
+                + sizeof(LocationEntry) * self.entry_count + sizeof(IndexEntry) * self.sender_index_size \
+                + sizeof(ReceiverEntry) * self.entry_count + sizeof(IndexEntry) * self.receiver_index_size
         size += getsizeof(self._keys) + getsizeof(self._items) + getsizeof(self._proxies)
         size += sum(sizeof(key) for key in self._keys)
         size += sum(sizeof(item) for item in self._items)
@@ -117,6 +118,7 @@ cdef class LocationStore:
 
         # iterate over everything to get all maxima and validate everything
         cdef size_t max_sender = INVALID_SIZE  # keep track of highest used player id for indexing
+        cdef size_t max_receiver = 0
         cdef size_t sender_count = 0
         cdef size_t count = 0
         for sender, locations in locations_dict.items():
@@ -131,6 +133,7 @@ cdef class LocationStore:
                 receiver = data[1]
                 if receiver < 1 or receiver > MAX_PLAYER_ID:
                     raise ValueError(f"Invalid player id {receiver} for item")
+                max_receiver = max(max_receiver, receiver)
                 count += 1
             sender_count += 1
 
@@ -148,15 +151,20 @@ cdef class LocationStore:
         if count:
             # leaving entries as NULL if there are none, makes potential memory errors more visible
             self.entries = <LocationEntry*>self._mem.alloc(count, sizeof(LocationEntry))
+            self.receiver_entries = <ReceiverEntry*>self._mem.alloc(count, sizeof(ReceiverEntry))
         self.sender_index = <IndexEntry*>self._mem.alloc(max_sender + 1, sizeof(IndexEntry))
+        self.receiver_index = <IndexEntry*>self._mem.alloc(max_receiver + 1, sizeof(IndexEntry))
         self._raw_proxies = <PyObject**>self._mem.alloc(max_sender + 1, sizeof(PyObject*))
 
         assert (not self.entries) == (not count)
+        assert (not self.receiver_entries) == (not count)
         assert self.sender_index
+        assert self.receiver_index
         assert self._raw_proxies
 
         # build entries and index
         cdef size_t i = 0
+        cdef ap_player_t receiver_id
         for sender, locations in sorted(locations_dict.items()):
             self.sender_index[sender].start = i
             self.sender_index[sender].count = 0
@@ -170,8 +178,20 @@ cdef class LocationStore:
                     self.entries[i].flags = data[2]  # initialized to 0 during alloc
                 # Ignoring extra data. warn?
                 self.sender_index[sender].count += 1
+                self.receiver_entries[i].item = self.entries[i].item
+                self.receiver_entries[i].receiver = self.entries[i].receiver
+                self.receiver_entries[i].entry = i
                 i += 1
 
+        # build receiver index
+        if count:
+            qsort(self.receiver_entries, count, sizeof(ReceiverEntry), compare_receiver_entries)
+        for i in range(count):
+            receiver_id = self.receiver_entries[i].receiver
+            if self.receiver_index[receiver_id].count == 0:
+                self.receiver_index[receiver_id].start = i
+            self.receiver_index[receiver_id].count += 1
+
         # build pyobject caches
         self._proxies.append(None)  # player 0
         assert self.sender_index[0].count == 0
@@ -187,6 +207,7 @@ cdef class LocationStore:
             self._raw_proxies[i] = <PyObject*>proxy
 
         self.sender_index_size = max_sender + 1
+        self.receiver_index_size = max_receiver + 1
         self.entry_count = count
         self._len = sender_count
 
@@ -215,47 +236,56 @@ cdef class LocationStore:
         return self._items
 
     # specialized accessors
+    cdef bint _get_receiver_range(self, object slot, size_t* start, size_t* end):
+        if not isinstance(slot, int) or slot < 1 or slot >= self.receiver_index_size:
+            return False
+        start[0] = self.receiver_index[<size_t>slot].start
+        end[0] = start[0] + self.receiver_index[<size_t>slot].count
+        return True
+
+    cdef size_t _find_item_start(self, size_t start, size_t end, ap_id_t item) noexcept nogil:
+        # binary search for the first entry of item in the sorted range of a receiver
+        cdef size_t m
+        while start < end:
+            m = (start + end) // 2
+            if self.receiver_entries[m].item < item:
+                start = m + 1
+            else:
+                end = m
+        return start
+
     def find_item(self, slots: Set[int], seeked_item_id: int) -> Generator[Tuple[int, int, int, int, int], None, None]:
         cdef ap_id_t item = seeked_item_id
-        cdef ap_player_t receiver
-        cdef ap_player_set* receivers
-        cdef size_t slot_count = len(slots)
-        if slot_count == 1:
-            # specialized implementation for single slot
-            receiver = list(slots)[0]
-            with nogil:
-                for entry in self.entries[:self.entry_count]:
-                    if entry.item == item and entry.receiver == receiver:
-                        with gil:
-                            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-        elif slot_count:
-            # generic implementation with lookup in set
-            receivers = ap_player_set_new(min(1023, slot_count))  # limit top level struct to 16KB
-            if not receivers:
-                raise MemoryError()
-            try:
-                for receiver in slots:
-                    if not ap_player_set_add(receivers, receiver):
-                        raise MemoryError()
-                with nogil:
-                    for entry in self.entries[:self.entry_count]:
-                        if entry.item == item and ap_player_set_contains(receivers, entry.receiver):
-                            with gil:
-                                yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
-            finally:
-                ap_player_set_free(receivers)
+        cdef size_t start
+        cdef size_t end
+        cdef size_t i
+        cdef LocationEntry* entry
+        found: List[int] = []
+        for slot in slots:
+            if not self._get_receiver_range(slot, &start, &end):
+                continue
+            i = self._find_item_start(start, end, item)
+            while i < end and self.receiver_entries[i].item == item:
+                found.append(self.receiver_entries[i].entry)
+                i += 1
+        if len(slots) > 1:
+            found.sort()  # yield in the order of entries, like a single slot
+        for i in found:
+            entry = self.entries + i
+            yield entry.sender, entry.location, entry.item, entry.receiver, entry.flags
 
     def get_for_player(self, slot: int) -> Dict[int, Set[int]]:
-        cdef ap_player_t receiver = slot
+        cdef size_t start
+        cdef size_t end
+        cdef LocationEntry* entry
         all_locations: Dict[int, Set[int]] = {}
-        with nogil:
-            for entry in self.entries[:self.entry_count]:
-                if entry.receiver == receiver:
-                    with gil:
-                        sender: int = entry.sender
-                        if sender not in all_locations:
-                            all_locations[sender] = set()
-                        all_locations[sender].add(entry.location)
+        if self._get_receiver_range(slot, &start, &end):
+            for i in range(start, end):
+                entry = self.entries + self.receiver_entries[i].entry
+                sender: int = entry.sender
+                if sender not in all_locations:
+                    all_locations[sender] = set()
+                all_locations[sender].add(entry.location)
         return all_locations
 
     def get_checked(self, state: State, team: int, slot: int) -> List[int]:
@@ -376,3 +406,90 @@ cdef class PlayerLocationProxy:
         count = self._store.sender_index[self._player].count
         for entry in self._store.entries[start:start+count]:
             yield entry.location, (entry.item, entry.receiver, entry.flags)
+
+
+cdef bint _location_can_reach(object location, object state, dict default_can_reach) except -1:
+    # Location.can_reach and Region.can_reach are inlined if they are not overridden, leaving only access_rule to be
+    # called back into, and only if the parent region is reachable.
+    cdef object region = location.parent_region
+    if region is None:
+        return location.can_reach(state)  # raises the same error as the pure python sweep
+    cdef object location_type = type(location)
+    cdef object region_type = type(region)
+    if location_type not in default_can_reach:
+        default_can_reach[location_type] = location_type.can_reach is default_can_reach[None][0]
+    if region_type not in default_can_reach:
+        default_can_reach[region_type] = region_type.can_reach is default_can_reach[None][1]
+    if not default_can_reach[location_type] or not default_can_reach[region_type]:
+        return location.can_reach(state)
+
+    player = region.player
+    if state.stale[player]:
+        state.update_reachable_regions(player)
+    if region not in state.reachable_regions[player]:
+        return False
+    return bool(location.access_rule(state))
+
+
+def sweep_for_advancements(state: Any, list advancements_per_player, bint yield_each_sweep) -> Iterator[None]:
+    """
+    Compiled implementation of CollectionState._sweep_for_advancements_impl, which it has to match exactly.
+    Keeps the pending advancement locations of each player in a list and only calls access_rule of the ones that are
+    in a reachable region.
+    """
+    from BaseClasses import Location, Region
+
+    # maps Location and Region types to whether they use the default can_reach
+    cdef dict default_can_reach = {None: (Location.can_reach, Region.can_reach)}
+    cdef set all_players = {player for player, _ in advancements_per_player}
+    cdef set players_to_check = all_players
+    cdef set next_players_to_check
+    cdef list next_advancements_per_player
+    cdef list locations
+    cdef list reachable_locations
+    cdef list unreachable_locations
+    cdef bint checking_if_finished = False
+    cdef object advancements = state.advancements
+    cdef object collect = state.collect
+
+    # See CollectionState._sweep_for_advancements_impl for how players are picked for each sweep iteration.
+    while players_to_check:
+        next_advancements_per_player = []
+        next_players_to_check = set()
+
+        for player, locations in advancements_per_player:
+            if player not in players_to_check:
+                next_advancements_per_player.append((player, locations))
+                continue
+
+            reachable_locations = []
+            unreachable_locations = []
+            for location in locations:
+                if _location_can_reach(location, state, default_can_reach):
+                    reachable_locations.append(location)
+                else:
+                    unreachable_locations.append(location)
+            if unreachable_locations:
+                next_advancements_per_player.append((player, unreachable_locations))
+
+            next_players_to_check.discard(player)
+
+            for advancement in reachable_locations:
+                advancements.add(advancement)
+                item = advancement.item
+                assert item is not None, "tried to collect advancement Location with no Item"
+                if collect(item, True, advancement):
+                    next_players_to_check.add(item.player)
+
+        if not next_players_to_check:
+            if not checking_if_finished:
+                checking_if_finished = True
+                next_players_to_check = all_players
+        else:
+            checking_if_finished = False
+
+        players_to_check = next_players_to_check
+        advancements_per_player = next_advancements_per_player
+
+        if yield_each_sweep:
+            yield
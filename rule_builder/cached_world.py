@@ -3,7 +3,7 @@ from typing import ClassVar, cast
 
 from typing_extensions import override
 
-from BaseClasses import CollectionState, Item, MultiWorld, Region
+from BaseClasses import CollectionRule, CollectionState, Item, MultiWorld, Region
 from worlds.AutoWorld import LogicMixin, World
 
 from .rules import Rule
@@ -32,6 +32,9 @@ class CachedRuleBuilderWorld(World):
     rule_caching_enabled: ClassVar[bool] = True
     """Flag to inform rules that the caching system for this world is enabled. It should not be overridden."""
 
+    incremental_reachability: ClassVar[bool] = True
+    """Rule caching already relies on item dependencies being collected item names, so reachability can as well."""
+
     def __init__(self, multiworld: MultiWorld, player: int) -> None:
         super().__init__(multiworld, player)
         self.rule_item_dependencies = defaultdict(set)
@@ -76,6 +79,13 @@ class CachedRuleBuilderWorld(World):
             for region_name in entrance.access_rule.region_dependencies():
                 self.rule_region_dependencies[region_name] |= rule_ids
 
+    @override
+    def get_rule_item_dependencies(self, rule: CollectionRule | Rule.Resolved) -> frozenset[str] | None:
+        item_names = super().get_rule_item_dependencies(rule)
+        if not item_names or not self.item_mapping:
+            return item_names
+        return item_names | {name for name, mapped_name in self.item_mapping.items() if mapped_name in item_names}
+
     @override
     def collect(self, state: CollectionState, item: Item) -> bool:
         changed = super().collect(state, item)
@@ -609,6 +609,15 @@ class ServerOptions(Group):
         OFF = 0
         ON = 1
 
+    class MaxBacklog(int):
+        """Disconnect clients that have more than this many messages queued to be sent to them"""
+
+    class DatastorageQuota(int):
+        """
+        Maximum size in bytes of the data storage keys created by one slot, approximated with pickle
+        0 -> No limit
+        """
+
     host: str | None = None
     port: int = 38281
     password: str | None = None
@@ -628,6 +637,8 @@ class ServerOptions(Group):
     auto_shutdown: AutoShutdown = AutoShutdown(0)
     compatibility: Compatibility = Compatibility(2)
     log_network: LogNetwork = LogNetwork(0)
+    max_backlog: MaxBacklog = MaxBacklog(10000)
+    datastorage_quota: DatastorageQuota = DatastorageQuota(0)
 
 
 class GeneratorOptions(Group):
@@ -685,6 +696,27 @@ class GeneratorOptions(Group):
         OFF = 0
         ON = 1
 
+    class ParallelWorldStages(int):
+        """
+        Amount of worker processes to run the steps up to set_rules in, for worlds that support it.
+        0 -> Run every world in the main process
+        Requires forking processes, so it is ignored on Windows.
+        """
+
+    class MultidataCompression(str):
+        """
+        Compression of the multidata written to the .archipelago file.
+        zlib -> Can be loaded by every server version (Default)
+        lzma -> Smaller, but slower to write
+        zstd -> Smaller and faster to load, requires Python 3.14 or the backports.zstd package
+        """
+
+    class IndexedMultidata(Bool):
+        """
+        Write the multidata as indexed container, so servers only decode the data of each slot once it is needed.
+        Requires a server supporting multidata format 5.
+        """
+
     class PanicMethod(str):
         """
         What to do if the current item placements appear unsolvable.
@@ -703,6 +735,9 @@ class GeneratorOptions(Group):
     race: Race = Race(0)
     plando_options: PlandoOptions = PlandoOptions("bosses, connections, texts")
     panic_method: PanicMethod = PanicMethod("swap")
+    parallel_world_stages: ParallelWorldStages = ParallelWorldStages(0)
+    multidata_compression: MultidataCompression = MultidataCompression("zlib")
+    indexed_multidata: IndexedMultidata | bool = False
     loglevel: str = "info"
     logtime: bool = False
 
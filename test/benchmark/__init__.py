@@ -5,3 +5,9 @@ if __name__ == "__main__":
     load_worlds.run_load_worlds_benchmark()
     import locations
     locations.run_locations_benchmark()
+    import reachability
+    reachability.run_reachability_benchmark()
+    import location_store
+    location_store.run_location_store_benchmark()
+    import broadcast
+    broadcast.run_broadcast_benchmark()
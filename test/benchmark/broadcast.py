@@ -0,0 +1,82 @@
+def run_broadcast_benchmark(slots: int = 100, clients_per_slot: int = 3, hints: int = 100, bounces: int = 100) -> None:
+    """
+    Run a benchmark of the messages the server sends to some of its clients, rather than to a whole room or team:
+    hints sent to the clients of every slot, as notify_hints does for !hint or when a slot is released,
+    and DeathLink Bounces, sent to the clients with the tag.
+
+    :param slots: Amount of slots in the room.
+    :param clients_per_slot: Amount of connected clients of each slot, such as a game client and trackers.
+    :param hints: Amount of hints sent to each slot.
+    :param bounces: Amount of Bounces sent, once to the clients with the tag and once to no client.
+    """
+    import asyncio
+    import logging
+
+    from time_it import TimeIt
+
+    from MultiServer import Client, Context, process_client_cmd
+    from NetUtils import Hint, NetworkSlot, SlotType
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class Socket:
+        open = True
+        sent = 0
+
+        async def send(self, msg: str) -> None:
+            self.sent += len(msg)
+
+    # found hints are only sent, so this doesn't measure remembering them
+    slot_hints = [Hint(slot, slot % slots + 1, location, location, True)
+                  for slot in range(1, slots + 1) for location in range(hints)]
+    bounce = {"cmd": "Bounce", "tags": ["DeathLink"], "data": {"time": 0, "source": "Player", "cause": "benchmark"}}
+
+    async def run() -> None:
+        ctx = Context("", 0, "", "", 0, 0, False, max_backlog=bounces + 2)
+        ctx.clients = {0: {}}
+        endpoints = []
+        for slot in range(1, slots + 1):
+            ctx.games[slot] = "Archipelago"
+            ctx.player_names[0, slot] = f"Player{slot}"
+            ctx.slot_info[slot] = NetworkSlot(f"Player{slot}", "Archipelago", SlotType.player)
+            ctx.clients[0][slot] = []
+            for index in range(clients_per_slot):
+                endpoint = Client(Socket(), ctx)
+                endpoint.auth, endpoint.team, endpoint.slot = True, 0, slot
+                # the game client of every other slot takes part in DeathLink
+                endpoint.tags = ["DeathLink"] if index == 0 and slot % 2 else []
+                ctx.clients[0][slot].append(endpoint)
+                endpoints.append(endpoint)
+        ctx.endpoints.extend(endpoints)
+
+        async def drain() -> None:
+            # sends may be started as tasks, which queue the messages once they run
+            await asyncio.sleep(0)
+            while any(endpoint.outgoing_writer for endpoint in endpoints):
+                await asyncio.sleep(0)
+
+        with TimeIt(f"sending {hints} hints to each of {slots} slots with {clients_per_slot} clients each", logger):
+            ctx.notify_hints(0, slot_hints)
+            await drain()
+
+        with TimeIt(f"bouncing {bounces} DeathLinks to {slots // 2} of {len(endpoints)} clients", logger):
+            for _ in range(bounces):
+                await process_client_cmd(ctx, endpoints[0], dict(bounce))
+            await drain()
+
+        with TimeIt(f"bouncing {bounces} messages to none of {len(endpoints)} clients", logger):
+            for _ in range(bounces):
+                await process_client_cmd(ctx, endpoints[0], {**bounce, "tags": ["Unused"]})
+            await drain()
+
+        logger.info(f"sent {sum(endpoint.socket.sent for endpoint in endpoints)} characters")
+
+    asyncio.run(run())
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_broadcast_benchmark()
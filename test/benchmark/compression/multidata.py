@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+# compares writing and loading multidata in one shot against streaming it through each available compression
+
+import io
+import time
+import tracemalloc
+import zlib
+from typing import Any, Callable
+
+
+def generate_multidata(slots: int = 1000, locations: int = 500) -> dict[str, Any]:
+    from random import Random
+    from NetUtils import NetworkSlot, SlotType
+
+    r = Random()
+    r.seed(0)
+    return {
+        "slot_data": {slot: {"seed": r.getrandbits(32), "options": {f"option_{i}": r.randint(0, 5) for i in range(50)}}
+                      for slot in range(1, slots + 1)},
+        "slot_info": {slot: NetworkSlot(f"Player{slot}", f"Game {slot % 50}", SlotType.player)
+                      for slot in range(1, slots + 1)},
+        "connect_names": {f"Player{slot}": (0, slot) for slot in range(1, slots + 1)},
+        "locations": {slot: {location: (r.randint(1, 1000), r.randint(1, slots), r.choice((0, 0, 1, 2, 4)))
+                             for location in range(1, locations + 1)}
+                      for slot in range(1, slots + 1)},
+        "spheres": [{slot: set(range(sphere * 10 + 1, sphere * 10 + 11)) for slot in range(1, slots + 1)}
+                    for sphere in range(locations // 10)],
+        "seed_name": "Benchmark",
+        "version": (0, 6, 0),
+    }
+
+
+def measure(name: str, function: Callable[[], Any]) -> Any:
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = function()
+    duration = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{name:<24}{1000 * duration:>10.0f}ms{peak / 1024 / 1024:>10.1f}MB")
+    return result
+
+
+def benchmark(multidata: dict[str, Any]) -> None:
+    from NetUtils import dump_multidata, load_multidata
+    from Utils import compression_available, compressions, restricted_dumps, restricted_loads
+
+    print("=" * 79)
+    print(f"{'':<24}{'time':>12}{'peak':>12}{'size':>12}")
+    print("=" * 79)
+
+    def dump_one_shot() -> bytes:
+        return bytes([3]) + zlib.compress(restricted_dumps(multidata), 9)
+
+    data = measure("one-shot zlib write", dump_one_shot)
+    print(f"{'':<46}{len(data) / 1024:>10.0f}KB")
+    measure("one-shot zlib load", lambda: restricted_loads(zlib.decompress(data[1:])))
+
+    for compression in compressions:
+        if not compression_available(compression):
+            print(f"{compression} not available")
+            continue
+
+        def dump() -> bytes:
+            file = io.BytesIO()
+            dump_multidata(multidata, file, compression)
+            return file.getvalue()
+
+        # the file is kept in memory here, so its size is part of the peak as well
+        data = measure(f"streaming {compression} write", dump)
+        print(f"{'':<46}{len(data) / 1024:>10.0f}KB")
+        measure(f"streaming {compression} load", lambda: load_multidata(io.BytesIO(data)))
+    print("=" * 79)
+
+
+def main() -> None:
+    multidata = generate_multidata()
+    benchmark(multidata)
+
+
+if __name__ == "__main__":
+    main()
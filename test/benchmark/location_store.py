@@ -0,0 +1,66 @@
+def run_location_store_benchmark(players: int = 100, locations: int = 1000, lookups: int = 1000) -> None:
+    """
+    Run a benchmark of the item lookups of LocationStore, used by hints and collect, comparing scanning every location
+    to the receiver index of the pure python and, if available, the compiled implementation.
+
+    :param players: Amount of players in the benchmarked store.
+    :param locations: Amount of locations per player.
+    :param lookups: Amount of find_item and get_for_player calls per implementation.
+    """
+    import collections
+    import logging
+    import random
+    import typing
+
+    from time_it import TimeIt
+
+    from NetUtils import LocationStore, _LocationStore
+    from Utils import init_logging
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    class ScanningLocationStore(dict):
+        """find_item and get_for_player as they were before the receiver index, going through every location"""
+        def find_item(self, slots: typing.Set[int], seeked_item_id: int
+                      ) -> typing.Generator[typing.Tuple[int, int, int, int, int], None, None]:
+            for finding_player, check_data in self.items():
+                for location_id, (item_id, receiving_player, item_flags) in check_data.items():
+                    if receiving_player in slots and item_id == seeked_item_id:
+                        yield finding_player, location_id, item_id, receiving_player, item_flags
+
+        def get_for_player(self, slot: int) -> typing.Dict[int, typing.Set[int]]:
+            all_locations: typing.Dict[int, typing.Set[int]] = collections.defaultdict(set)
+            for source_slot, location_data in self.items():
+                for location_id, values in location_data.items():
+                    if values[1] == slot:
+                        all_locations[source_slot].add(location_id)
+            return all_locations
+
+    r = random.Random(0)
+    data = {player: {location: (r.randrange(1, locations // 4), r.randint(1, players), 0)
+                     for location in range(1, locations + 1)}
+            for player in range(1, players + 1)}
+    queries = [({r.randint(1, players)}, r.randrange(1, locations // 4)) for _ in range(lookups)]
+
+    stores = {"scan": ScanningLocationStore(data), "python index": _LocationStore(data)}
+    if LocationStore is not _LocationStore:
+        stores["compiled index"] = LocationStore(data)
+    else:
+        logger.warning("_speedups not available, only benchmarking the pure python LocationStore")
+
+    results = {}
+    for name, store in stores.items():
+        with TimeIt(f"{name} find_item x{lookups} over {players * locations} locations", logger):
+            found = [sorted(store.find_item(slots, item)) for slots, item in queries]
+        with TimeIt(f"{name} get_for_player x{lookups} over {players * locations} locations", logger):
+            for slots, _ in queries:
+                store.get_for_player(next(iter(slots)))
+        results[name] = found
+    assert all(found == results["scan"] for found in results.values()), "indexed lookups found different items"
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_location_store_benchmark()
@@ -0,0 +1,96 @@
+def run_reachability_benchmark(players: int = 300, regions: int = 200, freeze_gc: bool = True) -> None:
+    """
+    Run a benchmark of CollectionState reachable region updates in a large multiworld of rule builder worlds,
+    comparing updates that recheck every blocked entrance to incremental updates that only recheck the entrances
+    depending on newly collected items.
+
+    :param players: Amount of players in the benchmarked multiworld.
+    :param regions: Amount of regions per player, each behind an entrance requiring its own item.
+    :param freeze_gc: Whether to freeze gc before benchmarking and unfreeze gc afterward.
+    """
+    import argparse
+    import gc
+    import logging
+    import random
+    from typing import ClassVar
+
+    from time_it import TimeIt
+
+    from BaseClasses import CollectionState, Item, ItemClassification, MultiWorld, Region
+    from Utils import init_logging
+    from rule_builder.cached_world import CachedRuleBuilderWorld
+    from rule_builder.rules import Has, HasAll
+    from worlds.AutoWorld import AutoWorldRegister, call_all
+
+    init_logging("Benchmark Runner")
+    logger = logging.getLogger("Benchmark")
+
+    game_name = "Reachability Benchmark Game"
+    item_names = [f"Item {i}" for i in range(1, regions + 1)]
+
+    class BenchmarkItem(Item):
+        game = game_name
+
+    class BenchmarkWorld(CachedRuleBuilderWorld):
+        game = game_name
+        item_name_to_id: ClassVar = {name: i for i, name in enumerate(item_names, 1)}
+        location_name_to_id: ClassVar = {}
+        hidden = True
+
+        def create_item(self, name: str) -> BenchmarkItem:
+            return BenchmarkItem(name, ItemClassification.progression, self.item_name_to_id[name], self.player)
+
+        def create_regions(self) -> None:
+            # a tree of regions, so that most entrances stay blocked for most of the collection
+            world_regions = [Region("Menu", self.player, self.multiworld)]
+            for i, name in enumerate(item_names, 1):
+                region = Region(f"Region {i}", self.player, self.multiworld)
+                parent = world_regions[(i - 1) // 4]
+                rule = Has(name) if i % 2 else HasAll(name, item_names[i // 2])
+                self.create_entrance(parent, region, rule)
+                world_regions.append(region)
+            self.multiworld.regions.extend(world_regions)
+
+    try:
+        multiworld = MultiWorld(players)
+        multiworld.game = {player: game_name for player in multiworld.player_ids}
+        multiworld.player_name = {player: f"Tester{player}" for player in multiworld.player_ids}
+        multiworld.set_seed(0)
+        args = argparse.Namespace()
+        for name, option in BenchmarkWorld.options_dataclass.type_hints.items():
+            setattr(args, name, {player: option.from_any(option.default) for player in multiworld.player_ids})
+        multiworld.set_options(args)
+        multiworld.state = CollectionState(multiworld)
+        for step in ("generate_early", "create_regions"):
+            call_all(multiworld, step)
+
+        items = [multiworld.worlds[player].create_item(name)
+                 for player in multiworld.player_ids for name in item_names]
+        random.Random(0).shuffle(items)
+
+        def collect_all(incremental: bool) -> CollectionState:
+            BenchmarkWorld.incremental_reachability = incremental
+            state = CollectionState(multiworld)
+            if freeze_gc:
+                gc.freeze()
+            mode = "incremental" if incremental else "full"
+            with TimeIt(f"{mode} updates collecting {len(items)} items for {players} players", logger):
+                for item in items:
+                    state.collect(item, True)
+                    state.update_reachable_regions(item.player)
+            if freeze_gc:
+                gc.unfreeze()
+            return state
+
+        full_state = collect_all(False)
+        incremental_state = collect_all(True)
+        assert full_state.reachable_regions == incremental_state.reachable_regions, \
+            "incremental updates reached different regions"
+    finally:
+        del AutoWorldRegister.world_types[game_name]
+
+
+if __name__ == "__main__":
+    from path_change import change_home
+    change_home()
+    run_reachability_benchmark()
@@ -102,6 +102,7 @@ class TestImplemented(unittest.TestCase):
                 explicit_spheres = list(multiworld.get_spheres())
                 # Disable explicit indirect conditions and produce a second list of spheres.
                 world.explicit_indirect_conditions = False
+                multiworld.invalidate_sphere_analysis()
                 implicit_spheres = list(multiworld.get_spheres())
 
                 # Both lists should be identical.
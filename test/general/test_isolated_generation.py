@@ -0,0 +1,124 @@
+import multiprocessing
+import unittest
+from typing import ClassVar
+
+from BaseClasses import CollectionState, Item, ItemClassification, Location, MultiWorld, Region
+from rule_builder.cached_world import CachedRuleBuilderWorld
+from rule_builder.rules import Has
+from worlds.AutoWorld import AutoWorldRegister, call_all, call_all_isolated, isolated_stages
+from . import TestWorld, setup_multiworld
+
+GAME = "Isolated Generation Test Game"
+
+
+class IsolatedTestItem(Item):
+    game = GAME
+
+
+class IsolatedTestLocation(Location):
+    game = GAME
+
+
+class IsolatedTestWorld(CachedRuleBuilderWorld):
+    game = GAME
+    item_name_to_id: ClassVar = {f"Key {i}": i for i in range(1, 6)}
+    location_name_to_id: ClassVar = {f"Chest {i}": i for i in range(1, 6)}
+    hidden = True
+    isolated_generation = True
+
+    chest_count: int
+    keys: list[IsolatedTestItem]
+    first_key: IsolatedTestItem
+    victory_location: IsolatedTestLocation
+
+    def generate_early(self) -> None:
+        self.chest_count = self.random.randint(2, 5)
+        self.discarded = True
+
+    def create_item(self, name: str) -> IsolatedTestItem:
+        return IsolatedTestItem(name, ItemClassification.progression, self.item_name_to_id.get(name), self.player)
+
+    def create_regions(self) -> None:
+        previous = Region("Menu", self.player, self.multiworld)
+        self.multiworld.regions.append(previous)
+        for i in range(1, self.chest_count + 1):
+            region = Region(f"Room {i}", self.player, self.multiworld)
+            region.add_locations({f"Chest {i}": i}, IsolatedTestLocation)
+            self.multiworld.regions.append(region)
+            self.create_entrance(previous, region, Has(f"Key {i - 1}") if i > 1 else None)
+            previous = region
+        victory = IsolatedTestLocation(self.player, "Victory", None, previous)
+        victory.place_locked_item(self.create_item("Victory"))
+        previous.locations.append(victory)
+        self.victory_location = victory
+        del self.discarded
+
+    def create_items(self) -> None:
+        self.keys = [self.create_item(f"Key {i}") for i in range(1, self.chest_count + 1)]
+        self.multiworld.itempool += self.keys
+
+    def set_rules(self) -> None:
+        self.set_completion_rule(Has("Victory"))
+        self.first_key = self.keys[0]
+        self.set_rule(self.victory_location, Has(self.first_key.name))
+
+
+# only registered while testing, so other tests don't see this world
+del AutoWorldRegister.world_types[GAME]
+
+
+@unittest.skipIf("fork" not in multiprocessing.get_all_start_methods(), "call_all_isolated requires fork")
+class TestIsolatedGeneration(unittest.TestCase):
+    def setUp(self) -> None:
+        AutoWorldRegister.world_types[GAME] = IsolatedTestWorld
+
+    def tearDown(self) -> None:
+        del AutoWorldRegister.world_types[GAME]
+
+    @staticmethod
+    def generate(processes: int) -> MultiWorld:
+        multiworld = setup_multiworld([IsolatedTestWorld, TestWorld, IsolatedTestWorld, IsolatedTestWorld], (), seed=0)
+        for step in isolated_stages:
+            if processes:
+                call_all_isolated(multiworld, step, processes)
+            else:
+                call_all(multiworld, step)
+        return multiworld
+
+    def test_matches_serial(self) -> None:
+        """Ensure running isolated worlds in worker processes results in the same multiworld as running serially."""
+        serial = self.generate(0)
+        isolated = self.generate(2)
+
+        self.assertEqual([(item.player, item.name) for item in serial.itempool],
+                         [(item.player, item.name) for item in isolated.itempool])
+        for player in (1, 3, 4):
+            serial_world = serial.worlds[player]
+            isolated_world = isolated.worlds[player]
+            self.assertEqual(serial_world.chest_count, isolated_world.chest_count)
+            self.assertEqual(serial_world.random.getstate(), isolated_world.random.getstate())
+            self.assertEqual([location.name for location in serial.get_locations(player)],
+                             [location.name for location in isolated.get_locations(player)])
+            self.assertEqual([(entrance.name, entrance.access_rule) for entrance in serial.get_entrances(player)],
+                             [(entrance.name, entrance.access_rule) for entrance in isolated.get_entrances(player)])
+            self.assertEqual(serial.completion_condition[player], isolated.completion_condition[player])
+            # objects of earlier steps stay the same objects through later ones
+            self.assertFalse(hasattr(isolated_world, "discarded"))
+            self.assertIs(isolated_world.first_key, isolated_world.keys[0])
+            for key in isolated_world.keys:
+                self.assertTrue(any(key is item for item in isolated.itempool))
+            victory = isolated.get_location("Victory", player)
+            self.assertIs(isolated_world.victory_location, victory)
+            self.assertEqual(victory.access_rule, serial.get_location("Victory", player).access_rule)
+            self.assertIs(victory.item.location, victory)
+            self.assertIs(isolated.get_region("Menu", player).locations.region_manager, isolated.regions)
+            for region in isolated.get_regions(player):
+                self.assertIs(region.multiworld, isolated)
+                for location in region.locations:
+                    self.assertIs(location.parent_region, region)
+
+        state = CollectionState(isolated)
+        for item in isolated.itempool:
+            state.collect(item, True)
+        state.sweep_for_advancements()
+        self.assertTrue(isolated.has_beaten_game(state))
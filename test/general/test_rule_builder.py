@@ -1,6 +1,7 @@
 import unittest
 from dataclasses import dataclass, fields
 from typing import Any, ClassVar, cast
+from unittest.mock import patch
 
 from typing_extensions import override
 
@@ -518,6 +519,80 @@ class TestCaching(CachedRuleBuilderTestCase):
         self.assertTrue(entrance.can_reach(self.state))
 
 
+class TestIncrementalReachability(CachedRuleBuilderTestCase):
+    multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
+    world: World  # pyright: ignore[reportUninitializedInstanceVariable]
+    player: int = 1
+
+    @override
+    def setUp(self) -> None:
+        super().setUp()
+
+        self.multiworld = setup_solo_multiworld(self.world_cls, seed=0)
+        world = self.multiworld.worlds[1]
+        self.world = world
+
+        regions = [Region(f"Region {i}", self.player, self.multiworld) for i in range(1, 6)]
+        self.multiworld.regions.extend(regions)
+        region1, region2, region3, region4, region5 = regions
+
+        world.create_entrance(region1, region2, Has("Item 1"))
+        world.create_entrance(region1, region3, HasAny("Item 3", "Item 4"))
+        world.create_entrance(region2, region4, HasAll("Item 2", "Item 3"))
+        world.create_entrance(region1, region5, CanReachRegion("Region 4"))
+        world.register_rule_builder_dependencies()
+
+    def update_fully(self, state: CollectionState) -> None:
+        """Update the reachable regions of the state with the regular BFS, to compare the incremental one to."""
+        with patch.object(type(self.world), "incremental_reachability", False):
+            state.update_reachable_regions(self.player)
+
+    def test_item_dependencies(self) -> None:
+        self.assertEqual(self.world.get_entrance("Region 1 -> Region 2").get_item_dependencies(), {"Item 1"})
+        self.assertEqual(self.world.get_entrance("Region 1 -> Region 3").get_item_dependencies(),
+                         {"Item 3", "Item 4"})
+        # region dependent rules can't be filtered by items
+        self.assertIsNone(self.world.get_entrance("Region 1 -> Region 5").get_item_dependencies())
+
+        entrance = self.world.get_entrance("Region 1 -> Region 2")
+        self.assertTrue(entrance.may_depend_on({"Item 1", "Item 2"}))
+        self.assertFalse(entrance.may_depend_on({"Item 2"}))
+
+    def test_item_dependencies_follow_rule(self) -> None:
+        entrance = self.world.get_entrance("Region 1 -> Region 2")
+        self.assertEqual(entrance.get_item_dependencies(), {"Item 1"})
+        self.world.set_rule(entrance, Has("Item 2"))
+        self.assertEqual(entrance.get_item_dependencies(), {"Item 2"})
+        self.world.set_rule(entrance, lambda state: state.has("Item 2", self.player))
+        self.assertIsNone(entrance.get_item_dependencies())
+
+    def test_matches_full_update(self) -> None:
+        incremental_state = CollectionState(self.multiworld)
+        full_state = CollectionState(self.multiworld)
+        self.update_fully(full_state)
+        incremental_state.update_reachable_regions(self.player)
+
+        for name in ("Item 5", "Item 2", "Item 3", "Item 1", "Item 4"):
+            incremental_state.collect(self.world.create_item(name), True)
+            full_state.collect(self.world.create_item(name), True)
+            incremental_state.update_reachable_regions(self.player)
+            self.update_fully(full_state)
+            self.assertEqual(incremental_state.reachable_regions[self.player],
+                             full_state.reachable_regions[self.player])
+            self.assertEqual(incremental_state.blocked_connections[self.player],
+                             full_state.blocked_connections[self.player])
+        self.assertEqual(len(incremental_state.reachable_regions[self.player]), 5)
+
+    def test_stale_without_collect(self) -> None:
+        state = CollectionState(self.multiworld)
+        state.collect(self.world.create_item("Item 2"), True)
+        self.assertFalse(self.world.get_region("Region 2").can_reach(state))
+        # changing a rule and marking the state stale without collecting anything rechecks every entrance
+        self.world.set_rule(self.world.get_entrance("Region 1 -> Region 2"), Has("Item 2"))
+        state.stale[self.player] = True
+        self.assertTrue(self.world.get_region("Region 2").can_reach(state))
+
+
 class TestCacheDisabled(RuleBuilderTestCase):
     multiworld: MultiWorld  # pyright: ignore[reportUninitializedInstanceVariable]
     world: World  # pyright: ignore[reportUninitializedInstanceVariable]
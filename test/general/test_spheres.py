@@ -0,0 +1,87 @@
+import unittest
+
+from BaseClasses import CollectionState, Location, MultiWorld
+from Fill import distribute_items_restrictive, swap_location_item
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import setup_multiworld
+
+
+class TestSphereAnalysis(unittest.TestCase):
+    games = ("A Link to the Past", "APQuest", "Hollow Knight")
+
+    def setUp(self) -> None:
+        world_types = [AutoWorldRegister.world_types[game] for game in self.games]
+        self.multiworld = setup_multiworld(world_types, seed=0)
+        distribute_items_restrictive(self.multiworld)
+        call_all(self.multiworld, "post_fill")
+
+    @staticmethod
+    def sweep_spheres(multiworld: MultiWorld) -> list[set[Location]]:
+        state = CollectionState(multiworld)
+        locations = set(multiworld.get_filled_locations())
+        spheres: list[set[Location]] = []
+        while locations:
+            sphere = {location for location in locations if location.can_reach(state)}
+            spheres.append(sphere)
+            if not sphere:
+                spheres.append(locations)  # unreachable locations
+                break
+            for location in sphere:
+                state.collect(location.item, True, location)
+            locations -= sphere
+        return spheres
+
+    def test_spheres_are_shared(self) -> None:
+        """Ensure the spheres are computed once and match sweeping for them."""
+        analysis = self.multiworld.get_sphere_analysis()
+        self.assertEqual(list(self.multiworld.get_spheres()), self.sweep_spheres(self.multiworld))
+        self.assertIs(self.multiworld.get_sphere_analysis(), analysis)
+        self.assertFalse(analysis.unreachable)
+        self.assertEqual(len(analysis.states), len(analysis.spheres) + 1)
+        self.assertTrue(self.multiworld.has_beaten_game(analysis.get_state(-1)))
+        self.assertTrue(self.multiworld.fulfills_accessibility())
+        self.assertEqual(self.multiworld.fulfills_accessibility(),
+                         self.multiworld.fulfills_accessibility(CollectionState(self.multiworld)))
+
+    def test_states_not_shared(self) -> None:
+        """Ensure states copied from the analysis can be used while the analysis' states are copied by other threads."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        analysis = self.multiworld.get_sphere_analysis()
+        state = analysis.get_state(-1)
+        expected = {player: dict(items) for player, items in state.prog_items.items()}
+
+        def get_prog_items(_: int) -> dict[int, dict[str, int]]:
+            copied = analysis.get_state(-1)
+            return {player: dict(items) for player, items in copied.prog_items.items()}
+
+        with ThreadPoolExecutor(4) as pool:
+            for prog_items in pool.map(get_prog_items, range(200)):
+                self.assertEqual(prog_items, expected)
+
+    def test_unreachable_required_location(self) -> None:
+        """Ensure an unreachable location that accessibility requires fails the check, with or without a state."""
+        from Fill import FillError
+
+        location = next(location for location in sorted(self.multiworld.get_filled_locations())
+                        if location.advancement and
+                        self.multiworld.worlds[location.item.player].options.accessibility != "minimal")
+        location.access_rule = lambda state: False
+        self.multiworld.invalidate_sphere_analysis()
+        with self.assertRaises(FillError) as context:
+            self.multiworld.fulfills_accessibility()
+        self.assertIn(repr(location), str(context.exception))
+        with self.assertRaises(FillError):
+            self.multiworld.fulfills_accessibility(CollectionState(self.multiworld))
+
+    def test_placement_changes_invalidate(self) -> None:
+        """Ensure moving items results in new spheres."""
+        analysis = self.multiworld.get_sphere_analysis()
+        first, last = sorted(analysis.spheres[0])[0], sorted(analysis.spheres[-1])[0]
+        swap_location_item(first, last, check_locked=False)
+        self.assertIsNot(self.multiworld.get_sphere_analysis(), analysis)
+        self.assertEqual(list(self.multiworld.get_spheres()), self.sweep_spheres(self.multiworld))
+
+        analysis = self.multiworld.get_sphere_analysis()
+        self.multiworld.invalidate_sphere_analysis()
+        self.assertIsNot(self.multiworld.get_sphere_analysis(), analysis)
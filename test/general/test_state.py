@@ -1,7 +1,9 @@
 import unittest
+from collections import Counter
 
+from BaseClasses import CollectionState
 from worlds.AutoWorld import AutoWorldRegister, call_all
-from . import setup_solo_multiworld
+from . import TestWorld, setup_multiworld, setup_solo_multiworld
 
 
 class TestBase(unittest.TestCase):
@@ -27,3 +29,73 @@ class TestBase(unittest.TestCase):
                     with self.subTest("Step", step=step):
                         call_all(multiworld, step)
                         self.assertTrue(multiworld.get_all_state(False, allow_partial_entrances=True))
+
+
+class TestCopyOnWrite(unittest.TestCase):
+    def setUp(self) -> None:
+        self.multiworld = setup_multiworld([TestWorld, TestWorld], ())
+        self.state = CollectionState(self.multiworld)
+        self.state.add_item("Item", 1)
+        self.state.add_item("Item", 2)
+
+    def test_copies_are_independent(self) -> None:
+        """Ensure mutating either state after a copy does not affect the other one."""
+        copy = self.state.copy()
+        copy.add_item("Item", 1)
+        self.state.prog_items[2]["Other Item"] += 1
+        self.assertEqual(self.state.count("Item", 1), 1)
+        self.assertEqual(copy.count("Item", 1), 2)
+        self.assertEqual(self.state.count("Other Item", 2), 1)
+        self.assertEqual(copy.count("Other Item", 2), 0)
+
+        copy_of_copy = copy.copy()
+        copy_of_copy.add_item("Item", 1)
+        self.assertEqual(self.state.count("Item", 1), 1)
+        self.assertEqual(copy.count("Item", 1), 2)
+        self.assertEqual(copy_of_copy.count("Item", 1), 3)
+
+    def test_unused_players_are_not_cloned(self) -> None:
+        """Ensure a copy only clones the players it uses, and copying leaves the original's containers unchanged."""
+        counter = self.state.prog_items[2]
+        copy = self.state.copy()
+        copy.add_item("Item", 1)
+        self.assertFalse(dict.__contains__(copy.prog_items, 2))
+        self.state.add_item("Item", 2)
+        self.assertEqual(counter, Counter({"Item": 1}))
+        self.assertEqual(copy.count("Item", 2), 1)
+
+        copy = self.state.copy()
+        self.assertIsNot(copy.prog_items[2], self.state.prog_items[2])
+
+    def test_copied_from_threads(self) -> None:
+        """Ensure the same state can be copied and read from several threads at once."""
+        import sys
+        from concurrent.futures import ThreadPoolExecutor
+
+        # switch threads as often as possible, so they copy at the same time
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-6)
+        copy = self.state.copy()
+
+        def collect(count: int) -> tuple[int, int, int]:
+            copied = copy.copy()
+            copied.add_item("Item", 1, count)
+            copied_again = copied.copy()
+            copied_again.add_item("Item", 2, count)
+            return copy.count("Item", 1), copied.count("Item", 1), copied_again.count("Item", 2)
+
+        with ThreadPoolExecutor(8) as pool:
+            for count, counts in enumerate(pool.map(collect, range(1, 5001)), 1):
+                self.assertEqual(counts, (1, count + 1, count + 1))
+        self.assertEqual(self.state.count("Item", 1), 1)
+        self.assertEqual(copy.count("Item", 2), 1)
+
+    def test_mapping_interface(self) -> None:
+        """Ensure iterating and comparing shared per-player dicts sees every player."""
+        copy = self.state.copy()
+        self.assertEqual(set(copy.prog_items), {1, 2})
+        self.assertEqual(copy.prog_items, self.state.prog_items)
+        self.assertEqual(dict(copy.reachable_regions), {1: set(), 2: set()})
+        self.assertIn(2, copy.blocked_connections)
+        self.assertNotIn(3, copy.blocked_connections)
+        self.assertIsNone(copy.prog_items.get(3))
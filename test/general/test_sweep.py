@@ -0,0 +1,48 @@
+import os
+import unittest
+
+from BaseClasses import CollectionState, MultiWorld, compiled_sweep_for_advancements
+from Fill import distribute_items_restrictive
+from worlds.AutoWorld import AutoWorldRegister, call_all
+from . import setup_multiworld
+
+ci = bool(os.environ.get("CI"))  # always set in GitHub actions
+
+
+@unittest.skipIf(compiled_sweep_for_advancements is None and not ci, "_speedups not available")
+class TestCompiledSweep(unittest.TestCase):
+    # Ocarina of Time overrides Region.can_reach, which has to fall back to calling it
+    games = ("A Link to the Past", "APQuest", "Hollow Knight", "Ocarina of Time")
+
+    def setUp(self) -> None:
+        self.assertIsNotNone(compiled_sweep_for_advancements, "Failed to load _speedups")
+
+    @staticmethod
+    def sweep(multiworld: MultiWorld, compiled: bool) -> tuple[CollectionState, int]:
+        state = CollectionState(multiworld)
+        locations = [location for location in multiworld.get_filled_locations() if location.advancement]
+        advancements_per_player: dict[int, list] = {}
+        for location in locations:
+            advancements_per_player.setdefault(location.player, []).append(location)
+        if compiled:
+            sweep = compiled_sweep_for_advancements(state, list(advancements_per_player.items()), True)
+        else:
+            sweep = state._sweep_for_advancements_impl(list(advancements_per_player.items()), True)
+        return state, sum(1 for _ in sweep)
+
+    def test_sweep_matches_python(self) -> None:
+        """Ensure the compiled sweep collects the same items in the same amount of sweeps as the pure python one."""
+        world_types = [AutoWorldRegister.world_types[game] for game in self.games]
+        multiworld = setup_multiworld(world_types, seed=0)
+        distribute_items_restrictive(multiworld)
+        call_all(multiworld, "post_fill")
+
+        python_state, python_sweeps = self.sweep(multiworld, False)
+        compiled_state, compiled_sweeps = self.sweep(multiworld, True)
+
+        self.assertEqual(python_sweeps, compiled_sweeps)
+        self.assertEqual(python_state.advancements, compiled_state.advancements)
+        self.assertEqual(python_state.locations_checked, compiled_state.locations_checked)
+        self.assertEqual(python_state.prog_items, compiled_state.prog_items)
+        self.assertEqual(python_state.reachable_regions, compiled_state.reachable_regions)
+        self.assertTrue(multiworld.has_beaten_game(compiled_state))
@@ -0,0 +1,80 @@
+"""Verify that the network protocol encodes and decodes the same with and without orjson."""
+
+import json
+import unittest
+
+import NetUtils
+from NetUtils import ClientStatus, Hint, HintStatus, NetworkItem, NetworkPlayer, NetworkSlot, Permission, SlotType, \
+    decode, encode
+from Utils import Version
+
+values = {
+    "NetworkItem": [NetworkItem(1, 2, 3, 4), (NetworkItem(5, 6, 7),), {NetworkItem(8, 9, 10)}],
+    "NetworkPlayer": NetworkPlayer(0, 1, "Alias", "Player"),
+    "NetworkSlot": {1: NetworkSlot("Player", "Game", SlotType.group, [2, 3])},
+    "Hint": [Hint(1, 2, 3, 4, False, "Entrance", 1, HintStatus.HINT_PRIORITY), {Hint(2, 1, 4, 3, True)}],
+    "enums": {ClientStatus.CLIENT_GOAL: Permission.auto_enabled, "status": ClientStatus.CLIENT_PLAYING},
+    "keys": {1: 1, 1.5: 2, None: 4},
+    "bool keys": {True: 3, False: 5},
+    "numbers": [0, -1, 2 ** 63 - 1, -2 ** 63, 0.1, 1e-05, 1e300, float("inf"), float("-inf"), None],
+    "nan": {"value": float("nan"), float("nan"): [None]},
+    "big number": 2 ** 70,
+    "text": ["", "é", "☃", "\\u0041", "\ud800", "\"class\""],
+    "nested": [[[], {}], {"a": {"b": ({1, 2},)}}],
+}
+
+
+def stdlib_encode(obj: object) -> str:
+    return NetUtils._encode(NetUtils._scan_for_TypedTuples(obj))
+
+
+class TestJSON(unittest.TestCase):
+    def test_encode(self) -> None:
+        """Ensure encoding results in the same JSON as encoding with json."""
+        for name, value in values.items():
+            with self.subTest(name):
+                # compared as repr, as NaN doesn't equal itself
+                self.assertEqual(repr(json.loads(encode(value))), repr(json.loads(stdlib_encode(value))))
+
+    def test_round_trip(self) -> None:
+        """Ensure encoding and decoding results in the same objects as doing so with json."""
+        for name, value in values.items():
+            with self.subTest(name):
+                decoded = decode(encode([value]))[0]
+                self.assertEqual(repr(decoded), repr(NetUtils._decode(stdlib_encode([value]))[0]))
+        self.assertEqual(decode(encode([NetworkItem(1, 2, 3)])), [NetworkItem(1, 2, 3)])
+        self.assertIsInstance(decode(encode([NetworkItem(1, 2, 3)]))[0], NetworkItem)
+        # only allowlisted types are decoded as their type
+        self.assertEqual(decode(encode([Hint(1, 2, 3, 4, False)]))[0]["class"], "Hint")
+
+    def test_decode(self) -> None:
+        """Ensure decoding results in the same objects as decoding with json."""
+        messages = [
+            '[{"cmd":"LocationChecks","locations":[1,2,3]}]',
+            '[{"cmd":"Set","key":"k","operations":[{"operation":"add","value":123456789012345678901234567890}]}]',
+            '[{"item":1,"location":2,"player":3,"flags":0,"class":"NetworkItem","extra":1}]',
+            '[{"item":1,"location":2,"player":3,"flags":0,"\\u0063lass":"NetworkItem"}]',
+            '[{"major":0,"minor":6,"build":1,"class":"Version"}]',
+            '[NaN, Infinity, 1e400, "\\u00e9", "é"]',
+            '{"1": {"2": [true, false, null]}}',
+        ]
+        for message in messages:
+            with self.subTest(message):
+                decoded = decode(message)
+                expected = NetUtils._decode(message)
+                if message.startswith("[NaN"):
+                    self.assertEqual(repr(decoded), repr(expected))
+                else:
+                    self.assertEqual(decoded, expected)
+                    self.assertEqual([type(value) for value in decoded], [type(value) for value in expected])
+        self.assertEqual(decode('[{"major":0,"minor":6,"build":1,"class":"Version"}]'), [Version(0, 6, 1)])
+
+    def test_invalid(self) -> None:
+        for message in ("", "[", '{"a"}', "[1,]"):
+            with self.subTest(message):
+                with self.assertRaises(json.JSONDecodeError):
+                    decode(message)
+        with self.assertRaises(TypeError):
+            encode(object())
+        with self.assertRaises(TypeError):
+            encode({(1, 2): 1})
@@ -241,6 +241,16 @@ class Base:
             self.assertEqual(len(store[1]), 1)
             self.assertEqual(len(store[2]), 0)
 
+        def test_receiver_without_locations(self) -> None:
+            store = self.type({
+                1: {1: (5, 3, 0), 2: (6, 1, 0), 3: (5, 3, 1)},
+                2: {1: (5, 3, 0), 2: (5, 1, 0)},
+            })
+            self.assertEqual(list(store.find_item({3}, 5)), [(1, 1, 5, 3, 0), (1, 3, 5, 3, 1), (2, 1, 5, 3, 0)])
+            self.assertEqual(list(store.find_item({1, 3}, 5)),
+                             [(1, 1, 5, 3, 0), (1, 3, 5, 3, 1), (2, 1, 5, 3, 0), (2, 2, 5, 1, 0)])
+            self.assertEqual(store.get_for_player(3), {1: {1, 3}, 2: {1}})
+
 
 class TestPurePythonLocationStore(Base.TestLocationStore):
     """Run base method tests for pure python implementation."""
@@ -0,0 +1,86 @@
+"""Verify that multidata survives being written and loaded with every available compression."""
+
+import io
+import pickle
+import unittest
+import zlib
+
+from NetUtils import Hint, HintStatus, IndexedMultiData, NetworkSlot, SlotType, dump_multidata, load_multidata, \
+    open_multidata
+from Utils import VersionException, compression_available, compressions
+
+multidata = {
+    "slot_data": {1: {"option": 1}, 2: {"option": 2}},
+    "slot_info": {1: NetworkSlot("Player1", "Game", SlotType.player),
+                  2: NetworkSlot("Player2", "Game", SlotType.player)},
+    "locations": {1: {location: (location + 1000, 1, 0) for location in range(1, 1001)},
+                  2: {location: (location + 1000, 2, 0) for location in range(1, 11)}},
+    "precollected_hints": {1: {Hint(1, 1, 2, 1001, False, status=HintStatus.HINT_PRIORITY)}},
+    "spheres": [{1: set(range(1, 501))}, {1: set(range(501, 1001)), 2: set(range(1, 11))}],
+    "seed_name": "Test",
+}
+
+
+class TestMultidata(unittest.TestCase):
+    def test_round_trip(self) -> None:
+        for compression in compressions:
+            with self.subTest(compression=compression):
+                if not compression_available(compression):
+                    self.skipTest(f"{compression} not available")
+                file = io.BytesIO()
+                dump_multidata(multidata, file, compression)
+                file.seek(0)
+                self.assertEqual(load_multidata(file), multidata)
+
+    def test_zlib_is_format_3(self) -> None:
+        """Older servers only understand format 3, so zlib multidata has to be loadable as before."""
+        file = io.BytesIO()
+        dump_multidata(multidata, file)
+        data = file.getvalue()
+        self.assertEqual(data[0], 3)
+        self.assertEqual(pickle.loads(zlib.decompress(data[1:])), multidata)
+
+    def test_load_format_3(self) -> None:
+        data = bytes([3]) + zlib.compress(pickle.dumps(multidata), 9)
+        self.assertEqual(load_multidata(io.BytesIO(data)), multidata)
+
+    def test_refuses_unsafe_globals(self) -> None:
+        with self.assertRaises(pickle.PicklingError):
+            dump_multidata({"slot_data": {1: io.BytesIO}}, io.BytesIO())  # type: ignore[typeddict-item]
+
+    def test_newer_format(self) -> None:
+        with self.assertRaises(VersionException):
+            load_multidata(io.BytesIO(bytes([255, 0])))
+
+    def test_indexed_round_trip(self) -> None:
+        for compression in compressions:
+            with self.subTest(compression=compression):
+                if not compression_available(compression):
+                    self.skipTest(f"{compression} not available")
+                file = io.BytesIO()
+                dump_multidata(multidata, file, compression, indexed=True)
+                file.seek(0)
+                self.assertEqual(load_multidata(file), multidata)
+
+    def test_indexed_lazy(self) -> None:
+        """Ensure indexed multidata only decodes the sections of slots that are looked up."""
+        file = io.BytesIO()
+        dump_multidata(multidata, file, indexed=True)
+        data = file.getvalue()
+        self.assertEqual(data[0], IndexedMultiData.format_version)
+
+        lazy = open_multidata(data)
+        self.assertEqual(lazy["seed_name"], multidata["seed_name"])
+        self.assertEqual(lazy["slot_info"], multidata["slot_info"])
+        self.assertEqual(set(lazy["slot_data"]), {1, 2})
+        self.assertEqual(len(lazy["spheres"]), 2)
+        self.assertFalse(lazy["slot_data"]._decoded)
+
+        self.assertEqual(lazy["slot_data"][2], multidata["slot_data"][2])
+        self.assertEqual(lazy["spheres"][1].get(2), multidata["spheres"][1][2])
+        self.assertIsNone(lazy["spheres"][0].get(2))
+        self.assertEqual(set(lazy["slot_data"]._decoded), {2})
+        self.assertEqual(set(lazy["spheres"]._slot_spheres._decoded), {2})
+
+        self.assertEqual(lazy["locations"], multidata["locations"])
+        self.assertEqual([dict(sphere) for sphere in lazy["spheres"]], multidata["spheres"])
@@ -0,0 +1,53 @@
+"""Verify that SphereIndex finds the same spheres as scanning them."""
+
+import io
+import unittest
+
+from NetUtils import SphereIndex, dump_multidata, open_multidata
+from .test_multidata import multidata
+
+spheres = [
+    {1: {1, 2, 3}, 2: {100, 5000000}},
+    {1: {5, 6}, 2: {7}},
+    {2: {10, 2000000}, 3: set()},
+]
+
+
+def scan(slot: int, location_id: int) -> int:
+    for sphere_index, sphere in enumerate(spheres):
+        if location_id in sphere.get(slot, set()):
+            return sphere_index
+    raise KeyError(location_id)
+
+
+class TestSphereIndex(unittest.TestCase):
+    def test_lookup(self) -> None:
+        """Ensure dense and sparse location ids are found in their sphere and other ids are not found."""
+        index = SphereIndex(spheres)
+        self.assertEqual(len(index), 3)
+        for slot in (1, 2, 3, 4):
+            for location_id in (0, 1, 2, 3, 4, 5, 6, 7, 8, 10, 100, 2000000, 5000000, 5000001):
+                with self.subTest(slot=slot, location_id=location_id):
+                    try:
+                        expected = scan(slot, location_id)
+                    except KeyError:
+                        with self.assertRaises(KeyError):
+                            index.get_sphere(slot, location_id)
+                    else:
+                        self.assertEqual(index.get_sphere(slot, location_id), expected)
+
+    def test_slot_spheres(self) -> None:
+        index = SphereIndex(spheres)
+        self.assertEqual(index.get_slot_spheres(1), {1: 0, 2: 0, 3: 0, 5: 1, 6: 1})
+        self.assertEqual(index.get_slot_spheres(2), {7: 1, 10: 2, 100: 0, 2000000: 2, 5000000: 0})
+        self.assertEqual(index.get_slot_spheres(3), {})
+
+    def test_lazy_spheres(self) -> None:
+        """Ensure looking up a slot's spheres in indexed multidata only decodes the spheres of that slot."""
+        file = io.BytesIO()
+        dump_multidata(multidata, file, indexed=True)
+        lazy_spheres = open_multidata(file.getvalue())["spheres"]
+        index = SphereIndex(lazy_spheres)
+        self.assertEqual(index.get_sphere(2, 5), 1)
+        self.assertEqual(set(lazy_spheres._slot_spheres._decoded), {2})
+        self.assertEqual(index.get_sphere(1, 500), 0)
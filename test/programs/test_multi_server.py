@@ -1,5 +1,19 @@
+import asyncio
+import os
+import tempfile
+import typing
 import unittest
-from MultiServer import Context, ServerCommandProcessor
+from unittest.mock import patch
+
+from typing_extensions import override
+
+from MultiServer import Client, Context, ServerCommandProcessor, process_client_cmd, register_location_checks, \
+    send_items_to, send_new_items
+from NetUtils import Hint, HintStatus, MultiData, NetworkItem, NetworkSlot, SlotType, decode, dump_multidata, \
+    load_multidata
+
+if typing.TYPE_CHECKING:
+    from NetUtils import ServerConnection
 
 
 class TestResolvePlayerName(unittest.TestCase):
@@ -38,3 +52,360 @@ class TestResolvePlayerName(unittest.TestCase):
         assert p.resolve_player("ABC") == (1, 2, "abc"), "case insensitive resolves when 1 match"
         assert p.resolve_player("abcd") == (1, 3, "abCD"), "case insensitive resolves when 1 match"
         assert not p.resolve_player("aB"), "partial name shouldn't resolve to player"
+
+
+class TestSendNewItems(unittest.IsolatedAsyncioTestCase):
+    async def test_batched(self) -> None:
+        """Ensure new items are sent once per tick, to the clients of slots that received them, with one message each
+        for clients with the same state."""
+        ctx = Context("", 0, "", "", 0, 0, False)
+        ctx.clients = {0: {1: [], 2: [], 3: []}}
+        for slot, send_index in ((1, 0), (1, 0), (1, 1), (2, 0), (3, 0)):
+            client = create_client(ctx)
+            client.team, client.slot, client.send_index = 0, slot, send_index
+            ctx.clients[0][slot].append(client)
+        ctx.received_items[0, 1, False] = [NetworkItem(1, 1, 2, 0)]
+
+        with patch.object(ctx, "broadcast") as broadcast:
+            send_items_to(ctx, 0, 1, NetworkItem(2, 2, 2, 0), NetworkItem(3, 3, 2, 0))
+            send_new_items(ctx)
+            send_items_to(ctx, 0, 2, NetworkItem(4, 1, 1, 0))
+            send_new_items(ctx)
+            broadcast.assert_not_called()
+            await asyncio.sleep(0)
+
+        batches = {tuple(client.send_index for client in call.args[0]): call.args[1]
+                   for call in broadcast.call_args_list}
+        self.assertEqual(broadcast.call_count, 3)
+        self.assertEqual(batches[3, 3], [{"cmd": "ReceivedItems", "index": 0, "items": [
+            NetworkItem(1, 1, 2, 0), NetworkItem(2, 2, 2, 0), NetworkItem(3, 3, 2, 0)]}])
+        self.assertEqual(batches[(3,)], [{"cmd": "ReceivedItems", "index": 1, "items": [
+            NetworkItem(2, 2, 2, 0), NetworkItem(3, 3, 2, 0)]}])
+        self.assertEqual(ctx.clients[0][2][0].send_index, 1)
+        self.assertEqual(ctx.clients[0][3][0].send_index, 0)
+        self.assertFalse(ctx.new_items_slots)
+
+
+class FakeSocket:
+    def __init__(self) -> None:
+        self.open = True
+        self.sent: list[list[dict[str, typing.Any]]] = []
+        self.closed: tuple[int, str] | None = None
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    async def send(self, msg: str) -> None:
+        await self.writable.wait()
+        self.sent.append(decode(msg))
+
+    async def close(self, code: int, reason: str) -> None:
+        self.open = False
+        self.closed = code, reason
+
+
+def create_client(ctx: Context, socket: FakeSocket | None = None) -> Client:
+    # clients only use the parts of their websocket that FakeSocket implements
+    return Client(typing.cast("ServerConnection", socket), ctx)
+
+
+class TestOutgoingQueue(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False, max_backlog=3)
+        self.socket = FakeSocket()
+        self.client = create_client(self.ctx, self.socket)
+        self.ctx.endpoints.append(self.client)
+
+    async def test_coalesced(self) -> None:
+        """Ensure messages queued before the writer runs are sent together, in order, with RoomUpdates merged."""
+        self.ctx.broadcast([self.client], [{"cmd": "PrintJSON", "data": [{"text": "1"}]}])
+        self.ctx.broadcast([self.client], [{"cmd": "RoomUpdate", "checked_locations": [1], "hint_points": 1}])
+        self.ctx.broadcast([self.client], [{"cmd": "RoomUpdate", "checked_locations": {2}, "hint_points": 2}])
+        await self.ctx.send_msgs(self.client, [{"cmd": "RoomUpdate", "players": []}])
+        await self.ctx.send_msgs(self.client, [{"cmd": "PrintJSON", "data": [{"text": "2"}]},
+                                               {"cmd": "PrintJSON", "data": [{"text": "3"}]}])
+        self.assertEqual(self.ctx.get_outgoing_backlog(), (3, 3))
+        await asyncio.sleep(0)
+
+        self.assertEqual(self.socket.sent, [[
+            {"cmd": "PrintJSON", "data": [{"text": "1"}]},
+            {"cmd": "RoomUpdate", "checked_locations": [1, 2], "hint_points": 2, "players": []},
+            {"cmd": "PrintJSON", "data": [{"text": "2"}]},
+            {"cmd": "PrintJSON", "data": [{"text": "3"}]},
+        ]])
+        self.assertEqual(self.ctx.get_outgoing_backlog(), (0, 0))
+        self.assertIsNone(self.client.outgoing_writer)
+
+    async def test_encoded_once(self) -> None:
+        """Ensure messages are encoded once for all clients, when they are queued."""
+        sockets = [self.socket, FakeSocket(), FakeSocket()]
+        clients = [self.client] + [create_client(self.ctx, socket) for socket in sockets[1:]]
+        with patch.object(self.ctx, "dumper", wraps=Context.dumper) as dumper:
+            msgs: list[dict[str, typing.Any]] = [{"cmd": "PrintJSON", "data": [{"text": "1"}]}]
+            self.ctx.broadcast(clients, msgs)
+            msgs.clear()
+            self.ctx.broadcast(clients, [{"cmd": "RoomUpdate", "hint_points": 1}])
+            self.assertEqual(dumper.call_count, 1)
+            await asyncio.sleep(0)
+
+        self.assertEqual(dumper.call_count, 2)
+        for socket in sockets:
+            self.assertEqual(socket.sent, [[{"cmd": "PrintJSON", "data": [{"text": "1"}]},
+                                            {"cmd": "RoomUpdate", "hint_points": 1}]])
+
+    async def test_backlog(self) -> None:
+        """Ensure a client that doesn't keep up with its messages is disconnected."""
+        self.socket.writable.clear()
+        for i in range(4):
+            self.ctx.broadcast([self.client], [{"cmd": "PrintJSON", "data": [{"text": str(i)}]}])
+            await asyncio.sleep(0)
+        self.assertIsNone(self.socket.closed)
+        self.assertEqual(self.ctx.get_outgoing_backlog(), (3, 3))
+
+        self.assertFalse(await self.ctx.send_msgs(self.client, [{"cmd": "PrintJSON", "data": []}]))
+        await asyncio.sleep(0)
+        assert self.socket.closed is not None, "client wasn't disconnected"
+        self.assertEqual(self.socket.closed[0], 1008)
+        self.assertEqual(self.ctx.outgoing_backlog_peak, 3)
+        self.assertFalse(await self.ctx.send_msgs(self.client, [{"cmd": "PrintJSON", "data": []}]))
+
+
+def create_context(hint: Hint) -> Context:
+    ctx = Context("", 0, "", "", 0, 0, False)
+    ctx._load(typing.cast(MultiData, {  # pyright: ignore[reportPrivateUsage]
+        "minimum_versions": {"server": (0, 0, 0), "clients": {}},
+        "version": (0, 6, 0),
+        "slot_info": {1: NetworkSlot("Player1", "Archipelago", SlotType.player),
+                      2: NetworkSlot("Player2", "Archipelago", SlotType.player)},
+        "seed_name": "Test",
+        "connect_names": {"Player1": (0, 1), "Player2": (0, 2)},
+        "locations": {1: {11: (21, 2, 0), 12: (22, 2, 0)}, 2: {13: (23, 1, 0)}},
+        "slot_data": {1: {}, 2: {}},
+        "er_hint_data": {},
+        "precollected_items": {},
+        "precollected_hints": {1: {hint}, 2: {hint}},
+    }), {}, False)
+    return ctx
+
+
+class TestHints(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.hint = Hint(2, 1, 11, 21, False, status=HintStatus.HINT_PRIORITY)
+        self.ctx = create_context(self.hint)
+
+    async def test_check_updates_hint(self) -> None:
+        """Ensure checking a location updates the hints for it for every player, without touching other hints."""
+        other_hint = Hint(1, 2, 13, 23, False, status=HintStatus.HINT_PRIORITY)
+        self.ctx.hints[0, 1].add(other_hint)
+        self.ctx.hints[0, 2].add(other_hint)
+        self.ctx.index_hints(0, (other_hint,))
+        self.assertEqual(self.ctx.get_hint(0, 1, 11), self.hint)
+
+        register_location_checks(self.ctx, 0, 1, {12})
+        self.assertEqual(self.ctx.get_hint(0, 1, 11), self.hint)
+
+        register_location_checks(self.ctx, 0, 1, {11})
+        found_hint = self.hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(self.ctx.get_hint(0, 1, 11), found_hint)
+        self.assertEqual(self.ctx.hints[0, 1], {found_hint, other_hint})
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint, other_hint})
+
+    async def test_save_keeps_hints(self) -> None:
+        """Ensure hints stay up to date through saving and loading, which no longer rechecks all hints."""
+        register_location_checks(self.ctx, 0, 1, {11})
+        save = self.ctx.get_save()
+        found_hint = self.hint._replace(found=True, status=HintStatus.HINT_FOUND)
+        self.assertEqual(save["hints"], {(0, 1): {found_hint}, (0, 2): {found_hint}})
+
+        # an outdated hint in a save is updated when loading it
+        save["hints"] = {(0, 1): {self.hint}, (0, 2): {self.hint}}
+        self.ctx.set_save(save)
+        self.assertEqual(self.ctx.get_hint(0, 1, 11), found_hint)
+        self.assertEqual(self.ctx.hints[0, 2], {found_hint})
+
+
+class TestSaveJournal(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.hint = Hint(2, 1, 11, 21, False, status=HintStatus.HINT_PRIORITY)
+        self.ctx = create_context(self.hint)
+        self.directory = tempfile.TemporaryDirectory()
+        self.save_filename = os.path.join(self.directory.name, "test.apsave")
+        self.ctx.save_filename = self.save_filename
+
+    @override
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def load(self) -> Context:
+        ctx = create_context(self.hint)
+        ctx.save_filename = self.save_filename
+        with patch.object(ctx, "_start_async_saving"):
+            ctx.init_save()
+        return ctx
+
+    @staticmethod
+    def save(ctx: Context, exit_save: bool = False) -> bool:
+        return ctx._save(exit_save)  # pyright: ignore[reportPrivateUsage]
+
+    def get_journal_size(self, ctx: Context) -> int:
+        assert ctx.save_journal_size is not None, "the save journal wasn't written"
+        return ctx.save_journal_size
+
+    def assertSameSave(self, ctx: Context) -> None:
+        expected, actual = self.ctx.get_save(), ctx.get_save()
+        for save in (expected, actual):
+            del save["random_state"]
+            # reading hints_used adds unchanged counts, which aren't worth journaling
+            save["hints_used"] = {key: used for key, used in save["hints_used"].items() if used}
+        self.assertEqual(expected, actual)
+
+    async def test_replays_changes(self) -> None:
+        """Ensure changes appended to the save journal are replayed on top of the save when loading."""
+        self.assertTrue(self.save(self.ctx))
+        full_save = os.path.getsize(self.save_filename)
+
+        register_location_checks(self.ctx, 0, 1, {11})
+        self.ctx.stored_data["key"] = 1
+        self.ctx.mark_unsaved("stored_data", "key")
+        self.ctx.name_aliases[0, 2] = "Alias"
+        self.ctx.mark_unsaved("name_aliases", (0, 2))
+        self.assertTrue(self.save(self.ctx))
+        register_location_checks(self.ctx, 0, 2, {13})
+        del self.ctx.name_aliases[0, 2]
+        self.ctx.mark_unsaved("name_aliases", (0, 2))
+        self.assertTrue(self.save(self.ctx))
+
+        self.assertEqual(os.path.getsize(self.save_filename), full_save)
+        ctx = self.load()
+        self.assertSameSave(ctx)
+        self.assertEqual(ctx.location_checks[0, 2], {13})
+        self.assertEqual(ctx.get_hint(0, 1, 11), self.hint._replace(found=True, status=HintStatus.HINT_FOUND))
+
+        # loading keeps appending to the same journal
+        register_location_checks(ctx, 0, 1, {12})
+        self.assertTrue(self.save(ctx))
+        self.ctx = ctx
+        self.assertSameSave(self.load())
+
+    async def test_compacts_on_exit(self) -> None:
+        """Ensure an exit save writes all changes into the save and starts a new journal."""
+        self.assertTrue(self.save(self.ctx))
+        register_location_checks(self.ctx, 0, 1, {11})
+        self.assertTrue(self.save(self.ctx))
+        journal_size = self.get_journal_size(self.ctx)
+        self.assertTrue(self.save(self.ctx, True))
+        self.assertLess(self.get_journal_size(self.ctx), journal_size)
+        self.assertEqual(os.path.getsize(self.ctx.save_journal_filename), self.get_journal_size(self.ctx))
+        self.assertSameSave(self.load())
+
+    async def test_ignores_incomplete_changes(self) -> None:
+        """Ensure a journal cut off while writing, or left behind by an older save, is not applied."""
+        self.assertTrue(self.save(self.ctx))
+        register_location_checks(self.ctx, 0, 1, {11})
+        self.assertTrue(self.save(self.ctx))
+        complete = self.get_journal_size(self.ctx)
+        register_location_checks(self.ctx, 0, 1, {12})
+        self.assertTrue(self.save(self.ctx))
+        os.truncate(self.ctx.save_journal_filename, self.get_journal_size(self.ctx) - 1)
+
+        ctx = self.load()
+        self.assertEqual(ctx.location_checks[0, 1], {11})
+        self.assertEqual(os.path.getsize(ctx.save_journal_filename), complete)
+
+        with open(self.ctx.save_journal_filename, "rb") as f:
+            journal = f.read()
+        self.assertTrue(self.save(ctx, True))
+        with open(self.ctx.save_journal_filename, "wb") as f:
+            f.write(journal)
+        self.assertEqual(self.load().location_checks[0, 1], {11})
+
+
+class TestLoad(unittest.TestCase):
+    def test_maps_indexed_multidata(self) -> None:
+        """Ensure only indexed multidata is loaded from the memory-mapped file, which is closed on shutdown."""
+        with open(os.path.join(os.path.dirname(__file__), "..", "webhost", "data", "One_Archipelago.archipelago"),
+                  "rb") as f:
+            multidata = load_multidata(f)
+        with tempfile.TemporaryDirectory() as directory:
+            for indexed in (False, True):
+                with self.subTest(indexed=indexed):
+                    filename = os.path.join(directory, f"{indexed}.archipelago")
+                    with open(filename, "wb") as f:
+                        dump_multidata(multidata, f, indexed=indexed)
+                    ctx = Context("", 0, "", "", 0, 0, False)
+                    ctx.load(filename)
+                    self.assertEqual(ctx.slot_info, multidata["slot_info"])
+                    mapping = ctx.multidata_mapping
+                    self.assertEqual(mapping is not None, indexed)
+                    ctx.close_multidata()
+                    self.assertIsNone(ctx.multidata_mapping)
+                    if mapping is not None:
+                        with self.assertRaises(ValueError):
+                            mapping.read(1)
+
+
+class TestDataStorage(unittest.IsolatedAsyncioTestCase):
+    @override
+    def setUp(self) -> None:
+        self.ctx = Context("", 0, "", "", 0, 0, False, datastorage_quota=100)
+        self.ctx.player_names = {(0, 1): "Player1", (0, 2): "Player2"}
+        self.sockets: list[FakeSocket] = []
+        self.clients: list[Client] = []
+        for slot in (1, 2):
+            socket = FakeSocket()
+            client = create_client(self.ctx, socket)
+            client.auth = True
+            client.team, client.slot = 0, slot
+            self.sockets.append(socket)
+            self.clients.append(client)
+
+    async def set(self, client: Client, key: str, value: object) -> None:
+        await process_client_cmd(self.ctx, client, {"cmd": "Set", "key": key, "default": None,
+                                                    "operations": [{"operation": "replace", "value": value}]})
+        await asyncio.sleep(0)
+
+    async def test_prefix_notify(self) -> None:
+        """Ensure SetNotify keys ending in * follow every key with that prefix, and Sets count up the key's version."""
+        watcher, setter = self.clients
+        await process_client_cmd(self.ctx, watcher, {"cmd": "SetNotify", "keys": ["game_*", "other"]})
+        await self.set(setter, "game_1", 1)
+        await self.set(setter, "game_1", 2)
+        await self.set(setter, "gam", 3)
+        await self.set(setter, "other", 4)
+
+        self.assertEqual([(msg["key"], msg["original_value"], msg["value"])
+                          for msgs in self.sockets[0].sent for msg in msgs],
+                         [("game_1", None, 1), ("game_1", 1, 2), ("other", None, 4)])
+        self.assertEqual(self.sockets[1].sent, [])
+        self.assertEqual(self.ctx.data_storage.versions, {"game_1": 2, "gam": 1, "other": 1})
+
+    async def test_quota(self) -> None:
+        """Ensure a Set exceeding the quota of the slot that created the key is refused and leaves the key unchanged."""
+        first, second = self.clients
+        await self.set(first, "key", "a" * 40)
+        await self.set(second, "other", "c" * 60)
+        # accounted to the first slot, which created the key, so it fits
+        await self.set(second, "key", "b" * 50)
+        self.assertEqual(self.sockets[1].sent, [])
+        await self.set(second, "key", "b" * 90)
+        self.assertEqual(self.sockets[1].sent, [[{"cmd": "InvalidPacket", "type": "arguments", "text": "Set",
+                                                "original_cmd": "Set"}]])
+        self.assertEqual(self.ctx.stored_data, {"key": "b" * 50, "other": "c" * 60})
+        self.assertEqual(self.ctx.data_storage.versions, {"key": 2, "other": 1})
+
+    async def test_read_data_batched(self) -> None:
+        """Ensure changes to _read_ keys within one tick are sent once, with the latest value."""
+        ctx = create_context(Hint(2, 1, 11, 21, False))
+        with patch.object(ctx, "broadcast") as broadcast:
+            ctx.on_changed_hints(0, 1)
+            self.assertIsNone(ctx.read_data_handle, "nobody follows the key")
+
+            ctx.data_storage.subscribe(self.clients[0], "_read_client_status_*")
+            for status in (5, 10, 30):
+                ctx.client_game_state[0, 1] = status
+                ctx.on_client_status_change(0, 1)
+            await asyncio.sleep(0)
+        self.assertEqual([call.args[1] for call in broadcast.call_args_list],
+                         [[{"cmd": "SetReply", "key": "_read_client_status_0_1", "value": 30}]])
@@ -0,0 +1,74 @@
+from uuid import uuid4
+
+from pony.orm import db_session
+
+from Utils import restricted_dumps
+from WebHostLib.autolauncher import GenerationScheduler
+from WebHostLib.models import Generation, STATE_QUEUED
+from . import TestBase
+
+
+class TestGenerationScheduler(TestBase):
+    def test_schedule(self) -> None:
+        """Verify small generations get ahead of large ones and owners with fewer running generations go first."""
+        scheduler = GenerationScheduler({
+            "GENERATORS": 3,
+            "SMALL_GENERATORS": 1,
+            "SMALL_GENERATION_COST": 2,
+            "GENERATION_GAME_COSTS": {"Heavy Game": 5},
+            "JOB_TIME": 600,
+        })
+        owner, other_owner = uuid4(), uuid4()
+
+        def queue(owner, *games: str) -> Generation:
+            options = {f"{player}.yaml": {"game": game} for player, game in enumerate(games, 1)}
+            return Generation(owner=owner, options=restricted_dumps(options), state=STATE_QUEUED)
+
+        def start(generations: list[Generation]) -> None:
+            for generation in generations:
+                scheduler.start(generation, {})
+
+        with db_session:
+            heavy = queue(owner, "Heavy Game")
+            self.assertEqual(scheduler.schedule([heavy]), [heavy])
+            start([heavy])
+
+            large = [queue(other_owner, "Game", "Game", "Game"), queue(other_owner, "Game", "Game", "Game")]
+            small = [queue(owner, "Game"), queue(owner, "Game", "Game")]
+            scheduled = scheduler.schedule([*large, *small])
+            # the other owner goes first, then only small ones may take the last generator
+            self.assertEqual(len(scheduled), 2)
+            self.assertIn(scheduled[0], large)
+            self.assertIn(scheduled[1], small)
+            start(scheduled)
+            self.assertEqual(scheduler.get_stats()[:4], (2, 1, 3, 1))
+
+            remaining = [generation for generation in large + small if generation not in scheduled]
+            self.assertEqual(scheduler.schedule(remaining), [])
+            scheduler.finish(scheduled[1].id)
+            self.assertEqual(scheduler.schedule(remaining), [remaining[1]])
+
+    def test_expire_running(self) -> None:
+        """Verify a generation whose worker never reports back frees its generator once it ran out of time."""
+        scheduler = GenerationScheduler({
+            "GENERATORS": 1,
+            "SMALL_GENERATORS": 0,
+            "SMALL_GENERATION_COST": 2,
+            "GENERATION_GAME_COSTS": {},
+            "JOB_TIME": 600,
+        })
+        options = {"1.yaml": {"game": "Game"}}
+
+        with db_session:
+            lost, queued = (Generation(owner=uuid4(), options=restricted_dumps(options), state=STATE_QUEUED)
+                            for _ in range(2))
+            scheduler.start(lost, options)
+            self.assertEqual(scheduler.schedule([queued]), [])
+
+            running = scheduler.running[lost.id]
+            scheduler.running[lost.id] = running._replace(started_time=running.started_time - 600)
+            self.assertEqual(scheduler.schedule([queued]), [])
+            scheduler.running[lost.id] = running._replace(started_time=running.started_time - 600 - 61)
+            with self.assertLogs(level="WARNING"):
+                self.assertEqual(scheduler.schedule([queued]), [queued])
+            self.assertEqual(scheduler.get_stats().running, 0)
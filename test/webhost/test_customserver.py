@@ -0,0 +1,144 @@
+import asyncio
+import logging
+import socket
+import tempfile
+import unittest
+from uuid import uuid4
+
+from . import TestBase
+
+
+class TestDBCommandListener(TestBase):
+    def test_fetch_commands(self) -> None:
+        """Verify commands are fetched and removed for the listened to rooms only."""
+        from pony.orm import db_session
+        from WebHostLib.customserver import DBCommandListener
+        from WebHostLib.models import Command, Room, Seed
+
+        owner = uuid4()
+        with db_session:
+            rooms = [Room(seed=Seed(multidata=b"", owner=owner), owner=owner, tracker=uuid4()) for _ in range(3)]
+            room_ids = [room.id for room in rooms]
+            for room in rooms:
+                Command(room=room, commandtext=f"/say {room.id}")
+
+        listener = DBCommandListener()
+        listener.max_rooms_per_query = 1
+        fetched = listener._fetch_commands(room_ids[:2])
+        self.assertEqual(sorted(fetched), sorted((room_id, f"/say {room_id}") for room_id in room_ids[:2]))
+        with db_session:
+            self.assertEqual([command.room.id for command in Command.select()], room_ids[2:])
+        self.assertEqual(listener._fetch_commands(room_ids[:2]), [])
+
+
+class TestCommandNotify(unittest.IsolatedAsyncioTestCase):
+    async def test_wakeup(self) -> None:
+        """Verify a notification makes the listener fetch commands right away, once for notifications in between,
+        and that it only stops polling every interval once notified."""
+        from WebHostLib.customserver import DBCommandListener
+
+        fetched = []
+
+        class Listener(DBCommandListener):
+            interval = 0.05
+
+            def _fetch_commands(self, room_ids):
+                fetched.append(room_ids)
+                return []
+
+        listener = Listener()
+        await listener.listen_for_notifications(0)
+        self.assertIsNotNone(listener.transport)
+        self.addCleanup(listener.transport.close)
+        port = listener.transport.get_extra_info("sockname")[1]
+        listener.processors["room"] = None
+        listener.task = asyncio.create_task(listener.listen())
+        self.addCleanup(listener.task.cancel)
+        await asyncio.sleep(0.2)
+        self.assertGreater(len(fetched), 1)
+        self.assertFalse(listener.notified)
+
+        polled = len(fetched)
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as notify_socket:
+            for _ in range(3):
+                notify_socket.sendto(b"\0", ("127.0.0.1", port))
+        await asyncio.sleep(0.1)
+        self.assertTrue(listener.notified)
+        # a poll may have been due as the notifications arrived
+        self.assertIn(len(fetched), (polled + 1, polled + 2))
+        notified = len(fetched)
+        await asyncio.sleep(0.2)
+        self.assertEqual(len(fetched), notified)
+
+
+class TestStaticNameTables(unittest.IsolatedAsyncioTestCase):
+    async def test_shared(self) -> None:
+        """Verify rooms use the shared name tables for static data packages and build their own for custom ones."""
+        from WebHostLib.customserver import WebHostContext, share_static_server_data, write_name_tables
+
+        static_server_data = {
+            "non_hintable_names": {"Game": {"Item"}},
+            "gamespackage": {
+                "Archipelago": {"item_name_to_id": {"Nothing": -1}, "location_name_to_id": {"Cheat Console": -1}},
+                "Game": {"item_name_to_id": {"Item": 1}, "location_name_to_id": {"Location": 2}, "checksum": "1"},
+            },
+            "item_name_groups": {"Archipelago": {}, "Game": {"Group": {"Item"}}},
+            "location_name_groups": {"Archipelago": {}, "Game": {}},
+        }
+        directory = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.addCleanup(directory.cleanup)
+        static_server_data["name_tables"] = write_name_tables(static_server_data["gamespackage"], directory.name)
+        self.assertEqual(write_name_tables(static_server_data["gamespackage"], directory.name),
+                         static_server_data["name_tables"])
+        share_static_server_data(static_server_data)
+        tables = static_server_data["static_name_tables"]
+        ctx = WebHostContext(static_server_data, logging.getLogger("Test"))
+        other_ctx = WebHostContext(static_server_data, logging.getLogger("Test"))
+        ctx.gamespackage = dict(ctx.gamespackage)
+        ctx.gamespackage["Custom"] = {"item_name_to_id": {"Custom Item": 3}, "location_name_to_id": {}}
+        ctx.item_name_groups = {**ctx.item_name_groups, "Custom": {}}
+        ctx._init_game_data()
+        other_ctx._init_game_data()
+
+        self.assertIs(ctx.item_names["Game"], tables.item_names["Game"])
+        self.assertIs(other_ctx.item_names["Game"], tables.item_names["Game"])
+        self.assertIs(ctx.non_hintable_names, other_ctx.non_hintable_names)
+        self.assertEqual(dict(ctx.item_names["Game"]), {1: "Item", -1: "Nothing"})
+        self.assertEqual(dict(ctx.location_names["Archipelago"]), {-1: "Cheat Console"})
+        self.assertEqual(ctx.item_names["Game"][4], "Unknown item (ID:4)")
+        self.assertNotIn(4, tables.item_names["Game"])
+        self.assertEqual(ctx.all_item_and_group_names["Game"], {"Item", "Group"})
+        self.assertEqual(ctx.checksums, {"Game": "1"})
+        self.assertEqual(dict(ctx.item_names["Custom"]), {3: "Custom Item", -1: "Nothing"})
+        self.assertNotIn("Custom", other_ctx.item_names)
+        self.assertIn("Custom", ctx.gamespackage)
+
+
+class TestTrackerHistory(unittest.TestCase):
+    def test_update(self) -> None:
+        """Verify the history keeps checks in saved order and amounts of received items and checks when they change."""
+        from NetUtils import NetworkItem
+        from WebHostLib.customserver import TrackerHistory
+
+        history = TrackerHistory()
+        history.max_changes = 2
+        save = {"location_checks": {(0, 1): {5, 4}}, "received_items": {}}
+        history.update(save, ())
+        save["location_checks"][0, 2] = {1}
+        history.update(save, {(0, 2)})
+        save["location_checks"][0, 1] |= {1}
+        save["received_items"][0, 1, True] = [NetworkItem(1, 1, 2)]
+        save["received_items"][0, 1, False] = [NetworkItem(1, 1, 2), NetworkItem(2, 2, 2)]
+        history.update(save, ())
+        history.update(save, ())
+        save["location_checks"][0, 2] |= {2}
+        history.update(save, ())
+
+        self.assertEqual(history.generation, 5)
+        self.assertEqual(history.check_order, {(0, 1): [4, 5, 1], (0, 2): [1, 2]})
+        self.assertEqual(history.changes, {(0, 1): [(1, 0, 2), (3, 1, 3)], (0, 2): [(2, 0, 1), (5, 0, 2)]})
+        self.assertEqual(history.hints_generation, {(0, 2): 2})
+
+        restored = TrackerHistory(history.get_summary())
+        self.assertEqual(restored.get_summary(), history.get_summary())
+        self.assertEqual(TrackerHistory({"hints": {}}).generation, 0)
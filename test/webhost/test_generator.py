@@ -0,0 +1,43 @@
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+
+def get_worker_state() -> tuple[int, float]:
+    from WebHostLib import generator
+
+    return os.getpid(), generator._import_time
+
+
+@unittest.skipIf("forkserver" not in multiprocessing.get_all_start_methods(), "warm generators require forkserver")
+class TestGeneratorPool(unittest.TestCase):
+    def test_warm_workers(self) -> None:
+        """Verify warm generators run each job in a fresh process that doesn't have to import the worlds."""
+        from WebHostLib.generator import get_generator_pool
+
+        directory = tempfile.TemporaryDirectory(ignore_cleanup_errors=True)
+        self.addCleanup(directory.cleanup)
+        pony_config = {"provider": "sqlite", "filename": os.path.join(directory.name, "gen.db3"), "create_db": True}
+        # workers only map to existing tables, and this process' database may already be bound
+        subprocess.run([sys.executable, "-c", "import json, sys; from WebHostLib.models import db; "
+                        "db.bind(**json.loads(sys.argv[1])); db.generate_mapping(create_tables=True)",
+                        json.dumps(pony_config)],
+                       check=True, cwd=os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+        config = {
+            "GENERATORS": 1,
+            "GENERATOR_PRELOAD": True,
+            "GENERATOR_MEMORY_LIMIT": -1,
+            "PONY": pony_config,
+        }
+        with get_generator_pool(config) as pool:
+            first_pid, first_import_time = pool.apply(get_worker_state)
+            second_pid, second_import_time = pool.apply(get_worker_state)
+
+        self.assertNotEqual(first_pid, second_pid)
+        self.assertNotEqual(first_pid, os.getpid())
+        self.assertEqual(first_import_time, 0)
+        self.assertEqual(second_import_time, 0)
@@ -103,3 +103,130 @@ class TestTracker(TestBase):
                 self.assertEqual(response.status_code, 200)
             with self.client.open(url_for("api.tracker_slot_data", tracker=self.tracker_uuid)) as response:
                 self.assertEqual(response.status_code, 200)
+
+    def test_tracker_spheres(self) -> None:
+        """Verify that the static tracker api lists the locations of each player by sphere."""
+        from unittest.mock import patch
+        from WebHostLib.tracker import TrackerData
+
+        spheres = [{1: {2, 1}}, {}, {1: {3}, 2: {7}}]
+        # the slot of the test room is a spectator, which the tracker leaves out
+        with patch.object(TrackerData, "get_all_players", return_value={0: [1]}), \
+                patch.object(TrackerData, "get_spheres", return_value=spheres), self.app.test_request_context():
+            with self.client.open(url_for("api.static_tracker_data", tracker=self.tracker_uuid)) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json["player_spheres"],
+                                 [{"team": 0, "player": 1, "spheres": [[1, 2], [], [3]]}])
+
+    def test_tracker_data_cached(self) -> None:
+        """Verify that decoded tracker data is kept across requests until the room saves again."""
+        from datetime import timedelta
+        from pony.orm import db_session
+        from WebHostLib.models import Room
+        from WebHostLib.tracker import TrackerData
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            first, second = TrackerData(room), TrackerData(room)
+            self.assertIs(first._multidata, second._multidata)
+            self.assertIs(first.item_id_to_name["Archipelago"], second.item_id_to_name["Archipelago"])
+            self.assertIs(first._tracker_cache, second._tracker_cache)
+            self.assertEqual(first.get_player_checked_locations(0, 1), set())
+
+            room.multisave = pickle.dumps({"location_checks": {(0, 1): {1}}})
+            room.last_activity += timedelta(seconds=1)
+            third = TrackerData(room)
+            self.assertIs(first._multidata, third._multidata)
+            self.assertIsNot(first._tracker_cache, third._tracker_cache)
+            self.assertEqual(third.get_player_checked_locations(0, 1), {1})
+
+    def test_tracker_summary(self) -> None:
+        """Verify that trackers read aggregates from the tracker summary without decoding the multisave."""
+        from pony.orm import db_session
+        from NetUtils import ClientStatus, NetworkItem
+        from WebHostLib.customserver import TrackerHistory, get_tracker_summary
+        from WebHostLib.models import Room, RoomTrackerSummary
+        from WebHostLib.tracker import TrackerData
+
+        save = {
+            "location_checks": {(0, 1): {1, 2}},
+            "received_items": {(0, 1, True): [NetworkItem(5, 1, 1), NetworkItem(5, 2, 1)],
+                               (0, 1, False): [NetworkItem(5, 1, 1)]},
+            "client_game_state": {(0, 1): ClientStatus.CLIENT_GOAL},
+            "hints": {},
+            "name_aliases": {(0, 1): "Alias"},
+        }
+        with db_session:
+            room = Room.get(id=self.room_id)
+            room.multisave = pickle.dumps(save)
+            RoomTrackerSummary(room=room, data=pickle.dumps(get_tracker_summary(save, TrackerHistory())))
+
+        with db_session:
+            room = Room.get(id=self.room_id)
+            tracker_data = TrackerData(room)
+            self.assertEqual(tracker_data.get_player_checked_locations_count(0, 1), 2)
+            self.assertEqual(tracker_data.get_player_inventory_counts(0, 1)[5], 2)
+            self.assertEqual(tracker_data.get_player_client_status(0, 1), ClientStatus.CLIENT_GOAL)
+            self.assertEqual(tracker_data.get_room_long_player_names()[0, 1], "Alias (Player1)")
+            self.assertIsNone(tracker_data._room_state.multisave)
+
+            self.assertEqual(tracker_data.get_player_checked_locations(0, 1), {1, 2})
+            self.assertIsNotNone(tracker_data._room_state.multisave)
+
+    def test_tracker_versions(self) -> None:
+        """Verify that the tracker api tags its data with the save version and trackers tell what changed since one."""
+        from pony.orm import db_session
+        from NetUtils import NetworkItem
+        from WebHostLib.customserver import TrackerHistory, get_tracker_summary
+        from WebHostLib.models import Room, RoomTrackerSummary
+        from WebHostLib.tracker import TrackerData
+
+        history = TrackerHistory()
+
+        def save_room(save: dict, changed_hints: set) -> None:
+            history.update(save, changed_hints)
+            room = Room.get(id=self.room_id)
+            summary = pickle.dumps(get_tracker_summary(save, history))
+            if room.tracker_summary:
+                room.tracker_summary.set(data=summary, generation=history.generation)
+            else:
+                RoomTrackerSummary(room=room, data=summary, generation=history.generation)
+            room.multisave = pickle.dumps(save)
+
+        save = {"location_checks": {(0, 1): {3}}, "received_items": {(0, 1, True): [NetworkItem(5, 3, 1)]}}
+        with db_session:
+            save_room(save, set())
+        with db_session:
+            save["location_checks"][0, 1] |= {1, 2}
+            save["received_items"][0, 1, True] = save["received_items"][0, 1, True] + [NetworkItem(6, 1, 1)]
+            save_room(save, {(0, 1)})
+
+        with db_session:
+            tracker_data = TrackerData(Room.get(id=self.room_id))
+            self.assertEqual(tracker_data.get_version(), 2)
+            self.assertEqual(tracker_data.get_player_amounts_since(0, 1, 1), (1, 1))
+            self.assertEqual(tracker_data.get_player_amounts_since(0, 1, 2), (2, 3))
+            self.assertIsNone(tracker_data.get_player_amounts_since(0, 1, 0))
+            self.assertIsNone(tracker_data.get_player_amounts_since(0, 1, 3))
+            self.assertEqual(tracker_data.get_player_checked_locations_in_order(0, 1), [3, 1, 2])
+            self.assertTrue(tracker_data.get_player_hints_changed_since(0, 1, 1))
+            self.assertFalse(tracker_data.get_player_hints_changed_since(0, 1, 2))
+
+        with self.app.test_request_context():
+            url = url_for("api.tracker_data", tracker=self.tracker_uuid)
+            with self.client.open(url) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json["version"], 2)
+                etag = response.headers["ETag"]
+            with self.client.open(url, headers={"If-None-Match": etag}) as response:
+                self.assertEqual(response.status_code, 304)
+            with self.client.open(url_for("api.tracker_data", tracker=self.tracker_uuid, since=1),
+                                  headers={"If-None-Match": etag}) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json["version"], 2)
+
+            with db_session:
+                save_room(save, set())
+            with self.client.open(url, headers={"If-None-Match": etag}) as response:
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json["version"], 3)
@@ -1,8 +1,12 @@
 from __future__ import annotations
 
+import concurrent.futures
 import hashlib
+import io
 import logging
+import multiprocessing
 import pathlib
+import pickle
 import sys
 import time
 from collections.abc import Callable, Iterable, Mapping
@@ -197,6 +201,14 @@ def call_single(multiworld: "MultiWorld", method_name: str, player: int, *args:
         return ret
 
 
+def _check_new_items(multiworld: "MultiWorld", player: int, new_items: List["Item"]) -> None:
+    for i, item in enumerate(new_items):
+        for other in new_items[i+1:]:
+            assert item is not other, (
+                f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
+                f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+
+
 def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
     world_types: Set[AutoWorldRegister] = set()
     for player in multiworld.player_ids:
@@ -204,12 +216,7 @@ def call_all(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
         world_types.add(multiworld.worlds[player].__class__)
         call_single(multiworld, method_name, player, *args)
         if __debug__:
-            new_items = multiworld.itempool[prev_item_count:]
-            for i, item in enumerate(new_items):
-                for other in new_items[i+1:]:
-                    assert item is not other, (
-                        f"Duplicate item reference of \"{item.name}\" in \"{multiworld.worlds[player].game}\" "
-                        f"of player \"{multiworld.player_name[player]}\". Please make a copy instead.")
+            _check_new_items(multiworld, player, multiworld.itempool[prev_item_count:])
 
     call_stage(multiworld, method_name, *args)
 
@@ -222,6 +229,212 @@ def call_stage(multiworld: "MultiWorld", method_name: str, *args: Any) -> None:
             _timed_call(stage_callable, multiworld, *args)
 
 
+isolated_stages = ("generate_early", "create_regions", "create_items", "set_rules")
+"""The steps that can be run in worker processes for worlds with isolated_generation, see call_all_isolated."""
+
+_isolated_multiworld: Optional["MultiWorld"] = None
+"""The multiworld forked into the worker processes of call_all_isolated."""
+
+
+def _get_existing_objects(multiworld: "MultiWorld", player: int, item_count: int,
+                          precollected_counts: Dict[int, int]) -> Dict[Tuple[Any, ...], Any]:
+    """
+    Returns the objects a step of an isolated world can reference that existed before it, by keys that find the same
+    objects in the worker process and in the multiworld the results get merged into: the items in the item pool and
+    precollected before the step, and the player's regions, entrances, locations and the items placed at them.
+    """
+    regions = multiworld.regions
+    existing: Dict[Tuple[Any, ...], Any] = {}
+    for index, item in enumerate(multiworld.itempool[:item_count]):
+        existing["itempool", index] = item
+    for precollected_player, count in precollected_counts.items():
+        for index, item in enumerate(multiworld.precollected_items[precollected_player][:count]):
+            existing["precollected", precollected_player, index] = item
+    for name, region in regions.region_cache[player].items():
+        existing["region", name] = region
+    for name, entrance in regions.entrance_cache[player].items():
+        existing["entrance", name] = entrance
+    for name, location in regions.location_cache[player].items():
+        existing["location", name] = location
+        if location.item:
+            existing["placed", name] = location.item
+    return existing
+
+
+def _get_object_state(obj: Any) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    slots = {slot: getattr(obj, slot) for cls in type(obj).__mro__ for slot in getattr(cls, "__slots__", ())
+             if slot not in ("__dict__", "__weakref__") and hasattr(obj, slot)}
+    return slots, getattr(obj, "__dict__", None)
+
+
+def _set_object_state(obj: Any, state: Tuple[Dict[str, Any], Optional[Dict[str, Any]]]) -> None:
+    """Replaces all attributes of obj, also removing the ones the step deleted."""
+    slots, attributes = state
+    for slot, value in slots.items():
+        object.__setattr__(obj, slot, value)
+    if attributes is not None:
+        vars(obj).clear()
+        vars(obj).update(attributes)
+
+
+class _IsolatedWorldPickler(pickle.Pickler):
+    """
+    Pickles the results of a world's step, referencing the multiworld, the worlds and the objects that existed before
+    the step instead of copying them, so merging the results keeps their identity.
+    """
+
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld", existing: Dict[Tuple[Any, ...], Any]) -> None:
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.multiworld = multiworld
+        self.existing_ids = {id(obj): key for key, obj in existing.items()}
+
+    def persistent_id(self, obj: Any) -> Any:
+        if obj is self.multiworld:
+            return "multiworld"
+        if obj is self.multiworld.regions:
+            return "regions"
+        if isinstance(obj, World):
+            return "world", obj.player
+        return self.existing_ids.get(id(obj))
+
+
+class _IsolatedWorldUnpickler(pickle.Unpickler):
+    def __init__(self, file: io.BytesIO, multiworld: "MultiWorld", existing: Dict[Tuple[Any, ...], Any]) -> None:
+        super().__init__(file)
+        self.multiworld = multiworld
+        self.existing = existing
+
+    def persistent_load(self, pid: Any) -> Any:
+        if pid == "multiworld":
+            return self.multiworld
+        if pid == "regions":
+            # the region manager the registers of regions add locations and entrances to
+            return self.multiworld.regions
+        if pid[0] == "world":
+            return self.multiworld.worlds[pid[1]]
+        return self.existing[pid]
+
+
+def _call_isolated(method_name: str, players: Tuple[int, ...], item_count: int,
+                   precollected_counts: Dict[int, int]) -> Dict[int, bytes]:
+    """
+    Runs a step for some isolated worlds in a worker process and pickles everything the step can have changed.
+    Items are only referenced up to the amounts in the multiworld before the step, as only those exist in the one
+    the results get merged into.
+    """
+    multiworld = _isolated_multiworld
+    assert multiworld, "call_all_isolated worker started without a multiworld"
+    results: Dict[int, bytes] = {}
+    for player in players:
+        existing = _get_existing_objects(multiworld, player, item_count, precollected_counts)
+        prev_item_count = len(multiworld.itempool)
+        prev_precollected_count = len(multiworld.precollected_items[player])
+        prev_completion_condition = multiworld.completion_condition[player]
+        call_single(multiworld, method_name, player)
+        world = multiworld.worlds[player]
+        result = {
+            "world": vars(world),
+            "existing": {key: _get_object_state(obj) for key, obj in existing.items()
+                         if key[0] in ("region", "entrance", "location") or obj.player == player},
+            "regions": (multiworld.regions.region_cache[player], multiworld.regions.entrance_cache[player],
+                        multiworld.regions.location_cache[player]),
+            "itempool": multiworld.itempool[prev_item_count:],
+            "precollected_items": multiworld.precollected_items[player][prev_precollected_count:],
+            "early_items": multiworld.early_items[player],
+            "local_early_items": multiworld.local_early_items[player],
+            "indirect_connections": {region: entrances for region, entrances in multiworld.indirect_connections.items()
+                                     if region.player == player},
+        }
+        if multiworld.completion_condition[player] is not prev_completion_condition:
+            result["completion_condition"] = multiworld.completion_condition[player]
+        file = io.BytesIO()
+        try:
+            _IsolatedWorldPickler(file, multiworld, existing).dump(result)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            raise RuntimeError(f"{world.game} has isolated_generation set, but the results of {method_name} for player "
+                               f"{player}, named {multiworld.player_name[player]}, can't be pickled.") from e
+        results[player] = file.getvalue()
+    return results
+
+
+def _merge_isolated(multiworld: "MultiWorld", player: int, data: bytes, item_count: int,
+                    precollected_counts: Dict[int, int]) -> List["Item"]:
+    """Replaces everything a step in a worker process can have changed for a player, returns the new items."""
+    existing = _get_existing_objects(multiworld, player, item_count, precollected_counts)
+    result = _IsolatedWorldUnpickler(io.BytesIO(data), multiworld, existing).load()
+    world = multiworld.worlds[player]
+    vars(world).clear()
+    vars(world).update(result["world"])
+    for key, state in result["existing"].items():
+        _set_object_state(existing[key], state)
+    multiworld.per_slot_randoms[player] = world.random
+    regions = multiworld.regions
+    regions.region_cache[player], regions.entrance_cache[player], regions.location_cache[player] = result["regions"]
+    for region in [region for region in multiworld.indirect_connections if region.player == player]:
+        del multiworld.indirect_connections[region]
+    multiworld.indirect_connections.update(result["indirect_connections"])
+    multiworld.early_items[player] = result["early_items"]
+    multiworld.local_early_items[player] = result["local_early_items"]
+    if "completion_condition" in result:
+        multiworld.completion_condition[player] = result["completion_condition"]
+    # the regions were replaced, so anything the state reached is outdated
+    state = multiworld.state
+    state.reachable_regions[player] = set()
+    state.blocked_connections[player] = set()
+    state.collected_since_update[player].clear()
+    state.stale[player] = True
+    for item in result["precollected_items"]:
+        multiworld.push_precollected(item)
+    return result["itempool"]
+
+
+def call_all_isolated(multiworld: "MultiWorld", method_name: str, processes: int) -> None:
+    """
+    Like call_all, but runs the step of worlds with isolated_generation in up to `processes` forked worker processes,
+    while the other worlds run in this process. The results are merged back in player order, so the multiworld ends up
+    the same as with call_all. Falls back to call_all if processes can't be forked.
+    """
+    assert method_name in isolated_stages, f"{method_name} can't be run in isolation"
+    isolated = tuple(player for player in multiworld.player_ids if multiworld.worlds[player].isolated_generation)
+    if processes < 1 or not isolated or "fork" not in multiprocessing.get_all_start_methods():
+        call_all(multiworld, method_name)
+        return
+
+    global _isolated_multiworld
+    _isolated_multiworld = multiworld
+    chunks = [isolated[i::processes] for i in range(min(processes, len(isolated)))]
+    prev_itempool = multiworld.itempool
+    multiworld.itempool = list(prev_itempool)
+    precollected_counts = {player: len(items) for player, items in multiworld.precollected_items.items()}
+    new_items: Dict[int, List[Item]] = {}
+    try:
+        with concurrent.futures.ProcessPoolExecutor(len(chunks), multiprocessing.get_context("fork")) as pool:
+            futures = [pool.submit(_call_isolated, method_name, chunk, len(prev_itempool), precollected_counts)
+                       for chunk in chunks]
+            for player in multiworld.player_ids:
+                if player not in isolated:
+                    prev_item_count = len(multiworld.itempool)
+                    call_single(multiworld, method_name, player)
+                    new_items[player] = multiworld.itempool[prev_item_count:]
+            results: Dict[int, bytes] = {}
+            for future in futures:
+                results.update(future.result())
+    finally:
+        _isolated_multiworld = None
+    for player in isolated:
+        new_items[player] = _merge_isolated(multiworld, player, results[player], len(prev_itempool),
+                                            precollected_counts)
+
+    # rebuild the item pool in the order call_all would have created it
+    prev_itempool.extend(item for player in multiworld.player_ids for item in new_items[player])
+    multiworld.itempool = prev_itempool
+    if __debug__:
+        for player in multiworld.player_ids:
+            _check_new_items(multiworld, player, new_items[player])
+
+    call_stage(multiworld, method_name)
+
+
 class WebWorld(metaclass=WebWorldRegister):
     """Webhost integration"""
 
@@ -324,6 +537,18 @@ class World(metaclass=AutoWorldRegister):
     If False, everything is rechecked at every step, which is slower computationally, 
     but may be desirable in complex/dynamic worlds."""
 
+    incremental_reachability: ClassVar[bool] = False
+    """If True, blocked entrances with rule builder rules are only rechecked when one of their item dependencies is
+    collected, instead of whenever the player's reachable regions are updated.
+    This requires the item dependencies of those rules to be the names of the items that change them when collected,
+    see get_rule_item_dependencies."""
+
+    isolated_generation: ClassVar[bool] = False
+    """If True, generate_early, create_regions, create_items and set_rules of this world only change the world itself,
+    its own regions, items and entries in the per-player dicts of the multiworld, only use the world's own random,
+    and everything they create can be pickled, for example by using rule builder rules instead of lambdas.
+    This allows Main to run these steps in worker processes, see call_all_isolated."""
+
     multiworld: "MultiWorld"
     """autoset on creation. The MultiWorld object for the currently generating multiworld."""
     player: int
@@ -679,6 +904,15 @@ class World(metaclass=AutoWorldRegister):
         """Hook for registering dependencies when a rule is assigned for this world"""
         pass
 
+    def get_rule_item_dependencies(self, rule: CollectionRule | Rule.Resolved) -> FrozenSet[str] | None:
+        """Returns the names of the items whose collection can change the result of an access rule,
+        or None if the rule has to be rechecked whenever the state changes."""
+        if not self.incremental_reachability or not isinstance(rule, Rule.Resolved) or rule.force_recalculate:
+            return None
+        if rule.region_dependencies() or rule.location_dependencies() or rule.entrance_dependencies():
+            return None
+        return frozenset(rule.item_dependencies())
+
     def _register_rule_indirects(self, resolved_rule: Rule.Resolved, entrance: Entrance) -> None:
         if self.explicit_indirect_conditions:
             for indirect_region in resolved_rule.region_dependencies().keys():